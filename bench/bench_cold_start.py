@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: `python -X importtime` for each Lambda handler module, in a fresh interpreter.
+
+Each module is imported as Lambda init would (`AWS_LAMBDA_FUNCTION_NAME` set, so init pre-warming
+runs), `--repeat` times; the best run is reported with its heaviest top-level imports. With
+`--check`, exits non-zero when a module exceeds its budget (`--budget-scale` loosens all budgets,
+e.g. on slow CI runners).
+
+Example:
+`python bench/bench_cold_start.py --repeat 5 --check`
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Init budget per handler module (ms, best of `--repeat`), including pre-warming.
+BUDGETS_MS: Dict[str, float] = {
+    "lambdas.ingest.app": 1000,
+    "lambdas.transform.app": 2000,
+    "lambdas.workflows.quality.app": 1000,
+    "lambdas.workflows.replay.app": 1000,
+    "lambdas.workflows.compaction.app": 1000,
+}
+
+
+def import_times(module: str, env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """`(name, depth, cumulative_us)` per import line of a fresh `import module` (depth 0: top level)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        name = name[1:].rstrip()
+        rows.append((name.strip(), (len(name) - len(name.lstrip())) // 2, int(cumulative_us)))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure handler module import (init) time.")
+    parser.add_argument("--module", action="append", help="Module to measure (repeatable; default: all handlers)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest top-level imports to report")
+    parser.add_argument("--check", action="store_true", help="Exit 1 when a module exceeds its budget")
+    parser.add_argument("--budget-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "AWS_LAMBDA_FUNCTION_NAME": "bench-cold-start"}
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+    results = []
+    over = False
+    for module in args.module or list(BUDGETS_MS):
+        best = None
+        for _ in range(args.repeat):
+            rows = import_times(module, env)
+            total = next(cum for name, depth, cum in rows if name == module and depth == 0)
+            if best is None or total < best[0]:
+                best = (total, rows)
+        total_us, rows = best
+        budget_ms = BUDGETS_MS.get(module, 1000) * args.budget_scale
+        direct = sorted((r for r in rows if r[1] == 1), key=lambda r: -r[2])
+        results.append(
+            {
+                "module": module,
+                "import_ms": round(total_us / 1000, 1),
+                "budget_ms": budget_ms,
+                "within_budget": total_us / 1000 <= budget_ms,
+                "heaviest": [{"module": name.strip(), "ms": round(cum / 1000, 1)} for name, _, cum in direct[: args.top]],
+            }
+        )
+        over |= total_us / 1000 > budget_ms
+
+    print(json.dumps({"repeat": args.repeat, "results": results}, indent=2))
+    return 1 if args.check and over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: transform batch building, dicts + `pa.Table.from_pylist` vs value tuples + `from_arrays`.
+
+Each run decodes a batch of SQS-style JSON bodies, normalizes them, groups by `(record_type, dt)`
+and builds one Arrow table per partition (the CPU path of the transform handler up to Parquet
+encoding), then table construction alone. Reports best-of-N wall time and the peak Python heap (tracemalloc) plus peak Arrow
+pool allocation for one run.
+
+Example:
+`python bench/bench_columnar.py --count 10000 --repeat 5`
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pyarrow as pa  # noqa: E402
+
+from lambdas.shared.columnar import ColumnarBatches, rows_to_table  # noqa: E402
+from lambdas.shared.schemas import normalize_record, normalize_record_values, partition_dt, to_pyarrow_schema  # noqa: E402
+from scripts.gen_fake_events import GENERATORS  # noqa: E402
+
+
+def build_from_pylist(bodies: List[str]) -> List[Any]:
+    grouped: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for body in bodies:
+        rec = normalize_record(json.loads(body))
+        grouped.setdefault((rec["record_type"], partition_dt([rec])), []).append(rec)
+    return [pa.Table.from_pylist(recs, schema=to_pyarrow_schema(rt)) for (rt, _), recs in grouped.items()]
+
+
+def build_columnar(bodies: List[str]) -> List[Any]:
+    batches = ColumnarBatches()
+    for i, body in enumerate(bodies):
+        batches.add(str(i), *normalize_record_values(json.loads(body)))
+    return [rows_to_table(rt, part.rows) for (rt, _), part in batches.partitions.items()]
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _peak_memory(fn: Callable[[], Any]) -> Dict[str, int]:
+    pool = pa.default_memory_pool()
+    arrow_before = pool.bytes_allocated()
+    tracemalloc.start()
+    tables = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_bytes = pool.bytes_allocated() - arrow_before
+    del tables
+    return {"python_heap_peak_bytes": peak, "arrow_bytes": arrow_bytes}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark transform table building.")
+    parser.add_argument("--count", type=int, default=10000, help="Messages per batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    gens = list(GENERATORS.values())
+    bodies = [json.dumps(gens[i % len(gens)]()) for i in range(args.count)]
+
+    a = build_from_pylist(bodies)
+    b = build_columnar(bodies)
+    assert sorted(t.num_rows for t in a) == sorted(t.num_rows for t in b)
+
+    results = {}
+    for label, fn in (("from_pylist", build_from_pylist), ("columnar", build_columnar)):
+        seconds = _best_of(lambda: fn(bodies), args.repeat)
+        results[label] = {"messages_per_s": round(args.count / seconds), "ms_per_batch": round(seconds * 1000, 2)}
+        results[label].update(_peak_memory(lambda: fn(bodies)))
+    # Table construction alone (inputs already normalized), where the dicts vs tuples difference lives.
+    dicts = [normalize_record(json.loads(body)) for body in bodies]
+    tuples = [normalize_record_values(json.loads(body)) for body in bodies]
+    by_type: Dict[str, Tuple[List[Any], List[Any]]] = {}
+    for d, (rt, values) in zip(dicts, tuples):
+        pair = by_type.setdefault(rt, ([], []))
+        pair[0].append(d)
+        pair[1].append(values)
+    from_pylist_s = _best_of(lambda: [pa.Table.from_pylist(d, schema=to_pyarrow_schema(rt)) for rt, (d, _) in by_type.items()], args.repeat)
+    from_arrays_s = _best_of(lambda: [rows_to_table(rt, t) for rt, (_, t) in by_type.items()], args.repeat)
+    results["table_build_only"] = {
+        "from_pylist_ms": round(from_pylist_s * 1000, 2),
+        "columnar_ms": round(from_arrays_s * 1000, 2),
+        "speedup": round(from_pylist_s / from_arrays_s, 2),
+    }
+    results["speedup"] = round(results["columnar"]["messages_per_s"] / results["from_pylist"]["messages_per_s"], 2)
+    results["python_heap_ratio"] = round(
+        results["columnar"]["python_heap_peak_bytes"] / results["from_pylist"]["python_heap_peak_bytes"], 2
+    )
+
+    print(json.dumps({"count": args.count, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: transform record-level dedup (`lambdas.shared.dedup`) throughput and DynamoDB traffic.
+
+Each run normalizes a batch of SQS-style JSON bodies into `ColumnarBatches` and, unless the scenario
+is `off`, filters every partition through a `RecordDeduper` and records the kept keys. S3 and
+DynamoDB are in-memory stand-ins that count requests (moto would dominate the timing), so results
+show the CPU cost of the dedup layers and how many keys still reach DynamoDB.
+
+Scenarios:
+- `off`: no dedup (baseline)
+- `fresh`: all keys new, partitions already hold `--history` keys (Bloom misses skip DynamoDB)
+- `redelivery`: the same batch again (every key is a Bloom hit confirmed by `BatchGetItem`)
+- `no_bloom`: fresh keys with the Bloom layer disabled (every key looked up in DynamoDB)
+
+With `--check`, exits non-zero when a scenario's throughput relative to `off` falls below its floor
+(`MIN_RELATIVE_THROUGHPUT`; `--floor-scale` loosens all floors, e.g. on noisy CI runners).
+
+Example:
+`python bench/bench_dedup.py --count 10000 --dup-rate 0.05 --repeat 3 --check`
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lambdas.shared import dedup  # noqa: E402
+from lambdas.shared.columnar import ColumnarBatches  # noqa: E402
+from lambdas.shared.schemas import normalize_record_values  # noqa: E402
+from scripts.gen_fake_events import GENERATORS  # noqa: E402
+
+# Floor per scenario: records/s relative to `off` (no dedup), best of `--repeat`.
+MIN_RELATIVE_THROUGHPUT: Dict[str, float] = {
+    "fresh": 0.35,
+    "redelivery": 0.25,
+}
+
+
+class _Missing(Exception):
+    def __init__(self, code: str) -> None:
+        self.response = {"Error": {"Code": code}}
+
+
+class _Body:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+
+class FakeS3:
+    def __init__(self) -> None:
+        self.objects: Dict[str, bytes] = {}
+        self.calls = 0
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: Optional[str] = None) -> Dict[str, Any]:
+        self.calls += 1
+        if Key not in self.objects:
+            raise _Missing("NoSuchKey")
+        etag = str(hash(self.objects[Key]))
+        if IfNoneMatch == etag:
+            raise _Missing("304")
+        return {"ETag": etag, "Body": _Body(self.objects[Key])}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        self.objects[Key] = Body
+        return {}
+
+
+class FakeDynamoDB:
+    def __init__(self) -> None:
+        self.items: Dict[str, Any] = {}
+        self.keys_read = 0
+        self.keys_written = 0
+
+    def batch_get_item(self, RequestItems: Dict[str, Any]) -> Dict[str, Any]:
+        (table, request), = RequestItems.items()
+        self.keys_read += len(request["Keys"])
+        found = [k for k in request["Keys"] if k["pk"]["S"] in self.items]
+        return {"Responses": {table: found}}
+
+    def batch_write_item(self, RequestItems: Dict[str, Any]) -> Dict[str, Any]:
+        (_, requests), = RequestItems.items()
+        for r in requests:
+            self.items[r["PutRequest"]["Item"]["pk"]["S"]] = r["PutRequest"]["Item"]
+        self.keys_written += len(requests)
+        return {}
+
+
+def _bodies(count: int, dup_rate: float, offset: int) -> List[str]:
+    gens = list(GENERATORS.values())
+    records = []
+    for i in range(count):
+        rec = gens[i % len(gens)]()
+        rec.update({"shipment_id": f"shp_{offset + i}", "invoice_id": f"inv_{offset + i}", "event_time": "2025-12-31T12:00:00Z"})
+        records.append(rec)
+    dups = [random.choice(records) for _ in range(int(count * dup_rate))]
+    return [json.dumps(r) for r in records + dups]
+
+
+def _run(bodies: List[str], s3: Optional[FakeS3], ddb: Optional[FakeDynamoDB], bloom: bool) -> int:
+    batches = ColumnarBatches()
+    for i, body in enumerate(bodies):
+        batches.add(str(i), *normalize_record_values(json.loads(body)))
+    if ddb is None:
+        return len(batches)
+    deduper = dedup.RecordDeduper(ddb, "dedup", s3=s3 if bloom else None, bucket="b", bloom_prefix="_dedup/bloom" if bloom else None)
+    kept = 0
+    for part in batches.partitions.values():
+        keep, keys = deduper.filter_rows(part.record_type, part.partition, part.rows)
+        deduper.mark_written(part.record_type, part.partition, keys)
+        kept += len(keep)
+    return kept
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark transform record-level dedup.")
+    parser.add_argument("--count", type=int, default=10000, help="Unique records per batch")
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="Extra in-batch duplicates, as a fraction of --count")
+    parser.add_argument("--history", type=int, default=50000, help="Keys already recorded per run before the measured batch")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true", help="Exit 1 when a scenario falls below its throughput floor")
+    parser.add_argument("--floor-scale", type=float, default=1.0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results: Dict[str, Any] = {}
+    for scenario in ("off", "fresh", "redelivery", "no_bloom"):
+        best = float("inf")
+        stats: Dict[str, Any] = {}
+        for _ in range(args.repeat):
+            dedup._BLOOM_CACHE.clear()
+            s3, ddb = FakeS3(), FakeDynamoDB()
+            if scenario != "off":
+                _run(_bodies(args.history, 0.0, offset=10_000_000), s3, ddb, bloom=scenario != "no_bloom")
+            bodies = _bodies(args.count, args.dup_rate, offset=0)
+            if scenario == "redelivery":
+                _run(bodies, s3, ddb, bloom=True)
+            ddb_read_before = ddb.keys_read
+            started = time.perf_counter()
+            kept = _run(bodies, s3, None if scenario == "off" else ddb, bloom=scenario != "no_bloom")
+            elapsed = time.perf_counter() - started
+            if elapsed < best:
+                best = elapsed
+                stats = {"rows_kept": kept, "ddb_keys_read": ddb.keys_read - ddb_read_before}
+        results[scenario] = {"records_per_s": round(len(bodies) / best), "ms_per_batch": round(best * 1000, 2), **stats}
+
+    base = results["off"]["records_per_s"]
+    below = False
+    for scenario in ("fresh", "redelivery", "no_bloom"):
+        relative = results[scenario]["records_per_s"] / base
+        results[scenario]["relative_throughput"] = round(relative, 2)
+        if scenario in MIN_RELATIVE_THROUGHPUT:
+            floor = MIN_RELATIVE_THROUGHPUT[scenario] * args.floor_scale
+            results[scenario]["min_relative_throughput"] = floor
+            below |= relative < floor
+    print(json.dumps({"count": args.count, "dup_rate": args.dup_rate, "history": args.history, "results": results}, indent=2))
+    return 1 if args.check and below else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
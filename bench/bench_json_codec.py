@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: JSON parse/serialize with the stdlib vs the active `lambdas.shared.codec` backend.
+
+Payloads come from `scripts/gen_fake_events.py`, i.e. the same shapes ingest parses per line and
+publishes per SQS message.
+
+Example:
+`python bench/bench_json_codec.py --count 50000 --repeat 5`
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lambdas.shared import codec  # noqa: E402
+from lambdas.shared.codec import select_codec  # noqa: E402
+from scripts.gen_fake_events import GENERATORS  # noqa: E402
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark JSON codecs on fake Bronze events.")
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    gens = list(GENERATORS.values())
+    records = [gens[i % len(gens)]() for i in range(args.count)]
+    lines = [json.dumps(r, ensure_ascii=False).encode("utf-8") for r in records]
+
+    backends = ["stdlib"]
+    for name in ("orjson", "msgspec"):
+        try:
+            select_codec(name)
+            backends.append(name)
+        except ImportError:
+            pass
+
+    results = {}
+    for name in backends:
+        _, (loads, dumps, _) = select_codec(name)
+        parse_s = _best_of(lambda: [loads(ln) for ln in lines], args.repeat)
+        dump_s = _best_of(lambda: [dumps(r) for r in records], args.repeat)
+        results[name] = {
+            "parse_records_per_s": round(args.count / parse_s),
+            "serialize_records_per_s": round(args.count / dump_s),
+        }
+
+    base = results["stdlib"]
+    for name, r in results.items():
+        r["parse_speedup"] = round(r["parse_records_per_s"] / base["parse_records_per_s"], 2)
+        r["serialize_speedup"] = round(r["serialize_records_per_s"] / base["serialize_records_per_s"], 2)
+
+    print(json.dumps({"active_backend": codec.BACKEND, "count": args.count, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Parquet encoding profiles for Silver files.
+
+For each record type and profile, writes one Silver-sized file and reports:
+- file size and best-of-N write time
+- Athena-style scan bytes: compressed bytes of the referenced columns in row groups that
+  min/max statistics cannot exclude, for a low-cardinality filter and an id point lookup
+- Bloom filter bytes (engines that read them, e.g. Athena engine v3, can skip row groups on point
+  lookups that min/max stats cannot; pyarrow itself does not evaluate them)
+
+Profiles:
+- `legacy_snappy`: the previous hard-coded writer (`compression="snappy"`, dictionary on all columns)
+- `profile`: the record type's entry in `PARQUET_PROFILES` (zstd-3, selective dictionary, page index, Bloom)
+- `profile_zstd9`: same with `compression_level=9`
+
+Example:
+`python bench/bench_parquet_profiles.py --rows 200000 --repeat 3`
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from lambdas.shared.schemas import normalize_record, parquet_profile, parquet_writer_options, to_pyarrow_schema  # noqa: E402
+from scripts.gen_fake_events import GENERATORS  # noqa: E402
+
+
+# (filter column, filter value, projected columns) per record type.
+QUERIES = {
+    "shipments": {"filter": ("carrier", "UPS", ["shipment_id", "weight_kg"]), "lookup": "shipment_id"},
+    "tracking_events": {"filter": ("status", "DELIVERED", ["shipment_id", "event_time"]), "lookup": "shipment_id"},
+    "invoice_lines": {"filter": ("sku", "SKU-002", ["invoice_id", "line_total"]), "lookup": "invoice_id"},
+}
+
+
+def scan_bytes(meta: Any, columns: Iterable[str], predicate_col: str, value: Any) -> int:
+    """Compressed bytes an engine reads for `columns` + `predicate_col` after min/max row-group pruning."""
+    wanted = set(columns) | {predicate_col}
+    total = 0
+    for rg in range(meta.num_row_groups):
+        row_group = meta.row_group(rg)
+        chunks = {row_group.column(i).path_in_schema: row_group.column(i) for i in range(row_group.num_columns)}
+        stats = chunks[predicate_col].statistics
+        if stats is not None and stats.has_min_max and not (stats.min <= value <= stats.max):
+            continue
+        total += sum(chunks[c].total_compressed_size for c in wanted)
+    return total
+
+
+def bloom_bytes(meta: Any, column: str) -> int:
+    total = 0
+    for rg in range(meta.num_row_groups):
+        row_group = meta.row_group(rg)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            if chunk.path_in_schema == column:
+                total += max(0, getattr(chunk, "bloom_filter_length", 0) or 0)
+    return total
+
+
+def _write(table: Any, row_group_size: int, options: Dict[str, Any]) -> bytes:
+    buf = io.BytesIO()
+    pq.write_table(table, buf, row_group_size=row_group_size, **options)
+    return buf.getvalue()
+
+
+def _profiles(record_type: str) -> Dict[str, Optional[Dict[str, Any]]]:
+    return {
+        "legacy_snappy": None,
+        "profile": parquet_profile(record_type),
+        "profile_zstd9": parquet_profile(record_type, {"compression_level": 9}),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Parquet encoding profiles.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results: Dict[str, Any] = {}
+    for record_type, gen in GENERATORS.items():
+        table = pa.Table.from_pylist([normalize_record(gen()) for _ in range(args.rows)], schema=to_pyarrow_schema(record_type))
+        filter_col, filter_value, projection = QUERIES[record_type]["filter"]
+        lookup_col = QUERIES[record_type]["lookup"]
+        lookup_value = table.column(lookup_col)[args.rows // 2].as_py()
+
+        results[record_type] = {}
+        for name, profile in _profiles(record_type).items():
+            if profile is None:
+                row_group_size, options = args.rows, {"compression": "snappy"}
+            else:
+                row_group_size, options = profile["row_group_size"], parquet_writer_options(profile)
+
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                data = _write(table, row_group_size, options)
+                best = min(best, time.perf_counter() - started)
+            meta = pq.ParquetFile(io.BytesIO(data)).metadata
+            results[record_type][name] = {
+                "file_bytes": len(data),
+                "write_ms": round(best * 1000, 1),
+                "row_groups": meta.num_row_groups,
+                "filter_scan_bytes": scan_bytes(meta, projection, filter_col, filter_value),
+                "lookup_scan_bytes_minmax": scan_bytes(meta, [], lookup_col, lookup_value),
+                "bloom_filter_bytes": bloom_bytes(meta, lookup_col),
+            }
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
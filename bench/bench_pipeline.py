@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: Bronze objects → ingest handler → SQS → transform handler → Silver Parquet.
+
+Both handlers run unmodified in this process against moto-backed S3 and DynamoDB, so no deployment
+is needed. Bronze JSONL objects are generated with `scripts/gen_fake_events.py`, put into a Bronze
+bucket, and each object is handed to `lambdas.ingest.app.handler` as one S3 event. The queue is an
+in-memory `SendMessageBatch` stand-in (moto's SQS rescans the whole queue on every receive, which
+would dominate the timing); it is drained in SQS-sized batches into `lambdas.transform.app.handler`.
+
+Per stage the report has records/sec, p50/p99/max handler latency, bytes read and written, and the
+process peak RSS after the stage (a high-water mark, so the transform figure covers both stages).
+moto adds per-request overhead, so compare results with each other (same flags, same machine), not
+with production numbers.
+
+Results are printed and written as JSON (`--out`); `--compare` prints the ratio of each metric to an
+earlier result, e.g. one saved on the parent commit.
+
+Example:
+`python bench/bench_pipeline.py --rows 100000 --objects 4 --envelope --out bench/results/pipeline.json`
+`python bench/bench_pipeline.py --rows 100000 --objects 4 --envelope --compare bench/results/pipeline.json`
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.gen_fake_events import GENERATORS, generate_jsonl_chunks  # noqa: E402
+
+BRONZE_BUCKET = "bench-bronze"
+SILVER_BUCKET = "bench-silver"
+TABLE_NAME = "bench-idempotency"
+
+
+class MemoryQueue:
+    """`SendMessageBatch` stand-in that keeps message bodies in order (every entry succeeds)."""
+
+    def __init__(self) -> None:
+        self.bodies: List[str] = []
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        successful = []
+        for entry in Entries:
+            successful.append({"Id": entry["Id"], "MessageId": str(len(self.bodies)), "MD5OfMessageBody": ""})
+            self.bodies.append(entry["MessageBody"])
+        return {"Successful": successful, "Failed": []}
+
+
+class _Context:
+    function_name = "bench-pipeline"
+
+    def __init__(self, request_id: str) -> None:
+        self.aws_request_id = request_id
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 900000
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _peak_rss_mb() -> float:
+    # Linux reports KiB, macOS bytes.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _stage(records: int, latencies: List[float], elapsed: float, **extra: Any) -> Dict[str, Any]:
+    return {
+        "records": records,
+        "invocations": len(latencies),
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(records / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies, default=0.0) * 1000, 2),
+        },
+        **extra,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _bronze_object(record_types: List[str], rows: int) -> bytes:
+    buf = io.StringIO()
+    for _ in range(rows):
+        buf.write(json.dumps(GENERATORS[random.choice(record_types)]()) + "\n")
+    return buf.getvalue().encode("utf-8")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import boto3
+    import moto
+
+    import lambdas.ingest.app as ingest
+    import lambdas.transform.app as transform
+
+    random.seed(args.seed)
+    record_types = sorted(GENERATORS) if args.type == "all" else [args.type]
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3")
+        sqs = MemoryQueue()
+        ddb = boto3.client("dynamodb")
+        for bucket in (BRONZE_BUCKET, SILVER_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": s3.meta.region_name})
+        queue_url = "https://sqs.bench.local/000000000000/bench-records"
+        ddb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        os.environ.update(
+            {
+                "QUEUE_URL": queue_url,
+                "IDEMPOTENCY_TABLE": TABLE_NAME,
+                "SILVER_BUCKET": SILVER_BUCKET,
+                "SQS_ENVELOPE_ENABLED": "true" if args.envelope else "false",
+            }
+        )
+        # Clients cached across warm invocations must be the mocked ones created here.
+        ingest._reset_warm_state()
+        ingest._CLIENTS = (s3, sqs, ddb)
+        transform._S3_CLIENT = s3
+
+        keys = []
+        bronze_bytes = 0
+        per_object = -(-args.rows // args.objects)
+        for n in range(args.objects):
+            rows = min(per_object, args.rows - n * per_object)
+            if rows <= 0:
+                break
+            if args.engine == "numpy":
+                # One record type per object, rotating; ids stay unique across objects.
+                body = "".join(
+                    generate_jsonl_chunks(record_types[n % len(record_types)], rows, seed=args.seed + n, row_offset=n * per_object)
+                ).encode("utf-8")
+            else:
+                body = _bronze_object(record_types, rows)
+            key = f"bronze/bench/part-{n:05d}.jsonl"
+            s3.put_object(Bucket=BRONZE_BUCKET, Key=key, Body=body)
+            keys.append(key)
+            bronze_bytes += len(body)
+
+        latencies: List[float] = []
+        enqueued = 0
+        started = time.perf_counter()
+        for n, key in enumerate(keys):
+            etag = s3.head_object(Bucket=BRONZE_BUCKET, Key=key)["ETag"].strip('"')
+            event = {"Records": [{"s3": {"bucket": {"name": BRONZE_BUCKET}, "object": {"key": key, "eTag": etag}}}]}
+            t0 = time.perf_counter()
+            enqueued += ingest.handler(event, _Context(f"ingest-{n}"))["enqueued"]
+            latencies.append(time.perf_counter() - t0)
+        ingest_stage = dict(
+            records=enqueued, latencies=latencies, elapsed=time.perf_counter() - started, bytes_read=bronze_bytes
+        )
+
+        latencies = []
+        messages = 0
+        sqs_bytes = 0
+        failed = 0
+        started = time.perf_counter()
+        for start in range(0, len(sqs.bodies), args.batch_size):
+            batch = sqs.bodies[start : start + args.batch_size]
+            event = {"Records": [{"messageId": f"m{start + i}", "body": body} for i, body in enumerate(batch)]}
+            t0 = time.perf_counter()
+            resp = transform.handler(event, _Context(f"transform-{len(latencies)}"))
+            latencies.append(time.perf_counter() - t0)
+            failed += len(resp["batchItemFailures"])
+            messages += len(batch)
+            sqs_bytes += sum(len(body) for body in batch)
+        transform_elapsed = time.perf_counter() - started
+
+        silver_files = 0
+        silver_bytes = 0
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=SILVER_BUCKET):
+            for obj in page.get("Contents", []):
+                silver_files += 1
+                silver_bytes += int(obj["Size"])
+
+    ingest_result = _stage(
+        ingest_stage["records"],
+        ingest_stage["latencies"],
+        ingest_stage["elapsed"],
+        bytes_read=ingest_stage["bytes_read"],
+        bytes_written=sqs_bytes,
+        messages=messages,
+    )
+    transform_result = _stage(
+        enqueued,
+        latencies,
+        transform_elapsed,
+        bytes_read=sqs_bytes,
+        bytes_written=silver_bytes,
+        files_written=silver_files,
+        failed_messages=failed,
+    )
+    total = ingest_result["seconds"] + transform_result["seconds"]
+    return {
+        "commit": _git_commit(),
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "stages": {"ingest": ingest_result, "transform": transform_result},
+        "end_to_end": {"records": enqueued, "seconds": round(total, 3), "records_per_sec": round(enqueued / total, 1) if total else 0.0},
+    }
+
+
+def _compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """`current / baseline` for each numeric stage metric (>1 for throughput is better, <1 for the rest)."""
+    ratios: Dict[str, Any] = {}
+    for stage in ("ingest", "transform"):
+        cur, base = current["stages"][stage], baseline["stages"].get(stage, {})
+        ratios[stage] = {
+            "records_per_sec": round(cur["records_per_sec"] / base["records_per_sec"], 3) if base.get("records_per_sec") else None,
+            "p50_ms": round(cur["latency_ms"]["p50"] / base["latency_ms"]["p50"], 3) if base.get("latency_ms", {}).get("p50") else None,
+            "p99_ms": round(cur["latency_ms"]["p99"] / base["latency_ms"]["p99"], 3) if base.get("latency_ms", {}).get("p99") else None,
+            "peak_rss_mb": round(cur["peak_rss_mb"] / base["peak_rss_mb"], 3) if base.get("peak_rss_mb") else None,
+        }
+    return {"baseline_commit": baseline.get("commit"), "ratios": ratios}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ingest → transform path against moto.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--objects", type=int, default=1, help="Bronze objects the rows are spread over")
+    parser.add_argument("--type", choices=["all"] + sorted(GENERATORS), default="all")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python", help="Bronze generator engine (numpy: large runs)")
+    parser.add_argument("--batch-size", type=int, default=10, help="SQS messages per transform invocation")
+    parser.add_argument("--envelope", action="store_true", help="Pack many records per SQS message")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the JSON result to this path")
+    parser.add_argument("--compare", help="Earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    # Keep stdout for the result: no per-invocation log lines or EMF metric blobs.
+    os.environ.setdefault("POWERTOOLS_METRICS_DISABLED", "true")
+    os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+    warnings.filterwarnings("ignore", message="No application metrics to publish")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(name, "bench")
+
+    result = run(args)
+    if args.compare:
+        result["comparison"] = _compare(result, json.loads(Path(args.compare).read_text()))
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: row-group skipping for point lookups, arrival order vs sort-key clustered Silver files.
+
+Writes the same rows twice into a local hive-partitioned dataset (`dt=` directories, several files
+per partition, `row_group_size` from the record type's Parquet profile): once in arrival order and
+once sorted by the profile's `sort_by`. Then runs point lookups through `pyarrow.dataset` and
+reports how many row groups survive statistics pruning (`ParquetFileFragment.subset`), plus lookup
+latency.
+
+Example:
+`python bench/bench_sort_pruning.py --record-type shipments --rows 400000 --lookups 50`
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.dataset as ds  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from lambdas.shared.schemas import (  # noqa: E402
+    normalize_record,
+    parquet_profile,
+    parquet_writer_options,
+    sort_table,
+    to_pyarrow_schema,
+)
+from scripts.gen_fake_events import GENERATORS  # noqa: E402
+
+
+def _write_dataset(root: Path, table: Any, profile: Dict[str, Any], files_per_dt: int) -> None:
+    for dt in sorted(set(table.column("dt").to_pylist())):
+        part = table.filter(pa.compute.equal(table.column("dt"), dt)).drop_columns(["dt"])
+        options = parquet_writer_options(profile, part.schema)
+        out_dir = root / f"dt={dt}"
+        out_dir.mkdir(parents=True)
+        step = max(1, -(-part.num_rows // files_per_dt))
+        for i, start in enumerate(range(0, part.num_rows, step)):
+            chunk = sort_table(part.slice(start, step), profile)
+            pq.write_table(chunk, out_dir / f"batch_{i:04d}.parquet", row_group_size=profile["row_group_size"], **options)
+
+
+def _lookup(dataset: Any, column: str, values: List[str]) -> Dict[str, Any]:
+    total_rg = sum(f.num_row_groups for f in dataset.get_fragments())
+    scanned: List[int] = []
+    started = time.perf_counter()
+    for value in values:
+        expr = ds.field(column) == value
+        scanned.append(sum(f.subset(expr).num_row_groups for f in dataset.get_fragments(filter=expr)))
+        assert dataset.to_table(filter=expr, columns=[column]).num_rows >= 1
+    elapsed = time.perf_counter() - started
+    avg = sum(scanned) / len(scanned)
+    return {
+        "row_groups_total": total_rg,
+        "row_groups_scanned_avg": round(avg, 2),
+        "row_groups_skipped_pct": round(100 * (1 - avg / total_rg), 2),
+        "lookup_ms_avg": round(1000 * elapsed / len(values), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark row-group pruning with sorted Silver files.")
+    parser.add_argument("--record-type", choices=sorted(GENERATORS), default="shipments")
+    parser.add_argument("--rows", type=int, default=400000)
+    parser.add_argument("--files-per-dt", type=int, default=1)
+    parser.add_argument("--row-group-size", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    gen = GENERATORS[args.record_type]
+    table = pa.Table.from_pylist([normalize_record(gen()) for _ in range(args.rows)], schema=to_pyarrow_schema(args.record_type))
+    table = table.append_column("dt", pa.compute.utf8_slice_codeunits(table.column("event_time"), 0, 10))
+
+    sorted_profile = parquet_profile(args.record_type, {"row_group_size": args.row_group_size})
+    lookup_col = sorted_profile["sort_by"][0]
+    values = random.sample(table.column(lookup_col).to_pylist(), args.lookups)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, profile in (
+            ("arrival_order", {**sorted_profile, "sort_by": ()}),
+            ("sorted", sorted_profile),
+        ):
+            root = Path(tmp) / label
+            _write_dataset(root, table, profile, args.files_per_dt)
+            dataset = ds.dataset(str(root), format="parquet", partitioning="hive")
+            results[label] = _lookup(dataset, lookup_col, values)
+
+    print(json.dumps({"record_type": args.record_type, "rows": args.rows, "lookup_column": lookup_col, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: `_iso_to_iso_z` (canonical fast path + memoized slow path) vs a full parse per call.
+
+Three input mixes are measured:
+- `canonical`: producer already emits `YYYY-MM-DDTHH:MM:SS(.ffffff)?Z` (fast path, no parse)
+- `offset_repeating`: `+HH:MM` offsets drawn from a small pool (memoized slow path)
+- `offset_unique`: `+HH:MM` offsets, every value distinct (cache misses; worst case)
+
+Example:
+`python bench/bench_timestamps.py --count 200000 --repeat 5`
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lambdas.shared.schemas import _iso_to_iso_z, _parse_iso_to_iso_z  # noqa: E402
+
+
+def _full_parse(s: str) -> str:
+    return _parse_iso_to_iso_z.__wrapped__(s)
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        _parse_iso_to_iso_z.cache_clear()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ISO-8601 timestamp normalization.")
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--distinct", type=int, default=5000, help="Pool size for offset_repeating")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    plus_one = timezone(timedelta(hours=1))
+
+    def _ts(i: int) -> datetime:
+        return base + timedelta(seconds=i * 37, microseconds=random.randrange(1, 1000000))
+
+    canonical = [_ts(i).isoformat().replace("+00:00", "Z") for i in range(args.count)]
+    pool = [_ts(i).astimezone(plus_one).isoformat() for i in range(args.distinct)]
+    offset_repeating = [random.choice(pool) for _ in range(args.count)]
+    offset_unique = [_ts(i).astimezone(plus_one).isoformat() for i in range(args.count)]
+
+    results = {}
+    for label, batch in (("canonical", canonical), ("offset_repeating", offset_repeating), ("offset_unique", offset_unique)):
+        full_s = _best_of(lambda: [_full_parse(s) for s in batch], args.repeat)
+        fast_s = _best_of(lambda: [_iso_to_iso_z(s) for s in batch], args.repeat)
+        results[label] = {
+            "full_parse_per_s": round(args.count / full_s),
+            "iso_to_iso_z_per_s": round(args.count / fast_s),
+            "speedup": round(full_s / fast_s, 2),
+        }
+
+    print(json.dumps({"count": args.count, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
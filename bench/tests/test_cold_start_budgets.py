@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+from bench.bench_cold_start import BUDGETS_MS, import_times
+
+
+pytestmark = pytest.mark.perf
+
+
+@pytest.mark.parametrize("module,function_name", [("lambdas.ingest.app", "ingest"), ("lambdas.transform.app", "transform")])
+def test_handler_init_stays_within_import_budget(module, function_name):
+    rows = import_times(module, {**os.environ, "AWS_LAMBDA_FUNCTION_NAME": function_name})
+    total_ms = next(cum for name, depth, cum in rows if name == module and depth == 0) / 1000
+    assert total_ms <= BUDGETS_MS[module] * float(os.getenv("IMPORT_BUDGET_SCALE", "1")), rows
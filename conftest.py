@@ -1,7 +1,10 @@
+import subprocess
 import sys
 from pathlib import Path
 import os
 
+import pytest
+
 ROOT = Path(__file__).resolve().parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
@@ -9,3 +12,78 @@ if str(ROOT) not in sys.path:
 os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
 os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
 os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-perf", action="store_true", help="Also run wall-clock (perf) tests")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: wall-clock budget test; skipped unless --run-perf")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-perf"):
+        return
+    skip = pytest.mark.skip(reason="perf test; run with --run-perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def mock_aws():
+    """Moto-backed AWS for one test; yields `boto3` (skipped when boto3/moto are not installed)."""
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        yield boto3
+
+
+@pytest.fixture
+def make_bucket(mock_aws):
+    """`make_bucket(name)` creates an S3 bucket in the test region and returns the S3 client."""
+
+    def _make(name):
+        s3 = mock_aws.client("s3")
+        region = s3.meta.region_name
+        config = {} if region == "us-east-1" else {"CreateBucketConfiguration": {"LocationConstraint": region}}
+        s3.create_bucket(Bucket=name, **config)
+        return s3
+
+    return _make
+
+
+@pytest.fixture
+def make_table(mock_aws):
+    """`make_table(name)` creates an on-demand DynamoDB table keyed by `pk` and returns the client."""
+
+    def _make(name):
+        ddb = mock_aws.client("dynamodb")
+        ddb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        return ddb
+
+    return _make
+
+
+@pytest.fixture
+def imported_modules():
+    """`imported_modules(module, **env)`: every module loaded by `import module` in a fresh interpreter (Lambda init)."""
+
+    def _imported(module, **env):
+        proc = subprocess.run(
+            [sys.executable, "-c", f"import sys, {module}; print('\\n'.join(sys.modules))"],
+            cwd=str(ROOT),
+            env={**os.environ, "PYTHONPATH": str(ROOT), **env},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return set(proc.stdout.split())
+
+    return _imported
@@ -87,6 +87,13 @@ module "idempotency_table" {
   tags   = local.tags
 }
 
+module "dedup_table" {
+  count  = var.record_dedup_enabled ? 1 : 0
+  source = "../../modules/dynamodb_table"
+  name   = "${local.name}-record-dedup"
+  tags   = local.tags
+}
+
 module "iam" {
   source                         = "../../modules/iam"
   name_prefix                    = local.iam_prefix
@@ -95,6 +102,9 @@ module "iam" {
   queue_arn                      = local.queue_arn
   idempotency_table_arn          = module.idempotency_table.arn
   eventbridge_put_events_enabled = var.ge_emit_events_from_transform
+  silver_staging_enabled         = var.silver_buffer_mode == "staging"
+  dedup_enabled                  = var.record_dedup_enabled
+  dedup_table_arn                = var.record_dedup_enabled ? module.dedup_table[0].arn : null
   tags                           = {}
 }
 
@@ -108,14 +118,31 @@ module "ingest_lambda" {
   timeout       = 30
   memory_size   = 256
   environment = {
-    QUEUE_URL               = local.queue_url
-    IDEMPOTENCY_TABLE       = module.idempotency_table.name
-    IDEMPOTENCY_TTL_SECONDS = tostring(30 * 24 * 60 * 60)
-    LOG_LEVEL               = "INFO"
+    QUEUE_URL                    = local.queue_url
+    IDEMPOTENCY_TABLE            = module.idempotency_table.name
+    IDEMPOTENCY_TTL_SECONDS      = tostring(30 * 24 * 60 * 60)
+    IDEMPOTENCY_MODE             = var.ingest_idempotency_mode
+    LOG_LEVEL                    = "INFO"
+    INGEST_SPLIT_THRESHOLD_BYTES = tostring(var.ingest_split_threshold_bytes)
   }
   tags = local.tags
 }
 
+# Split mode fans byte ranges out by invoking the ingest function asynchronously.
+data "aws_iam_policy_document" "ingest_self_invoke" {
+  statement {
+    actions   = ["lambda:InvokeFunction"]
+    resources = [module.ingest_lambda.arn]
+  }
+}
+
+resource "aws_iam_role_policy" "ingest_self_invoke" {
+  count  = var.ingest_split_threshold_bytes > 0 ? 1 : 0
+  name   = "${local.iam_prefix}-ingest-self-invoke"
+  role   = module.iam.ingest_role_id
+  policy = data.aws_iam_policy_document.ingest_self_invoke.json
+}
+
 resource "aws_lambda_permission" "allow_s3_invoke_ingest" {
   statement_id  = "AllowExecutionFromS3"
   action        = "lambda:InvokeFunction"
@@ -145,18 +172,47 @@ module "transform_lambda" {
   timeout       = 60
   memory_size   = 512
   environment = {
-    SILVER_BUCKET               = module.silver_bucket.name
-    SILVER_PREFIX               = "silver"
-    MAX_RECORDS_PER_FILE        = "5000"
-    LOG_LEVEL                   = "INFO"
-    QUALITY_EVENTBRIDGE_ENABLED = var.ge_emit_events_from_transform ? "true" : "false"
-    QUALITY_EVENTBUS_NAME       = var.ge_event_bus_name
-    QUALITY_EVENT_SOURCE        = var.ge_event_source
-    QUALITY_EVENT_DETAIL_TYPE   = var.ge_event_detail_type
+    SILVER_BUCKET                = module.silver_bucket.name
+    SILVER_PREFIX                = "silver"
+    MAX_RECORDS_PER_FILE         = "5000"
+    LOG_LEVEL                    = "INFO"
+    QUALITY_EVENTBRIDGE_ENABLED  = var.ge_emit_events_from_transform ? "true" : "false"
+    QUALITY_EVENTBUS_NAME        = var.ge_event_bus_name
+    QUALITY_EVENT_SOURCE         = var.ge_event_source
+    QUALITY_EVENT_DETAIL_TYPE    = var.ge_event_detail_type
+    SILVER_BUFFER_MODE           = var.silver_buffer_mode
+    SILVER_PARTITION_GRANULARITY = var.silver_partition_granularity
+    SILVER_LATE_DATA_POLICY      = var.silver_late_data_policy
+    RECORD_DEDUP                 = var.record_dedup_enabled ? "on" : "off"
+    DEDUP_TABLE_NAME             = var.record_dedup_enabled ? module.dedup_table[0].name : ""
   }
   tags = local.tags
 }
 
+# Buffered mode: periodically flush staged partitions that stopped receiving data.
+resource "aws_cloudwatch_event_rule" "transform_flush_staged" {
+  count               = var.silver_buffer_mode == "staging" ? 1 : 0
+  name                = "${local.name}-transform-flush-staged"
+  schedule_expression = var.silver_flush_schedule_expression
+  tags                = local.tags
+}
+
+resource "aws_cloudwatch_event_target" "transform_flush_staged" {
+  count = var.silver_buffer_mode == "staging" ? 1 : 0
+  rule  = aws_cloudwatch_event_rule.transform_flush_staged[0].name
+  arn   = module.transform_lambda.arn
+  input = jsonencode({ flush_staged = true })
+}
+
+resource "aws_lambda_permission" "allow_events_flush_staged" {
+  count         = var.silver_buffer_mode == "staging" ? 1 : 0
+  statement_id  = "AllowFlushStagedFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = module.transform_lambda.name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.transform_flush_staged[0].arn
+}
+
 module "sqs_to_transform" {
   source                  = "../../modules/lambda_event_source_mapping"
   function_arn            = module.transform_lambda.arn
@@ -328,6 +384,76 @@ module "glue_catalog" {
   job_enabled    = var.glue_job_enabled
   job_name       = var.glue_job_name
   job_script_key = var.glue_job_script_key
+
+  # Built by `make build` (build-glue-libs).
+  job_libs_zip_path = "${path.module}/../../../../build/glue_libs.zip"
+}
+
+# Compaction runner: small partitions are compacted in Lambda, large ones start the Glue job.
+locals {
+  compaction_glue_job_name = length(module.glue_catalog) > 0 ? module.glue_catalog[0].job_name : null
+}
+
+data "aws_iam_policy_document" "ops_compaction" {
+  source_policy_documents = [data.aws_iam_policy_document.basic_logs_workflows.json]
+
+  statement {
+    actions   = ["s3:ListBucket", "s3:GetBucketLocation"]
+    resources = [module.silver_bucket.arn]
+  }
+
+  statement {
+    actions   = ["s3:GetObject", "s3:PutObject", "s3:DeleteObject"]
+    resources = ["${module.silver_bucket.arn}/*"]
+  }
+
+  dynamic "statement" {
+    for_each = local.compaction_glue_job_name != null ? [1] : []
+    content {
+      actions   = ["glue:StartJobRun"]
+      resources = ["arn:aws:glue:*:*:job/${local.compaction_glue_job_name}"]
+    }
+  }
+}
+
+resource "aws_iam_role" "ops_compaction" {
+  count              = var.compaction_runner_enabled ? 1 : 0
+  name               = "${local.iam_prefix}-ops-compaction"
+  assume_role_policy = data.aws_iam_policy_document.assume_lambda_workflows.json
+  tags               = {}
+}
+
+resource "aws_iam_role_policy" "ops_compaction" {
+  count  = var.compaction_runner_enabled ? 1 : 0
+  name   = "${local.iam_prefix}-ops-compaction"
+  role   = aws_iam_role.ops_compaction[0].id
+  policy = data.aws_iam_policy_document.ops_compaction.json
+}
+
+module "ops_compaction_lambda" {
+  count         = var.compaction_runner_enabled ? 1 : 0
+  source        = "../../modules/lambda_fn"
+  function_name = "${local.name}-ops-compaction"
+  description   = "Compact small Silver partitions with pyarrow; route large ones to Glue"
+  filename      = "${path.module}/../../../../build/ops_compaction.zip"
+  handler       = "lambdas.workflows.compaction.app.handler"
+  role_arn      = aws_iam_role.ops_compaction[0].arn
+  layers        = var.transform_layers
+  timeout       = 900
+  memory_size   = 2048
+
+  # External sort runs spill to /tmp (about the compressed backlog, capped by compaction_lambda_max_mb).
+  ephemeral_storage_mb = max(512, 2 * var.compaction_lambda_max_mb)
+
+  environment = {
+    SILVER_BUCKET               = module.silver_bucket.name
+    SILVER_PREFIX               = "silver"
+    COMPACTED_PREFIX            = var.compaction_output_prefix
+    COMPACTION_LAMBDA_MAX_BYTES = tostring(var.compaction_lambda_max_mb * 1024 * 1024)
+    GLUE_JOB_NAME               = local.compaction_glue_job_name != null ? local.compaction_glue_job_name : ""
+    LOG_LEVEL                   = "INFO"
+  }
+  tags = local.tags
 }
 
 module "ge_job" {
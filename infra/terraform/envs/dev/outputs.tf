@@ -30,6 +30,10 @@ output "transform_lambda" {
   value = module.transform_lambda.name
 }
 
+output "compaction_lambda" {
+  value = length(module.ops_compaction_lambda) > 0 ? module.ops_compaction_lambda[0].name : null
+}
+
 output "dashboard_name" {
   value = module.observability.dashboard_name
 }
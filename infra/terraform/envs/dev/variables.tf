@@ -49,6 +49,48 @@ variable "transform_layers" {
   description = "Extra Lambda layers for the transform function (e.g., AWS SDK for pandas layer)."
 }
 
+variable "ingest_idempotency_mode" {
+  type        = string
+  default     = "powertools"
+  description = "Object idempotency in ingest: powertools (per object) or batch (bulk DynamoDB claims, concurrent objects)."
+}
+
+variable "ingest_split_threshold_bytes" {
+  type        = number
+  default     = 0
+  description = "Split plain JSONL Bronze objects larger than this into byte ranges (0 disables split mode)."
+}
+
+variable "silver_buffer_mode" {
+  type        = string
+  default     = "off"
+  description = "Transform Silver write mode: off (one file per partition per batch) or staging (buffer + flush)."
+}
+
+variable "silver_partition_granularity" {
+  type        = string
+  default     = "dt"
+  description = "Silver partition layout: dt (daily) or dt/hour (adds an hour=HH level)."
+}
+
+variable "silver_late_data_policy" {
+  type        = string
+  default     = "current"
+  description = "Rows without event_time: current (current partition) or partition (dt=late, or dt=late/hour=__ when hourly)."
+}
+
+variable "record_dedup_enabled" {
+  type        = bool
+  default     = false
+  description = "Drop Silver records whose natural key was already written (DynamoDB table + S3 Bloom filters)."
+}
+
+variable "silver_flush_schedule_expression" {
+  type        = string
+  default     = "rate(5 minutes)"
+  description = "Schedule for flushing aged staged partitions when silver_buffer_mode = staging."
+}
+
 variable "observability_enabled" {
   type    = bool
   default = true
@@ -162,6 +204,23 @@ variable "glue_job_script_key" {
   default = "glue/scripts/compact_silver.py"
 }
 
+variable "compaction_runner_enabled" {
+  type        = bool
+  default     = false
+  description = "Deploy the compaction runner Lambda (pyarrow for small partitions, Glue job for large ones)."
+}
+
+variable "compaction_output_prefix" {
+  type    = string
+  default = "silver_compacted"
+}
+
+variable "compaction_lambda_max_mb" {
+  type        = number
+  default     = 256
+  description = "Partitions with more new input than this are routed to the Glue job (when enabled); also sizes the runner's /tmp."
+}
+
 variable "ge_enabled" {
   type    = bool
   default = false
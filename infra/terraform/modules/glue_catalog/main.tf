@@ -55,6 +55,23 @@ variable "job_script_key" {
   default = "glue/scripts/compact_silver.py"
 }
 
+variable "job_libs_zip_path" {
+  type        = string
+  default     = null
+  description = "Local zip of the `lambdas` package (make build-glue-libs), passed to the job as --extra-py-files."
+}
+
+variable "job_libs_key" {
+  type    = string
+  default = "glue/libs/lambdas_shared.zip"
+}
+
+variable "job_max_capacity" {
+  type        = number
+  default     = 1
+  description = "Python shell DPUs for the compaction job: 0.0625 (1 GB) or 1 (16 GB); a run can override it."
+}
+
 variable "scripts_bucket_name" {
   type        = string
   default     = null
@@ -70,6 +87,8 @@ locals {
 
   job_name = var.job_name != null && var.job_name != "" ? var.job_name : "${local.iam_prefix}-silver-compact"
 
+  job_libs_enabled = var.job_libs_zip_path != null && var.job_libs_zip_path != ""
+
   schema_delete_behavior = var.recrawl_behavior == "CRAWL_NEW_FOLDERS_ONLY" ? "LOG" : "DEPRECATE_IN_DATABASE"
   schema_update_behavior = var.recrawl_behavior == "CRAWL_NEW_FOLDERS_ONLY" ? "LOG" : "UPDATE_IN_DATABASE"
 }
@@ -155,6 +174,15 @@ resource "aws_s3_object" "job_script" {
   etag         = filemd5("${path.module}/scripts/compact_silver.py")
 }
 
+resource "aws_s3_object" "job_libs" {
+  count        = var.enabled && var.job_enabled && local.job_libs_enabled ? 1 : 0
+  bucket       = local.scripts_bucket_name
+  key          = var.job_libs_key
+  content_type = "application/zip"
+  source       = var.job_libs_zip_path
+  etag         = filemd5(var.job_libs_zip_path)
+}
+
 data "aws_iam_policy_document" "job" {
   statement {
     actions   = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents"]
@@ -191,24 +219,33 @@ resource "aws_glue_job" "compact_silver" {
   name     = local.job_name
   role_arn = aws_iam_role.job[0].arn
 
-  glue_version      = "4.0"
-  worker_type       = "G.1X"
-  number_of_workers = 2
+  # The compaction engine is single-process pyarrow (`lambdas.shared.compaction`): a Python shell
+  # job, not a Spark cluster whose executors would sit idle.
+  glue_version = "3.0"
+  max_capacity = var.job_max_capacity
 
   command {
-    name            = "glueetl"
-    python_version  = "3"
+    name            = "pythonshell"
+    python_version  = "3.9"
     script_location = "s3://${local.scripts_bucket_name}/${var.job_script_key}"
   }
 
-  default_arguments = {
-    "--enable-continuous-cloudwatch-log" = "true"
-    "--enable-metrics"                   = "true"
-    "--job-language"                     = "python"
-    "--TempDir"                          = "s3://${var.silver_bucket_name}/glue/tmp/"
+  default_arguments = merge(
+    {
+      "--enable-continuous-cloudwatch-log" = "true"
+      "--job-language"                     = "python"
+      "--library-set"                      = "analytics"
+      "--TempDir"                          = "s3://${var.silver_bucket_name}/glue/tmp/"
+    },
+    local.job_libs_enabled ? { "--extra-py-files" = "s3://${local.scripts_bucket_name}/${var.job_libs_key}" } : {}
+  )
+
+  # The compaction manifest assumes one writer per partition.
+  execution_property {
+    max_concurrent_runs = 1
   }
 
-  depends_on = [aws_s3_object.job_script]
+  depends_on = [aws_s3_object.job_script, aws_s3_object.job_libs]
 }
 
 output "database_name" {
@@ -1,47 +1,71 @@
-import sys
+"""
+Glue entrypoint for incremental Silver compaction.
 
-from awsglue.context import GlueContext
-from awsglue.job import Job
-from awsglue.utils import getResolvedOptions
-from pyspark.context import SparkContext
-from pyspark.sql import functions as F
+The work is done by `lambdas.shared.compaction` (shipped to the job as `--extra-py-files`, built by
+`make build-glue-libs`): each run merges only the Silver files not yet recorded in the partition's
+manifest and commits by writing the manifest last, so reruns are cheap and never duplicate rows.
 
+Job arguments:
+- required: JOB_NAME, SILVER_BUCKET, SILVER_PREFIX, RECORD_TYPE, DT, OUTPUT_PREFIX
+- optional: HOUR (HH, for an hourly `dt=.../hour=...` layout), PARQUET_PROFILE (JSON overrides),
+  TARGET_FILE_MB (default 128), MANIFEST_PREFIX (default `{OUTPUT_PREFIX}/_compaction`),
+  MEMORY_BUDGET_MB (default: a quarter of the host memory; the compaction runner sets it to match
+  the run's `MaxCapacity`)
 
-def main() -> int:
-    args = getResolvedOptions(
-        sys.argv,
-        [
-            "JOB_NAME",
-            "SILVER_BUCKET",
-            "SILVER_PREFIX",
-            "RECORD_TYPE",
-            "DT",
-            "OUTPUT_PREFIX",
-        ],
-    )
+Outside Glue (no `awsglue` installed) the same arguments are parsed with argparse, e.g.
+`python compact_silver.py --SILVER_BUCKET b --SILVER_PREFIX silver --RECORD_TYPE shipments ...`.
+"""
 
-    sc = SparkContext.getOrCreate()
-    glue_context = GlueContext(sc)
-    spark = glue_context.spark_session
+import argparse
+import json
+import sys
 
-    job = Job(glue_context)
-    job.init(args["JOB_NAME"], args)
 
-    silver_bucket = args["SILVER_BUCKET"]
-    silver_prefix = args["SILVER_PREFIX"].strip("/")
-    record_type = args["RECORD_TYPE"]
-    dt = args["DT"]
-    output_prefix = args["OUTPUT_PREFIX"].strip("/")
+REQUIRED_ARGS = ["JOB_NAME", "SILVER_BUCKET", "SILVER_PREFIX", "RECORD_TYPE", "DT", "OUTPUT_PREFIX"]
+OPTIONAL_ARGS = ["HOUR", "PARQUET_PROFILE", "TARGET_FILE_MB", "MANIFEST_PREFIX", "MEMORY_BUDGET_MB"]
+
 
-    src = f"s3://{silver_bucket}/{silver_prefix}/{record_type}/dt={dt}/"
-    dst = f"s3://{silver_bucket}/{output_prefix}/{record_type}/dt={dt}/"
+def _resolve_args(argv):
+    try:
+        from awsglue.utils import getResolvedOptions  # type: ignore
+    except ImportError:
+        parser = argparse.ArgumentParser()
+        for name in REQUIRED_ARGS:
+            parser.add_argument(f"--{name}", required=name != "JOB_NAME", default="local")
+        for name in OPTIONAL_ARGS:
+            parser.add_argument(f"--{name}")
+        return {k: v for k, v in vars(parser.parse_args(argv[1:])).items() if v is not None}
 
-    df = spark.read.parquet(src)
-    df = df.withColumn("_ingested_at", F.current_timestamp())
+    args = getResolvedOptions(argv, REQUIRED_ARGS)
+    # `getResolvedOptions` rejects missing keys, so optional job arguments are resolved separately.
+    present = [n for n in OPTIONAL_ARGS if f"--{n}" in argv]
+    if present:
+        args.update(getResolvedOptions(argv, present))
+    return args
 
-    df.repartition(1).write.mode("overwrite").parquet(dst)
 
-    job.commit()
+def main() -> int:
+    from lambdas.shared.compaction import DEFAULT_TARGET_FILE_BYTES, compact_partition
+
+    args = _resolve_args(sys.argv)
+    bucket = args["SILVER_BUCKET"]
+    output_prefix = args["OUTPUT_PREFIX"].strip("/")
+    manifest_prefix = (args.get("MANIFEST_PREFIX") or f"{output_prefix}/_compaction").strip("/")
+    target_mb = args.get("TARGET_FILE_MB")
+    budget_mb = args.get("MEMORY_BUDGET_MB")
+
+    summary = compact_partition(
+        f"s3://{bucket}/{args['SILVER_PREFIX'].strip('/')}",
+        f"s3://{bucket}/{output_prefix}",
+        args["RECORD_TYPE"],
+        args["DT"],
+        hour=args.get("HOUR"),
+        manifest_root=f"s3://{bucket}/{manifest_prefix}",
+        target_file_bytes=int(target_mb) * 1024 * 1024 if target_mb else DEFAULT_TARGET_FILE_BYTES,
+        profile_overrides=json.loads(args.get("PARQUET_PROFILE") or "{}"),
+        memory_budget_bytes=int(budget_mb) * 1024 * 1024 if budget_mb else None,
+    )
+    print(json.dumps(summary))
     return 0
 
 
@@ -13,9 +13,9 @@ def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def _result_key(result_prefix: str, record_type: str, dt: str, run_id: str) -> str:
+def _result_key(result_prefix: str, record_type: str, partition: str, run_id: str) -> str:
     prefix = result_prefix.strip("/")
-    return f"{prefix}/{record_type}/dt={dt}/run_{run_id}.json"
+    return f"{prefix}/{record_type}/{partition}/run_{run_id}.json"
 
 
 def _run_expectations(record_type: str, df):
@@ -68,6 +68,9 @@ def main() -> int:
             "RESULT_PREFIX",
         ],
     )
+    # Optional: the partition's hive path (`dt=.../hour=...` when hourly); defaults to `dt={DT}`.
+    if "--PARTITION" in sys.argv:
+        args.update(getResolvedOptions(sys.argv, ["PARTITION"]))
 
     sc = SparkContext.getOrCreate()
     glue_context = GlueContext(sc)
@@ -80,9 +83,10 @@ def main() -> int:
     silver_prefix = args["SILVER_PREFIX"].strip("/")
     record_type = args["RECORD_TYPE"]
     dt = args["DT"]
+    partition = args.get("PARTITION") or f"dt={dt}"
     result_prefix = args["RESULT_PREFIX"]
 
-    src = f"s3://{silver_bucket}/{silver_prefix}/{record_type}/dt={dt}/"
+    src = f"s3://{silver_bucket}/{silver_prefix}/{record_type}/{partition}/"
     run_id = getattr(sc, "applicationId", "run")
 
     df = spark.read.parquet(src)
@@ -92,6 +96,7 @@ def main() -> int:
         "success": success,
         "record_type": record_type,
         "dt": dt,
+        "partition": partition,
         "source": src,
         "run_id": run_id,
         "generated_at": _utc_now_iso(),
@@ -99,7 +104,7 @@ def main() -> int:
     }
 
     s3 = boto3.client("s3")
-    key = _result_key(result_prefix, record_type, dt, run_id)
+    key = _result_key(result_prefix, record_type, partition, run_id)
     s3.put_object(
         Bucket=silver_bucket,
         Key=key,
@@ -23,6 +23,21 @@ variable "eventbridge_put_events_enabled" {
   default = false
 }
 
+variable "silver_staging_enabled" {
+  type    = bool
+  default = false
+}
+
+variable "dedup_enabled" {
+  type    = bool
+  default = false
+}
+
+variable "dedup_table_arn" {
+  type    = string
+  default = null
+}
+
 variable "tags" {
   type    = map(string)
   default = {}
@@ -76,7 +91,8 @@ data "aws_iam_policy_document" "ingest" {
   }
 
   statement {
-    actions   = ["dynamodb:GetItem", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:DeleteItem"]
+    # Batch* back IDEMPOTENCY_MODE=batch (claims are TransactWriteItems, authorized as PutItem).
+    actions   = ["dynamodb:GetItem", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:DeleteItem", "dynamodb:BatchGetItem", "dynamodb:BatchWriteItem"]
     resources = [var.idempotency_table_arn]
   }
 }
@@ -112,6 +128,43 @@ data "aws_iam_policy_document" "transform" {
       resources = ["*"]
     }
   }
+
+  # Buffered mode reads, merges and deletes staged parts (and flush locks/manifests).
+  dynamic "statement" {
+    for_each = var.silver_staging_enabled ? [1] : []
+    content {
+      actions   = ["s3:GetObject", "s3:DeleteObject"]
+      resources = ["${var.silver_bucket_arn}/*"]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = var.silver_staging_enabled ? [1] : []
+    content {
+      actions   = ["s3:ListBucket"]
+      resources = [var.silver_bucket_arn]
+    }
+  }
+}
+
+# Record-level dedup: key lookups/marks plus the per-partition Bloom filters in the Silver bucket.
+data "aws_iam_policy_document" "transform_dedup" {
+  statement {
+    actions   = ["dynamodb:BatchGetItem", "dynamodb:BatchWriteItem"]
+    resources = [var.dedup_enabled ? var.dedup_table_arn : "*"]
+  }
+
+  statement {
+    actions   = ["s3:GetObject", "s3:PutObject"]
+    resources = ["${var.silver_bucket_arn}/_dedup/*"]
+  }
+}
+
+resource "aws_iam_role_policy" "transform_dedup" {
+  count  = var.dedup_enabled ? 1 : 0
+  name   = "${var.name_prefix}-transform-dedup"
+  role   = aws_iam_role.transform.id
+  policy = data.aws_iam_policy_document.transform_dedup.json
 }
 
 resource "aws_iam_role_policy" "transform" {
@@ -124,6 +177,10 @@ output "ingest_role_arn" {
   value = aws_iam_role.ingest.arn
 }
 
+output "ingest_role_id" {
+  value = aws_iam_role.ingest.id
+}
+
 output "transform_role_arn" {
   value = aws_iam_role.transform.arn
 }
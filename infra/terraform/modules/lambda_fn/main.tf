@@ -34,6 +34,11 @@ variable "memory_size" {
   default = 256
 }
 
+variable "ephemeral_storage_mb" {
+  type    = number
+  default = 512
+}
+
 variable "environment" {
   type    = map(string)
   default = {}
@@ -70,6 +75,10 @@ resource "aws_lambda_function" "this" {
   memory_size   = var.memory_size
   layers        = var.layers
 
+  ephemeral_storage {
+    size = var.ephemeral_storage_mb
+  }
+
   filename         = var.filename
   source_code_hash = filebase64sha256(var.filename)
 
@@ -12,6 +12,11 @@ variable "versioning" {
   default = true
 }
 
+variable "abort_incomplete_multipart_days" {
+  type    = number
+  default = 1
+}
+
 variable "tags" {
   type    = map(string)
   default = {}
@@ -39,6 +44,19 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "this" {
   }
 }
 
+# Streaming writers abort failed multipart uploads themselves; this reaps the ones a Lambda timeout cut off.
+resource "aws_s3_bucket_lifecycle_configuration" "this" {
+  bucket = aws_s3_bucket.this.id
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+    filter {}
+    abort_incomplete_multipart_upload {
+      days_after_initiation = var.abort_incomplete_multipart_days
+    }
+  }
+}
+
 resource "aws_s3_bucket_public_access_block" "this" {
   bucket                  = aws_s3_bucket.this.id
   block_public_acls       = true
@@ -134,6 +134,30 @@ resource "aws_iam_role_policy" "sfn" {
 
 locals {
   states_base = {
+    # Inputs from before hourly partitions carry only `dt`; default `partition` to "dt=<dt>".
+    CheckPartition = {
+      Type    = "Choice"
+      Choices = [
+        {
+          Variable  = "$.partition"
+          IsPresent = false
+          Next      = "DefaultPartition"
+        },
+      ]
+      Default = "ValidateWithGlueJob"
+    }
+    DefaultPartition = {
+      Type       = "Pass"
+      Parameters = { "value.$" = "States.Format('dt={}', $.dt)" }
+      ResultPath = "$.partition"
+      Next       = "UnwrapPartition"
+    }
+    UnwrapPartition = {
+      Type       = "Pass"
+      InputPath  = "$.partition.value"
+      ResultPath = "$.partition"
+      Next       = "ValidateWithGlueJob"
+    }
     ValidateWithGlueJob = {
       Type       = "Task"
       Resource   = "arn:aws:states:::glue:startJobRun.sync"
@@ -145,6 +169,7 @@ locals {
           "--SILVER_PREFIX.$" = "$.silver_prefix"
           "--RECORD_TYPE.$"   = "$.record_type"
           "--DT.$"            = "$.dt"
+          "--PARTITION.$"     = "$.partition"
           "--RESULT_PREFIX.$" = "$.result_prefix"
         }
       }
@@ -175,7 +200,7 @@ locals {
       Resource = "arn:aws:states:::aws-sdk:s3:putObject"
       Parameters = {
         "Bucket.$"  = "$.silver_bucket"
-        "Key.$"     = "States.Format('${local.quarantine_prefix}/{}/dt={}/execution_{}.json', $.record_type, $.dt, $$.Execution.Name)"
+        "Key.$"     = "States.Format('${local.quarantine_prefix}/{}/{}/execution_{}.json', $.record_type, $.partition, $$.Execution.Name)"
         "Body.$"    = "States.JsonToString($)"
         ContentType = "application/json"
       }
@@ -212,7 +237,7 @@ locals {
 
   definition = jsonencode({
     Comment = "Great Expectations quality gate (Glue Job) for Silver partitions"
-    StartAt = "ValidateWithGlueJob"
+    StartAt = "CheckPartition"
     States  = local.states
   })
 }
@@ -276,8 +301,9 @@ resource "aws_cloudwatch_event_target" "trigger" {
       silver_prefix = "$.detail.silver_prefix"
       record_type   = "$.detail.record_type"
       dt            = "$.detail.dt"
+      partition     = "$.detail.partition"
     }
-    input_template = "{\"silver_bucket\":<silver_bucket>,\"silver_prefix\":<silver_prefix>,\"record_type\":<record_type>,\"dt\":<dt>,\"result_prefix\":\"ge/results\"}"
+    input_template = "{\"silver_bucket\":<silver_bucket>,\"silver_prefix\":<silver_prefix>,\"record_type\":<record_type>,\"dt\":<dt>,\"partition\":<partition>,\"result_prefix\":\"ge/results\"}"
   }
 }
 
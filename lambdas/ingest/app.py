@@ -2,21 +2,69 @@
 Ingest Lambda (Bronze → SQS) with object-level idempotency.
 
 Trigger:
-- S3 ObjectCreated events for Bronze JSON/JSONL objects.
+- S3 ObjectCreated events for Bronze JSON/JSONL objects, optionally gzip/zstd/bzip2 compressed
+  (detected from the key suffix or `Content-Encoding`, decompressed as a stream).
 
 What it does:
 - Uses DynamoDB as an idempotency store keyed by the S3 object identity (`bucket/key + etag`).
-- Reads the object, parses JSONL/JSON, normalizes records, and publishes to SQS in batches.
+- Streams the object in chunks, parses JSONL/JSON incrementally, normalizes records, and publishes
+  to SQS in batches (peak memory is bounded by the read chunk size, not the object size).
 - Emits structured logs + embedded metrics via AWS Lambda Powertools.
 
+Startup (what runs at init vs. on first use):
+- Imported at init: `boto3` and Powertools (logging, metrics, idempotency), used by every
+  invocation. Inside Lambda (`AWS_LAMBDA_FUNCTION_NAME` set) init also creates the boto3 clients.
+- Imported on first use: the process pool of `local` split mode.
+- `bench/bench_cold_start.py` and the import-time tests keep the init budget in check.
+
 Environment variables:
 - `QUEUE_URL` (required): Destination SQS queue URL.
 - `IDEMPOTENCY_TABLE` (required): DynamoDB table name for object locks.
 - `IDEMPOTENCY_TTL_SECONDS` (optional): TTL for idempotency records (default 30 days).
 - `LOCK_SECONDS` (optional, legacy): Backward-compatible alias for `IDEMPOTENCY_TTL_SECONDS`.
+- `IDEMPOTENCY_MODE` (optional): `powertools` (one idempotent call per object, default) or `batch`
+  (bulk claims/completions via `lambdas.shared.batch_idempotency`; objects processed concurrently).
+- `IDEMPOTENCY_IN_PROGRESS_SECONDS` (optional, batch mode): Claim lease before another invocation
+  may take over a crashed claim (default 900; keep it at or above the function timeout).
+- `INGEST_OBJECT_CONCURRENCY` (optional, batch mode): Objects processed in parallel (default 4).
+- `IDEMPOTENCY_CACHE_SIZE` (optional): Completed object IDs remembered in memory across warm
+  invocations; duplicates found there skip DynamoDB (default 10000; 0 disables).
+- `IDEMPOTENCY_CACHE_TTL_SECONDS` (optional): How long a cached ID is trusted (default 300, never
+  longer than `IDEMPOTENCY_TTL_SECONDS`, so an object is never skipped after its record expired).
+- `INGEST_READ_CHUNK_BYTES` (optional): S3 body read size for streaming parsing (default 1 MiB).
+- `SQS_PUBLISH_CONCURRENCY` (optional): Parallel `SendMessageBatch` calls (default 8; 1 = sequential).
+- `SQS_PUBLISH_MAX_IN_FLIGHT` (optional): Cap on outstanding batches (default 2x concurrency).
+- `SQS_PUBLISH_MAX_ATTEMPTS` (optional): Attempts per batch; only `Failed` entries are retried (default 5).
+- `SQS_MAX_BATCH_BYTES` (optional): Payload cap per `SendMessageBatch` call (default 1 MiB).
+- `SQS_ENVELOPE_ENABLED` (optional): Pack many records per SQS message (default false).
+- `SQS_ENVELOPE_MAX_BYTES` (optional): Byte budget per envelope message (default 256 KiB).
+- `INGEST_SPLIT_THRESHOLD_BYTES` (optional): Split plain JSONL objects larger than this into byte
+  ranges processed by separate workers (default 0 = never split).
+- `INGEST_SPLIT_RANGE_BYTES` (optional): Target range size (default 64 MiB).
+- `INGEST_SPLIT_MODE` (optional): `invoke` (async self-invocation per range, default) or `local`
+  (process pool inside this process; for local runs).
+- `INGEST_SPLIT_WORKERS` (optional): Process pool size for `local` mode (default: CPU count).
+- `INIT_PREWARM` (optional): `auto` (create clients at init only inside Lambda, default), `true` or `false`.
+- `STAGE_TIMING_SAMPLE_RATE` (optional): Fraction of invocations that emit per-stage time/bytes
+  metrics (`S3Get`, `Decompress`, `JsonParse`, `Normalize`, `Serialize`, `SqsPublish`; see
+  `lambdas.shared.timing`). Default 0 (off).
+- `PROFILE_SAMPLE_EVERY`, `PROFILE_MODE`, `PROFILE_OUTPUT` (optional): cProfile / tracemalloc 1 in N
+  invocations (see `lambdas.shared.profiling`). Default off.
+
+Split mode:
+- Ranges are half-open `[start, end)`; a range owns every line that *starts* inside it, so lines
+  straddling a boundary are read exactly once (see `iter_jsonl_range_records`).
+- Each range is its own idempotency record (`_object_id(...)` + `#bytes=start-end`), so a range is
+  processed exactly once no matter how often it is dispatched. The parent object record completes
+  once all ranges have been dispatched.
+- A range can also be processed by invoking the handler with
+  `{"ingest_range": {"bucket", "key", "etag", "start", "end"}}` (e.g. from a Step Functions Map state).
+- Compressed objects and bracketed JSON arrays are never split.
 """
 
-from typing import Any, Dict, List, Optional
+import os
+
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import boto3
 
@@ -24,51 +72,227 @@ from aws_lambda_powertools import Logger, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.idempotency import DynamoDBPersistenceLayer, IdempotencyConfig, idempotent_function
 
+from lambdas.shared import codec
+from lambdas.shared.batch_idempotency import BatchIdempotency
+from lambdas.shared.compression import detect_compression, open_decompressed
+from lambdas.shared.envelope import SQS_MAX_MESSAGE_BYTES, pack_envelopes
+from lambdas.shared.profiling import profiled
 from lambdas.shared.schemas import normalize_record
-from lambdas.shared.utils import env, iter_json_records, json_dumps, parse_s3_event_records
+from lambdas.shared.sqs_publisher import SQS_MAX_BATCH_BYTES, publish_batches
+from lambdas.shared.timing import StageTimer
+from lambdas.shared.ttl_cache import TTLCache
+from lambdas.shared.utils import (
+    DEFAULT_READ_CHUNK_BYTES,
+    bounded_map,
+    env,
+    iter_json_records_stream,
+    iter_jsonl_range_records,
+    json_dumps,
+    parse_s3_event_records,
+    plan_byte_ranges,
+    prewarm,
+)
 
 
 logger = Logger(service="serverless-elt.ingest")
 metrics = Metrics(namespace="ServerlessELT", service="ingest")
+timer = StageTimer()
+
+# Warm-start state: clients, idempotency processors and recently completed object IDs survive
+# between invocations of the same execution environment.
+_CLIENTS: Optional[Tuple[Any, Any, Any]] = None
+_PROCESSORS: Dict[Tuple[Any, ...], Any] = {}
+_COMPLETED: Optional[TTLCache] = None
 
 
 def _clients():
-    return (
-        boto3.client("s3"),
-        boto3.client("sqs"),
-        boto3.client("dynamodb"),
-    )
+    global _CLIENTS
+    if _CLIENTS is None:
+        _CLIENTS = (
+            boto3.client("s3"),
+            boto3.client("sqs"),
+            boto3.client("dynamodb"),
+        )
+    return _CLIENTS
+
 
+def _completed_cache(ttl_seconds: int) -> TTLCache:
+    global _COMPLETED
+    maxsize = int(env("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    cache_ttl = min(int(env("IDEMPOTENCY_CACHE_TTL_SECONDS", "300")), ttl_seconds)
+    if _COMPLETED is None or (_COMPLETED.maxsize, _COMPLETED.ttl_seconds) != (maxsize, cache_ttl):
+        _COMPLETED = TTLCache(maxsize, cache_ttl)
+    return _COMPLETED
 
-def _object_id(bucket: str, key: str, etag: str) -> str:
-    return f"s3://{bucket}/{key}#{etag}"
 
+def _reset_warm_state() -> None:
+    """Forget everything cached across invocations (tests, or after swapping clients)."""
+    global _CLIENTS, _COMPLETED
+    _CLIENTS = None
+    _COMPLETED = None
+    _PROCESSORS.clear()
 
-def _read_s3_text(s3, bucket: str, key: str) -> str:
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    return obj["Body"].read().decode("utf-8")
 
+def _lambda_client():
+    return boto3.client("lambda")
 
-def _enqueue_records(sqs, queue_url: str, records: List[Dict[str, Any]]) -> int:
-    sent = 0
-    entries: List[Dict[str, Any]] = []
-    for i, r in enumerate(records):
-        entries.append({"Id": str(i), "MessageBody": json_dumps(r)})
-        if len(entries) == 10:
-            resp = sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
-            failed = resp.get("Failed", [])
-            if failed:
-                raise RuntimeError(f"sqs_send_failed={len(failed)} first={failed[0].get('Message')}")
-            sent += len(entries)
-            entries = []
 
-    if entries:
-        resp = sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
-        failed = resp.get("Failed", [])
-        if failed:
-            raise RuntimeError(f"sqs_send_failed={len(failed)} first={failed[0].get('Message')}")
-        sent += len(entries)
-    return sent
+def _object_id(bucket: str, key: str, etag: str, byte_range: Optional[Tuple[int, int]] = None) -> str:
+    object_id = f"s3://{bucket}/{key}#{etag}"
+    if byte_range is not None:
+        object_id += f"#bytes={byte_range[0]}-{byte_range[1]}"
+    return object_id
+
+
+def _range_item(task: Dict[str, Any]) -> Dict[str, Any]:
+    bucket = task["bucket"]
+    key = task["key"]
+    etag = task.get("etag", "")
+    start, end = int(task["start"]), int(task["end"])
+    return {
+        "pk": _object_id(bucket, key, etag, (start, end)),
+        "bucket": bucket,
+        "key": key,
+        "etag": etag,
+        "range_start": start,
+        "range_end": end,
+    }
+
+
+def _open_s3_body(s3, bucket: str, key: str) -> Tuple[BinaryIO, BinaryIO]:
+    """Return `(raw_body, readable)` where `readable` transparently decompresses the raw S3 body."""
+    with timer.span("S3Get"):
+        obj = s3.get_object(Bucket=bucket, Key=key)
+    raw = timer.reader(obj["Body"], "S3Get")
+    compression = detect_compression(key, obj.get("ContentEncoding"))
+    if compression is None:
+        return raw, raw
+    return raw, timer.reader(open_decompressed(raw, compression), "Decompress")
+
+
+def _open_s3_range(s3, bucket: str, key: str, start: int) -> BinaryIO:
+    # Read from one byte before `start` to tell whether `start` begins a line; the reader stops
+    # shortly after the range end, and the caller closes the (open-ended) body.
+    with timer.span("S3Get"):
+        obj = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={max(start - 1, 0)}-")
+    return timer.reader(obj["Body"], "S3Get")
+
+
+def _plan_split(s3, bucket: str, key: str) -> Optional[List[Tuple[int, int]]]:
+    threshold = int(env("INGEST_SPLIT_THRESHOLD_BYTES", "0"))
+    if threshold <= 0:
+        return None
+    head = s3.head_object(Bucket=bucket, Key=key)
+    size = int(head["ContentLength"])
+    if size <= threshold or detect_compression(key, head.get("ContentEncoding")):
+        return None
+    probe = s3.get_object(Bucket=bucket, Key=key, Range="bytes=0-4095")["Body"].read()
+    if probe.lstrip()[:1] == b"[":
+        return None
+    return plan_byte_ranges(size, int(env("INGEST_SPLIT_RANGE_BYTES", str(64 * 1024 * 1024))))
+
+
+def _process_range_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool entry point for `local` split mode (runs in a child process)."""
+    s3, sqs, ddb = _clients()
+    if env("IDEMPOTENCY_MODE", "powertools").lower() == "batch":
+        store = _batch_store(ddb, task["table_name"], task["ttl_seconds"])
+        outcomes = list(_process_batch([_range_item(task)], store=store, s3=s3, sqs=sqs, queue_url=task["queue_url"], function_name=None))
+        return outcomes[0][1]
+    process_object = _get_idempotent_processor(
+        table_name=task["table_name"], ttl_seconds=task["ttl_seconds"], ddb_client=ddb, lambda_context=None
+    )
+    return process_object(item=_range_item(task), s3=s3, sqs=sqs, queue_url=task["queue_url"])
+
+
+def _dispatch_ranges(
+    *,
+    bucket: str,
+    key: str,
+    etag: str,
+    object_id: str,
+    ranges: List[Tuple[int, int]],
+    queue_url: str,
+    function_name: Optional[str],
+) -> Dict[str, Any]:
+    tasks = [{"bucket": bucket, "key": key, "etag": etag, "start": start, "end": end} for start, end in ranges]
+    mode = env("INGEST_SPLIT_MODE", "invoke").lower()
+    _log("ingest_split", object_id=object_id, ranges=len(ranges), mode=mode)
+
+    if mode == "local":
+        from concurrent.futures import ProcessPoolExecutor
+
+        ttl_seconds = _ttl_seconds()
+        table_name = env("IDEMPOTENCY_TABLE")
+        workers = int(env("INGEST_SPLIT_WORKERS", str(os.cpu_count() or 1)))
+        totals = {"records": 0, "enqueued": 0, "dropped": 0, "ranges": len(ranges), "ranges_skipped": 0}
+        # Forked children inherit this process's warm state; boto3 clients and Powertools
+        # processors are not fork-safe, so each child starts cold.
+        with ProcessPoolExecutor(max_workers=workers, initializer=_reset_warm_state) as pool:
+            work = [{**t, "table_name": table_name, "ttl_seconds": ttl_seconds, "queue_url": queue_url} for t in tasks]
+            for result in pool.map(_process_range_task, work):
+                if result.get("cached") is True:
+                    totals["ranges_skipped"] += 1
+                    continue
+                for k in ("records", "enqueued", "dropped"):
+                    totals[k] += int(result.get(k, 0))
+        return totals
+
+    if mode != "invoke":
+        raise ValueError(f"Unsupported INGEST_SPLIT_MODE: {mode}")
+    function_name = function_name or env("AWS_LAMBDA_FUNCTION_NAME")
+    client = _lambda_client()
+    for task in tasks:
+        client.invoke(FunctionName=function_name, InvocationType="Event", Payload=json_dumps({"ingest_range": task}))
+    return {"records": 0, "enqueued": 0, "dropped": 0, "ranges": len(ranges), "ranges_skipped": 0}
+
+
+def _iter_normalized(
+    objs: Iterable[Dict[str, Any]],
+    *,
+    source: Dict[str, Any],
+    object_id: str,
+    counts: Dict[str, int],
+) -> Iterator[Dict[str, Any]]:
+    for line_no, obj in enumerate(objs, start=1):
+        try:
+            normalized = normalize_record(obj)
+        except Exception as e:
+            counts["dropped"] += 1
+            _log("ingest_drop_bad_record", object_id=object_id, line_no=line_no, error=str(e))
+            continue
+        normalized["_source"] = {**source, "line_no": line_no}
+        counts["records"] += 1
+        yield normalized
+
+
+def _enqueue_records(sqs, queue_url: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Publish records to SQS and return how many records (not messages) were enqueued."""
+    counts = {"records": 0, "bytes": 0}
+
+    def _bodies() -> Iterator[str]:
+        for r in records:
+            counts["records"] += 1
+            body = json_dumps(r)
+            counts["bytes"] += len(body)
+            yield body
+
+    bodies: Iterable[str] = timer.iter(_bodies(), "Serialize")
+    if env("SQS_ENVELOPE_ENABLED", "false").lower() == "true":
+        bodies = pack_envelopes(bodies, max_bytes=int(env("SQS_ENVELOPE_MAX_BYTES", str(SQS_MAX_MESSAGE_BYTES))))
+
+    with timer.span("SqsPublish") as span:
+        publish_batches(
+            sqs,
+            queue_url,
+            bodies,
+            concurrency=int(env("SQS_PUBLISH_CONCURRENCY", "8")),
+            max_in_flight=int(env("SQS_PUBLISH_MAX_IN_FLIGHT", "0")),
+            max_attempts=int(env("SQS_PUBLISH_MAX_ATTEMPTS", "5")),
+            max_batch_bytes=int(env("SQS_MAX_BATCH_BYTES", str(SQS_MAX_BATCH_BYTES))),
+        )
+        span.add_bytes(counts["bytes"])
+    return counts["records"]
 
 
 def _log(event: str, **fields: Any) -> None:
@@ -82,6 +306,15 @@ def _cached_response_hook(response: Any, data_record: Any) -> Any:
 
 
 def _get_idempotent_processor(table_name: str, ttl_seconds: int, ddb_client: Any, lambda_context: Any):
+    # Keyed by client identity: a cached processor keeps its client alive, so the id is never reused.
+    cache_key = (table_name, ttl_seconds, id(ddb_client))
+    cached = _PROCESSORS.get(cache_key)
+    if cached is not None:
+        config, process_object = cached
+        if lambda_context is not None:
+            config.register_lambda_context(lambda_context)
+        return process_object
+
     config = IdempotencyConfig(
         event_key_jmespath="pk",
         expires_after_seconds=ttl_seconds,
@@ -100,59 +333,184 @@ def _get_idempotent_processor(table_name: str, ttl_seconds: int, ddb_client: Any
     )
 
     @idempotent_function(data_keyword_argument="item", persistence_store=persistence, config=config)
-    def _process_object(*, item: Dict[str, Any], s3: Any, sqs: Any, queue_url: str) -> Dict[str, Any]:
-        bucket = item["bucket"]
-        key = item["key"]
-        etag = item.get("etag", "")
-        object_id = item["pk"]
+    def _process_object(
+        *, item: Dict[str, Any], s3: Any, sqs: Any, queue_url: str, function_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return _process_item(item=item, s3=s3, sqs=sqs, queue_url=queue_url, function_name=function_name)
+
+    _PROCESSORS.clear()
+    _PROCESSORS[cache_key] = (config, _process_object)
+    return _process_object
 
-        text = _read_s3_text(s3, bucket, key)
-        records: List[Dict[str, Any]] = []
-        dropped = 0
-        for line_no, obj in enumerate(iter_json_records(text), start=1):
-            try:
-                normalized = normalize_record(obj)
-            except Exception as e:
-                dropped += 1
-                _log("ingest_drop_bad_record", object_id=object_id, line_no=line_no, error=str(e))
-                continue
-            normalized["_source"] = {"bucket": bucket, "key": key, "etag": etag, "line_no": line_no}
-            records.append(normalized)
 
+def _process_item(
+    *, item: Dict[str, Any], s3: Any, sqs: Any, queue_url: str, function_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """Ingest one object (or byte range); callers wrap this in an idempotency layer."""
+    bucket = item["bucket"]
+    key = item["key"]
+    etag = item.get("etag", "")
+    object_id = item["pk"]
+    source: Dict[str, Any] = {"bucket": bucket, "key": key, "etag": etag}
+
+    chunk_size = int(env("INGEST_READ_CHUNK_BYTES", str(DEFAULT_READ_CHUNK_BYTES)))
+    if "range_start" in item:
+        start, end = int(item["range_start"]), int(item["range_end"])
+        source["byte_range"] = [start, end]
+        raw = body = _open_s3_range(s3, bucket, key, start)
+        objs = timer.iter(iter_jsonl_range_records(body, start=start, end=end, chunk_size=chunk_size), "JsonParse")
+    else:
+        ranges = _plan_split(s3, bucket, key)
+        if ranges:
+            return _dispatch_ranges(
+                bucket=bucket,
+                key=key,
+                etag=etag,
+                object_id=object_id,
+                ranges=ranges,
+                queue_url=queue_url,
+                function_name=function_name,
+            )
+        raw, body = _open_s3_body(s3, bucket, key)
+        objs = timer.iter(iter_json_records_stream(body, chunk_size), "JsonParse")
+
+    counts = {"records": 0, "dropped": 0}
+    try:
+        records = timer.iter(_iter_normalized(objs, source=source, object_id=object_id, counts=counts), "Normalize")
         enq = _enqueue_records(sqs, queue_url, records)
-        _log("ingest_object_done", object_id=object_id, records=len(records), enqueued=enq, dropped=dropped)
-        return {"records": len(records), "enqueued": enq, "dropped": dropped}
+    finally:
+        for stream in (body, raw):
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+    _log("ingest_object_done", object_id=object_id, records=counts["records"], enqueued=enq, dropped=counts["dropped"])
+    return {"records": counts["records"], "enqueued": enq, "dropped": counts["dropped"]}
+
+
+def _process_batch(
+    items: List[Dict[str, Any]],
+    *,
+    store: BatchIdempotency,
+    s3: Any,
+    sqs: Any,
+    queue_url: str,
+    function_name: Optional[str],
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Batch idempotency: claim all objects in bulk, process the claimed ones concurrently, then
+    complete successes and release failures in bulk. Yields `(item, result)` for already-completed
+    objects, then for processed ones once their completion is stored; raises after the bookkeeping
+    if any object failed or is held by another invocation, so the event is retried (completed
+    objects are skipped on retry).
+    """
+    claim = store.claim([item["pk"] for item in items])
+    claimed = set(claim.claimed)
+    for item in items:
+        if item["pk"] in claim.completed:
+            yield item, {**claim.completed[item["pk"]], "cached": True}
+
+    def _run(item: Dict[str, Any]) -> Dict[str, Any]:
+        return _process_item(item=item, s3=s3, sqs=sqs, queue_url=queue_url, function_name=function_name)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    failed: List[str] = []
+    todo = [item for item in items if item["pk"] in claimed]
+    for item, error, result in bounded_map(
+        _run, todo, concurrency=int(env("INGEST_OBJECT_CONCURRENCY", "4")), thread_name_prefix="ingest-object"
+    ):
+        if error is not None:
+            _log("ingest_object_error", object_id=item["pk"], error=str(error))
+            failed.append(item["pk"])
+            continue
+        results[item["pk"]] = result
+
+    store.complete(results)
+    if failed:
+        store.release(failed)
+    for item in todo:
+        if item["pk"] in results:
+            yield item, results[item["pk"]]
+    if failed or claim.in_progress:
+        raise RuntimeError(f"{len(failed)} object(s) failed, {len(claim.in_progress)} in progress elsewhere; retrying")
+
+
+def _batch_store(ddb: Any, table_name: str, ttl_seconds: int) -> BatchIdempotency:
+    return BatchIdempotency(
+        ddb, table_name, ttl_seconds=ttl_seconds, in_progress_seconds=int(env("IDEMPOTENCY_IN_PROGRESS_SECONDS", "900"))
+    )
 
-    return _process_object
+
+def _ttl_seconds() -> int:
+    return int(env("IDEMPOTENCY_TTL_SECONDS", env("LOCK_SECONDS", str(30 * 24 * 60 * 60))))
 
 
 @metrics.log_metrics(capture_cold_start_metric=True)
+@profiled("ingest")
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     queue_url = env("QUEUE_URL")
     table_name = env("IDEMPOTENCY_TABLE")
-    ttl_seconds = int(env("IDEMPOTENCY_TTL_SECONDS", env("LOCK_SECONDS", str(30 * 24 * 60 * 60))))
+    ttl_seconds = _ttl_seconds()
+    timer.begin(float(env("STAGE_TIMING_SAMPLE_RATE", "0")))
 
     s3, sqs, ddb = _clients()
-    objects = parse_s3_event_records(event)
+    if isinstance(event.get("ingest_range"), dict):
+        items = [_range_item(event["ingest_range"])]
+    else:
+        items = [
+            {"pk": _object_id(bucket, key, etag), "bucket": bucket, "key": key, "etag": etag}
+            for bucket, key, etag in parse_s3_event_records(event)
+        ]
     total_records = 0
     total_enqueued = 0
     skipped = 0
     dropped = 0
-
-    metrics.add_metric(name="ObjectsReceived", unit=MetricUnit.Count, value=len(objects))
-    _log("ingest_start", objects=len(objects))
+    ranges = 0
+
+    metrics.add_metric(name="ObjectsReceived", unit=MetricUnit.Count, value=len(items))
+    _log("ingest_start", objects=len(items))
+
+    # Duplicates completed recently in this execution environment never reach DynamoDB.
+    completed = _completed_cache(ttl_seconds)
+    pending = items
+    if completed.maxsize > 0:
+        pending = [item for item in items if (table_name, item["pk"]) not in completed]
+        cache_hits = len(items) - len(pending)
+        skipped += cache_hits
+        if cache_hits:
+            _log("ingest_skip_idempotent_cached", objects=cache_hits)
+        metrics.add_metric(name="IdempotencyCacheHits", unit=MetricUnit.Count, value=cache_hits)
+        metrics.add_metric(name="IdempotencyCacheMisses", unit=MetricUnit.Count, value=len(pending))
 
     lambda_context = context if hasattr(context, "get_remaining_time_in_millis") else None
-    process_object = _get_idempotent_processor(table_name=table_name, ttl_seconds=ttl_seconds, ddb_client=ddb, lambda_context=lambda_context)
-    for bucket, key, etag in objects:
-        object_id = _object_id(bucket, key, etag)
-        item = {"pk": object_id, "bucket": bucket, "key": key, "etag": etag}
-        try:
-            result = process_object(item=item, s3=s3, sqs=sqs, queue_url=queue_url)
-        except Exception as e:
-            _log("ingest_object_error", object_id=object_id, error=str(e))
-            raise
-
+    function_name = getattr(context, "function_name", None)
+    mode = env("IDEMPOTENCY_MODE", "powertools").lower()
+    if mode == "batch":
+        # Duplicate notifications of one object collapse into a single claim.
+        unique_items = list({item["pk"]: item for item in pending}.values())
+        store = _batch_store(ddb, table_name, ttl_seconds)
+        outcomes: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]] = _process_batch(
+            unique_items, store=store, s3=s3, sqs=sqs, queue_url=queue_url, function_name=function_name
+        )
+    elif mode == "powertools":
+        process_object = _get_idempotent_processor(
+            table_name=table_name, ttl_seconds=ttl_seconds, ddb_client=ddb, lambda_context=lambda_context
+        )
+
+        def _sequential() -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+            for item in pending:
+                try:
+                    yield item, process_object(item=item, s3=s3, sqs=sqs, queue_url=queue_url, function_name=function_name)
+                except Exception as e:
+                    _log("ingest_object_error", object_id=item["pk"], error=str(e))
+                    raise
+
+        outcomes = _sequential()
+    else:
+        raise ValueError(f"Unsupported IDEMPOTENCY_MODE: {mode}")
+
+    for item, result in outcomes:
+        object_id = item["pk"]
+        completed.set((table_name, object_id))
         if isinstance(result, dict) and result.get("cached") is True:
             skipped += 1
             metrics.add_metric(name="ObjectsSkippedIdempotent", unit=MetricUnit.Count, value=1)
@@ -162,6 +520,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         total_records += int(result.get("records", 0))
         total_enqueued += int(result.get("enqueued", 0))
         dropped += int(result.get("dropped", 0))
+        ranges += int(result.get("ranges", 0))
 
     metrics.add_metric(name="RecordsEnqueued", unit=MetricUnit.Count, value=total_enqueued)
     metrics.add_metric(name="RecordsParsed", unit=MetricUnit.Count, value=total_records)
@@ -169,23 +528,32 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         metrics.add_metric(name="RecordsDropped", unit=MetricUnit.Count, value=dropped)
     if skipped:
         metrics.add_metric(name="ObjectsSkippedIdempotent", unit=MetricUnit.Count, value=skipped)
+    if ranges:
+        metrics.add_metric(name="RangesDispatched", unit=MetricUnit.Count, value=ranges)
+    timings = timer.emit(metrics)
+    if timings:
+        _log("ingest_stage_timings", stages=timings)
 
     return {
-        "objects": len(objects),
+        "objects": len(items),
         "records": total_records,
         "enqueued": total_enqueued,
         "skipped": skipped,
         "dropped": dropped,
+        "ranges": ranges,
         "request_id": getattr(context, "aws_request_id", None),
     }
 
 
+prewarm(_clients)
+
+
 # Local quick check (optional): `python -c 'import json; from lambdas.ingest.app import handler; ...'`
 def _main() -> int:
     import sys
 
-    event = json.loads(sys.stdin.read())
-    print(json.dumps(handler(event, context=None), indent=2))
+    event = codec.loads(sys.stdin.read())
+    print(json_dumps(handler(event, context=None)))
     return 0
 
 
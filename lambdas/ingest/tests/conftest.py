@@ -0,0 +1,24 @@
+import pytest
+
+import lambdas.ingest.app as ingest
+
+
+@pytest.fixture(autouse=True)
+def _cold_start():
+    # Warm-start caches would otherwise carry completed object IDs from one test into the next.
+    ingest._reset_warm_state()
+    yield
+    ingest._reset_warm_state()
+
+
+@pytest.fixture
+def ingest_aws(mock_aws, make_bucket, make_table, monkeypatch):
+    """Moto `bronze-bucket`, queue `q` and table `tbl` wired into the handler; yields `(s3, sqs, ddb, queue_url)`."""
+    s3 = make_bucket("bronze-bucket")
+    ddb = make_table("tbl")
+    sqs = mock_aws.client("sqs")
+    queue_url = sqs.create_queue(QueueName="q")["QueueUrl"]
+    monkeypatch.setenv("QUEUE_URL", queue_url)
+    monkeypatch.setenv("IDEMPOTENCY_TABLE", "tbl")
+    monkeypatch.setattr(ingest, "_clients", lambda: (s3, sqs, ddb))
+    yield s3, sqs, ddb, queue_url
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+import lambdas.ingest.app as ingest
+from lambdas.shared.batch_idempotency import BatchIdempotency
+
+
+@pytest.fixture
+def aws(ingest_aws, monkeypatch):
+    monkeypatch.setenv("IDEMPOTENCY_MODE", "batch")
+    yield ingest_aws
+
+
+CONTEXT = type("C", (), {"function_name": "serverless-elt-ingest", "aws_request_id": "r1"})()
+
+
+def _drain(sqs, queue_url):
+    ids = []
+    while True:
+        msgs = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get("Messages", [])
+        if not msgs:
+            return sorted(ids)
+        for m in msgs:
+            ids.append(json.loads(m["Body"])["shipment_id"])
+            sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=m["ReceiptHandle"])
+
+
+def _event(keys):
+    return {"Records": [{"s3": {"bucket": {"name": "bronze-bucket"}, "object": {"key": k, "eTag": "e1"}}} for k in keys]}
+
+
+def test_batch_mode_processes_each_object_exactly_once(aws, monkeypatch):
+    s3, sqs, ddb, queue_url = aws
+    keys = [f"bronze/shipments/{i}.jsonl" for i in range(120)]  # more than one 100-item transaction
+    for i, key in enumerate(keys):
+        body = json.dumps({"record_type": "shipments", "event_time": "2025-01-01T00:00:00Z", "shipment_id": f"shp_{i}"})
+        s3.put_object(Bucket="bronze-bucket", Key=key, Body=body.encode())
+    s3.put_object(Bucket="bronze-bucket", Key="bronze/shipments/broken.jsonl", Body=b"")
+
+    real = ingest._process_item
+
+    def _flaky(*, item, **kwargs):
+        if item["key"].endswith("broken.jsonl"):
+            raise RuntimeError("boom")
+        return real(item=item, **kwargs)
+
+    monkeypatch.setattr(ingest, "_process_item", _flaky)
+    calls = []
+    real_transact = ddb.transact_write_items
+    monkeypatch.setattr(ddb, "transact_write_items", lambda **kw: calls.append(len(kw["TransactItems"])) or real_transact(**kw))
+
+    # Duplicate notification for key 0 inside the event; one object fails -> the event is retried.
+    with pytest.raises(RuntimeError):
+        ingest.handler(_event(keys + keys[:1] + ["bronze/shipments/broken.jsonl"]), context=CONTEXT)
+    assert calls == [100, 21]
+    assert _drain(sqs, queue_url) == sorted(f"shp_{i}" for i in range(120))
+
+    # Retry: completed objects are skipped, the released one is claimed again.
+    monkeypatch.setattr(ingest, "_process_item", real)
+    resp = ingest.handler(_event(keys + ["bronze/shipments/broken.jsonl"]), context=CONTEXT)
+    assert resp["skipped"] == 120 and resp["records"] == 0
+    assert _drain(sqs, queue_url) == []
+
+
+def test_claims_exclude_live_holders_and_take_over_expired_ones(aws):
+    _, _, ddb, _ = aws
+    now = [1000.0]
+    a = BatchIdempotency(ddb, "tbl", ttl_seconds=3600, in_progress_seconds=60, clock=lambda: now[0])
+    b = BatchIdempotency(ddb, "tbl", ttl_seconds=3600, in_progress_seconds=60, clock=lambda: now[0])
+
+    assert a.claim(["x", "y"]).claimed == ["x", "y"]
+    a.complete({"x": {"records": 1}})
+
+    second = b.claim(["x", "y", "z"])
+    assert second.claimed == ["z"]
+    assert second.completed == {"x": {"records": 1}} and second.in_progress == ["y"]
+
+    # Holder of "y" crashed: after its lease expires another invocation takes it over.
+    now[0] += 61
+    assert b.claim(["y"]).claimed == ["y"]
+
+
+def test_release_keeps_claims_taken_over_by_another_invocation(aws):
+    _, _, ddb, _ = aws
+    now = [1000.0]
+    a = BatchIdempotency(ddb, "tbl", ttl_seconds=3600, in_progress_seconds=60, clock=lambda: now[0])
+    b = BatchIdempotency(ddb, "tbl", ttl_seconds=3600, in_progress_seconds=60, clock=lambda: now[0])
+
+    assert a.claim(["x", "y"]).claimed == ["x", "y"]
+    now[0] += 61
+    assert b.claim(["y"]).claimed == ["y"]
+
+    # `a` outlived its lease: releasing must not drop `b`'s claim of "y".
+    a.release(["x", "y"])
+    assert "Item" not in ddb.get_item(TableName="tbl", Key={"pk": {"S": "x"}})
+    assert ddb.get_item(TableName="tbl", Key={"pk": {"S": "y"}})["Item"]["claim_token"]["S"] == b.token
+
+    b.complete({"y": {"records": 1}})
+    b.release(["y"])  # completed records are never released
+    assert ddb.get_item(TableName="tbl", Key={"pk": {"S": "y"}})["Item"]["status"]["S"] == "COMPLETED"
+
+
+class _ConflictError(Exception):
+    def __init__(self, code):
+        self.response = {"Error": {"Code": code}}
+
+
+def test_transaction_conflicts_and_unprocessed_items_back_off_then_give_up():
+    class _Busy:
+        def __init__(self, conflicts):
+            self.conflicts = conflicts
+
+        def transact_write_items(self, TransactItems):
+            if self.conflicts:
+                self.conflicts -= 1
+                raise _ConflictError("TransactionConflictException")
+
+        def batch_write_item(self, RequestItems):
+            return {"UnprocessedItems": RequestItems}
+
+    sleeps = []
+    store = BatchIdempotency(_Busy(2), "tbl", ttl_seconds=60, max_attempts=3, backoff_base_seconds=0.1, sleep=sleeps.append)
+    assert store.claim(["x"]).claimed == ["x"]
+    assert len(sleeps) == 2 and 0.05 <= sleeps[0] <= 0.1 and 0.1 <= sleeps[1] <= 0.2
+
+    sleeps.clear()
+    with pytest.raises(RuntimeError, match="Could not claim"):
+        BatchIdempotency(_Busy(5), "tbl", ttl_seconds=60, max_attempts=3, sleep=sleeps.append).claim(["x"])
+    assert len(sleeps) == 2  # no sleep after the last attempt
+
+    sleeps.clear()
+    with pytest.raises(RuntimeError, match="UnprocessedItems=1 attempts=3"):
+        store.complete({"x": {}})
+    assert len(sleeps) == 2
+
+
+def test_objects_are_cached_as_completed_only_after_the_store_persists_them(aws, monkeypatch):
+    s3, _, ddb, _ = aws
+    key = "bronze/shipments/a.jsonl"
+    body = json.dumps({"record_type": "shipments", "event_time": "2025-01-01T00:00:00Z", "shipment_id": "shp_1"})
+    s3.put_object(Bucket="bronze-bucket", Key=key, Body=body.encode())
+
+    def _unavailable(self, results):
+        raise RuntimeError("dynamodb down")
+
+    monkeypatch.setattr(BatchIdempotency, "complete", _unavailable)
+    with pytest.raises(RuntimeError, match="dynamodb down"):
+        ingest.handler(_event([key]), context=CONTEXT)
+
+    # The claim stays INPROGRESS until its lease expires; a warm retry must not skip the object.
+    object_id = f"s3://bronze-bucket/{key}#e1"
+    assert ddb.get_item(TableName="tbl", Key={"pk": {"S": object_id}})["Item"]["status"]["S"] == "INPROGRESS"
+    assert ("tbl", object_id) not in ingest._COMPLETED
@@ -1,4 +1,5 @@
-import pytest
+import io
+
 from botocore.stub import ANY, Stubber
 
 import lambdas.ingest.app as ingest
@@ -6,10 +7,13 @@ import lambdas.ingest.app as ingest
 
 class _Body:
     def __init__(self, b: bytes):
-        self._b = b
+        self._b = io.BytesIO(b)
+
+    def read(self, amt=None):
+        return self._b.read(amt)
 
-    def read(self):
-        return self._b
+    def close(self):
+        self._b.close()
 
 
 def test_ingest_enqueues_and_marks_processed(monkeypatch):
@@ -128,3 +132,125 @@ def test_ingest_skips_when_lock_not_acquired(monkeypatch):
 
     assert resp["skipped"] == 1
     assert resp["records"] == 0
+
+
+def test_warm_duplicates_skip_dynamodb(monkeypatch):
+    s3 = ingest.boto3.client("s3")
+    sqs = ingest.boto3.client("sqs")
+    ddb = ingest.boto3.client("dynamodb")
+    monkeypatch.setenv("QUEUE_URL", "https://sqs.example/123/q")
+    monkeypatch.setenv("IDEMPOTENCY_TABLE", "tbl")
+    monkeypatch.setattr(ingest, "_clients", lambda: (s3, sqs, ddb))
+    added = []
+    monkeypatch.setattr(ingest.metrics, "add_metric", lambda name, unit, value: added.append((name, value)))
+    ctx = type("C", (), {"function_name": "serverless-elt-ingest", "get_remaining_time_in_millis": lambda self: 10000})()
+    event = {"Records": [{"s3": {"bucket": {"name": "bronze-bucket"}, "object": {"key": "bronze/shipments/a.jsonl", "eTag": "etag1"}}}]}
+
+    s3_stubber, sqs_stubber, ddb_stubber = Stubber(s3), Stubber(sqs), Stubber(ddb)
+    ddb_stubber.add_response("put_item", {}, None)
+    s3_stubber.add_response("get_object", {"Body": _Body(b'{"record_type":"shipments","event_time":"2025-01-01T00:00:00Z","shipment_id":"shp_1"}\n')})
+    sqs_stubber.add_response("send_message_batch", {"Successful": [{"Id": "0", "MessageId": "m1", "MD5OfMessageBody": "x"}], "Failed": []})
+    ddb_stubber.add_response("update_item", {}, None)
+
+    with s3_stubber, sqs_stubber, ddb_stubber:
+        assert ingest.handler(event, context=ctx)["enqueued"] == 1
+        processor = ingest._PROCESSORS[("tbl", ingest._ttl_seconds(), id(ddb))]
+        # No stubbed responses left: any DynamoDB call on the duplicate would raise.
+        assert ingest.handler(event, context=ctx)["skipped"] == 1
+        ddb_stubber.assert_no_pending_responses()
+
+    assert ingest._PROCESSORS[("tbl", ingest._ttl_seconds(), id(ddb))] is processor
+    assert ("IdempotencyCacheMisses", 1) in added and ("IdempotencyCacheHits", 1) in added
+
+
+def test_completed_cache_ttl_never_exceeds_record_ttl(monkeypatch):
+    monkeypatch.setenv("IDEMPOTENCY_CACHE_TTL_SECONDS", "300")
+    assert ingest._completed_cache(60).ttl_seconds == 60
+    assert ingest._completed_cache(3600).ttl_seconds == 300
+
+
+def test_split_mode_processes_each_range_exactly_once(ingest_aws, monkeypatch):
+    import json
+
+    s3, sqs, _, queue_url = ingest_aws
+    monkeypatch.setenv("INGEST_SPLIT_THRESHOLD_BYTES", "1000")
+    monkeypatch.setenv("INGEST_SPLIT_RANGE_BYTES", "700")
+    monkeypatch.setenv("INGEST_SPLIT_MODE", "invoke")
+
+    lines = [
+        json.dumps({"record_type": "shipments", "event_time": "2025-01-01T00:00:00Z", "shipment_id": f"shp_{i}"})
+        for i in range(100)
+    ]
+    body = ("\n".join(lines) + "\n").encode()
+
+    s3.put_object(Bucket="bronze-bucket", Key="bronze/shipments/big.jsonl", Body=body)
+
+    invoked = []
+
+    class _FakeLambda:
+        def invoke(self, FunctionName, InvocationType, Payload):
+            invoked.append(json.loads(Payload))
+
+    monkeypatch.setattr(ingest, "_lambda_client", lambda: _FakeLambda())
+    ctx = type("C", (), {"function_name": "serverless-elt-ingest", "aws_request_id": "r1"})()
+
+    event = {"Records": [{"s3": {"bucket": {"name": "bronze-bucket"}, "object": {"key": "bronze/shipments/big.jsonl", "eTag": "e1"}}}]}
+    resp = ingest.handler(event, context=ctx)
+    expected_ranges = -(-len(body) // 700)
+    assert resp["ranges"] == expected_ranges
+    assert len(invoked) == expected_ranges
+    # The parent object is now complete: a duplicate notification does not fan out again.
+    assert ingest.handler(event, context=ctx)["skipped"] == 1
+    assert len(invoked) == expected_ranges
+
+    enqueued = 0
+    for range_event in invoked + invoked:  # every range delivered twice
+        enqueued += ingest.handler(range_event, context=ctx)["enqueued"]
+    assert enqueued == len(lines)
+
+    received = []
+    while True:
+        msgs = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get("Messages", [])
+        if not msgs:
+            break
+        received.extend(json.loads(m["Body"])["shipment_id"] for m in msgs)
+    assert sorted(received) == sorted(f"shp_{i}" for i in range(100))
+
+
+def test_local_split_workers_start_without_parent_warm_state(monkeypatch):
+    import concurrent.futures
+
+    monkeypatch.setenv("IDEMPOTENCY_TABLE", "tbl")
+    monkeypatch.setenv("INGEST_SPLIT_MODE", "local")
+    seen = []
+
+    class _InlinePool:
+        """Stands in for a forked pool: the child starts with a copy of the parent's globals."""
+
+        def __init__(self, max_workers, initializer=None):
+            self.initializer = initializer
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, fn, tasks):
+            ingest._CLIENTS = ("parent-s3", "parent-sqs", "parent-ddb")
+            ingest._PROCESSORS["parent"] = object()
+            if self.initializer is not None:
+                self.initializer()
+            return [fn(task) for task in tasks]
+
+    def _task(task):
+        seen.append((ingest._CLIENTS, dict(ingest._PROCESSORS)))
+        return {"records": 1, "enqueued": 1}
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", _InlinePool)
+    monkeypatch.setattr(ingest, "_process_range_task", _task)
+    totals = ingest._dispatch_ranges(
+        bucket="b", key="k", etag="e", object_id="s3://b/k#e", ranges=[(0, 10), (10, 20)], queue_url="q", function_name=None
+    )
+    assert totals["enqueued"] == 2
+    assert seen == [(None, {}), (None, {})]
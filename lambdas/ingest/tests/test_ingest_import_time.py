@@ -0,0 +1,4 @@
+def test_ingest_init_defers_rarely_used_imports(imported_modules):
+    imported = imported_modules("lambdas.ingest.app", INIT_PREWARM="false")
+    assert "aws_lambda_powertools.utilities.idempotency" in imported
+    assert "concurrent.futures.process" not in imported and "pyarrow" not in imported
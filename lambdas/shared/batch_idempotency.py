@@ -0,0 +1,218 @@
+"""
+Batch idempotency store: claim, complete and release many object IDs per DynamoDB request.
+
+Why this exists:
+- Powertools `idempotent_function` costs a conditional `PutItem` before and an `UpdateItem` after
+  each object, serially, so a notification batch of hundreds of objects pays hundreds of round trips
+  before any work runs in parallel.
+- Here claims go out as `TransactWriteItems` (up to 100 conditional puts per request), results are
+  stored with `BatchWriteItem` (25 per request), and the caller processes every claimed object
+  concurrently in between.
+
+Record layout (same table and attribute names as the Powertools layer, so the TTL applies):
+- `pk`: object ID, `status`: INPROGRESS | COMPLETED, `data`: JSON result,
+  `expires_at` (epoch seconds, table TTL), `in_progress_expires_at` (epoch ms),
+  `claim_token`: the claiming store's token (INPROGRESS only).
+- Powertools hashes its keys, so switching `IDEMPOTENCY_MODE` starts from an empty history.
+
+Claim semantics: an ID is claimed only if it has no record, its record expired, or it is
+INPROGRESS past `in_progress_expires_at` (holder crashed). A transaction is all-or-nothing, so when
+some puts fail their condition the conflicting IDs are read back, classified (completed or held
+elsewhere), and the transaction is retried with the rest. Transaction conflicts and unprocessed
+batch items are retried with jittered exponential backoff, up to `max_attempts`.
+
+Release only deletes a claim still holding this store's token, so a store whose lease expired
+cannot delete a claim another invocation has since taken over.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict, List, Mapping, Sequence
+
+from lambdas.shared.utils import drain_unprocessed, jittered_backoff, new_id
+
+
+STATUS_IN_PROGRESS = "INPROGRESS"
+STATUS_COMPLETED = "COMPLETED"
+
+_CLAIM_CONDITION = "attribute_not_exists(pk) OR expires_at < :now OR (#status = :inprogress AND in_progress_expires_at < :now_ms)"
+_RELEASE_CONDITION = "#status = :inprogress AND claim_token = :token"
+
+
+def _error_code(e: Exception) -> str:
+    return getattr(e, "response", {}).get("Error", {}).get("Code", "")
+
+
+class ClaimResult:
+    __slots__ = ("claimed", "completed", "in_progress")
+
+    def __init__(self) -> None:
+        self.claimed: List[str] = []
+        # Results of IDs already completed by an earlier invocation.
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        # IDs currently held by another live invocation.
+        self.in_progress: List[str] = []
+
+
+class BatchIdempotency:
+    def __init__(
+        self,
+        ddb: Any,
+        table_name: str,
+        *,
+        ttl_seconds: int,
+        in_progress_seconds: int = 900,
+        clock=time.time,
+        max_attempts: int = 10,
+        backoff_base_seconds: float = 0.05,
+        backoff_max_seconds: float = 2.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.ddb = ddb
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.in_progress_seconds = in_progress_seconds
+        self.clock = clock
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.sleep = sleep
+        self.token = new_id()
+
+    def _drain(self, call: Callable[[Dict[str, Any]], Dict[str, Any]], request: Dict[str, Any], unprocessed_key: str) -> List[Dict[str, Any]]:
+        return drain_unprocessed(
+            call,
+            request,
+            unprocessed_key,
+            max_attempts=self.max_attempts,
+            backoff_base_seconds=self.backoff_base_seconds,
+            backoff_max_seconds=self.backoff_max_seconds,
+            sleep=self.sleep,
+        )
+
+    def _backoff(self, attempt: int) -> None:
+        if attempt < self.max_attempts:
+            self.sleep(jittered_backoff(attempt, self.backoff_base_seconds, self.backoff_max_seconds))
+
+    def _read(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        items: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(ids), 100):
+            request = {self.table_name: {"Keys": [{"pk": {"S": pk}} for pk in ids[i : i + 100]], "ConsistentRead": True}}
+            for resp in self._drain(lambda r: self.ddb.batch_get_item(RequestItems=r), request, "UnprocessedKeys"):
+                for item in resp.get("Responses", {}).get(self.table_name, []):
+                    items[item["pk"]["S"]] = item
+        return items
+
+    def _classify(self, ids: Sequence[str], result: ClaimResult) -> List[str]:
+        """Sort conflicting IDs into completed / in-progress; return those whose record vanished or expired meanwhile."""
+        now = self.clock()
+        items = self._read(ids)
+        retry: List[str] = []
+        for pk in ids:
+            item = items.get(pk)
+            if item is None or int(item.get("expires_at", {}).get("N", "0")) < now:
+                retry.append(pk)
+            elif item.get("status", {}).get("S") == STATUS_COMPLETED:
+                result.completed[pk] = json.loads(item.get("data", {}).get("S", "{}"))
+            elif int(item.get("in_progress_expires_at", {}).get("N", "0")) < now * 1000:
+                retry.append(pk)
+            else:
+                result.in_progress.append(pk)
+        return retry
+
+    def claim(self, ids: Sequence[str]) -> ClaimResult:
+        result = ClaimResult()
+        pending = list(dict.fromkeys(ids))
+        for i in range(0, len(pending), 100):
+            chunk = pending[i : i + 100]
+            for attempt in range(1, self.max_attempts + 1):
+                if not chunk:
+                    break
+                now = self.clock()
+                values = {
+                    ":now": {"N": str(int(now))},
+                    ":now_ms": {"N": str(int(now * 1000))},
+                    ":inprogress": {"S": STATUS_IN_PROGRESS},
+                }
+                puts = [
+                    {
+                        "Put": {
+                            "TableName": self.table_name,
+                            "Item": {
+                                "pk": {"S": pk},
+                                "status": {"S": STATUS_IN_PROGRESS},
+                                "expires_at": {"N": str(int(now) + self.ttl_seconds)},
+                                "in_progress_expires_at": {"N": str(int((now + self.in_progress_seconds) * 1000))},
+                                "claim_token": {"S": self.token},
+                            },
+                            "ConditionExpression": _CLAIM_CONDITION,
+                            "ExpressionAttributeNames": {"#status": "status"},
+                            "ExpressionAttributeValues": values,
+                        }
+                    }
+                    for pk in chunk
+                ]
+                try:
+                    self.ddb.transact_write_items(TransactItems=puts)
+                except Exception as e:
+                    code = _error_code(e)
+                    if code == "TransactionConflictException":
+                        self._backoff(attempt)  # another transaction touched one of these items; retry as is
+                        continue
+                    if code != "TransactionCanceledException":
+                        raise
+                    reasons = getattr(e, "response", {}).get("CancellationReasons") or []
+                    failed = [pk for pk, r in zip(chunk, reasons) if r.get("Code") == "ConditionalCheckFailed"]
+                    if not failed:
+                        self._backoff(attempt)  # cancelled by conflicts only
+                        continue
+                    retry = set(self._classify(failed, result))
+                    chunk = [pk for pk in chunk if pk not in failed or pk in retry]
+                    continue
+                result.claimed.extend(chunk)
+                break
+            else:
+                raise RuntimeError(f"Could not claim idempotency records after {self.max_attempts} attempts")
+        return result
+
+    def _batch_write(self, requests: List[Dict[str, Any]]) -> None:
+        for i in range(0, len(requests), 25):
+            self._drain(lambda r: self.ddb.batch_write_item(RequestItems=r), {self.table_name: requests[i : i + 25]}, "UnprocessedItems")
+
+    def complete(self, results: Mapping[str, Mapping[str, Any]]) -> None:
+        """Store results of claimed IDs in bulk (unconditional: the caller holds the claims)."""
+        expires_at = str(int(self.clock()) + self.ttl_seconds)
+        self._batch_write(
+            [
+                {
+                    "PutRequest": {
+                        "Item": {
+                            "pk": {"S": pk},
+                            "status": {"S": STATUS_COMPLETED},
+                            "expires_at": {"N": expires_at},
+                            "data": {"S": json.dumps(data, default=str)},
+                        }
+                    }
+                }
+                for pk, data in results.items()
+            ]
+        )
+
+    def release(self, ids: Sequence[str]) -> None:
+        """Drop this store's claims of IDs that failed so a retry can claim them right away."""
+        for pk in dict.fromkeys(ids):
+            try:
+                self.ddb.delete_item(
+                    TableName=self.table_name,
+                    Key={"pk": {"S": pk}},
+                    ConditionExpression=_RELEASE_CONDITION,
+                    ExpressionAttributeNames={"#status": "status"},
+                    ExpressionAttributeValues={":inprogress": {"S": STATUS_IN_PROGRESS}, ":token": {"S": self.token}},
+                )
+            except Exception as e:
+                if _error_code(e) != "ConditionalCheckFailedException":
+                    raise
+                # Taken over (our lease expired) or gone; leave it to its current holder.
+
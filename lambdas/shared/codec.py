@@ -0,0 +1,98 @@
+"""
+Pluggable JSON codec for the hot paths (JSONL parsing, SQS bodies, structured logs).
+
+Why this exists:
+- Per-line `json.loads` and per-record `json.dumps` dominate ingest/transform CPU profiles.
+- `orjson` (preferred; parse + serialize) or `msgspec` (parse only) are used when installed; the
+  stdlib is always the fallback, so nothing breaks when neither is packaged.
+
+Semantics kept from the stdlib call sites:
+- `dumps` returns `str` with non-ASCII characters unescaped (`ensure_ascii=False`), compact
+  separators, and `str(obj)` for anything not natively JSON-serializable (`default=str`).
+  With orjson, datetimes/dataclasses are routed through `str()` too, so output matches the stdlib.
+- Inputs the fast backend rejects but the stdlib accepts (`NaN` literals, integers beyond 64 bits,
+  ...) transparently fall back to the stdlib, in both directions. One known difference remains:
+  orjson encodes a float `nan`/`inf` as `null` where the stdlib writes `NaN`/`Infinity`.
+
+Select a backend with `JSON_CODEC=auto|orjson|msgspec|stdlib` (default `auto`).
+Note: the bracketed JSON-array stream parser keeps using `json.JSONDecoder.raw_decode`,
+which has no orjson/msgspec equivalent.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, Tuple, Union
+
+
+Loads = Callable[[Union[str, bytes, bytearray]], Any]
+Dumps = Callable[[Any], str]
+DumpsBytes = Callable[[Any], bytes]
+Codec = Tuple[Loads, Dumps, DumpsBytes]
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _load_orjson() -> Codec:
+    import orjson  # type: ignore
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def _loads(data: Union[str, bytes, bytearray]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+
+    def _dumps_bytes(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=str, option=option)
+        except orjson.JSONEncodeError:
+            return _stdlib_dumps(obj).encode("utf-8")
+
+    def _dumps(obj: Any) -> str:
+        return _dumps_bytes(obj).decode("utf-8")
+
+    return _loads, _dumps, _dumps_bytes
+
+
+def _load_msgspec() -> Codec:
+    import msgspec  # type: ignore
+
+    decoder = msgspec.json.Decoder()
+
+    def _loads(data: Union[str, bytes, bytearray]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError:
+            return json.loads(data)
+
+    # msgspec always encodes datetimes/dataclasses natively (no passthrough to `default=str`),
+    # so only decoding is accelerated with this backend.
+    return _loads, _stdlib_dumps, lambda obj: _stdlib_dumps(obj).encode("utf-8")
+
+
+def _load_stdlib() -> Codec:
+    return json.loads, _stdlib_dumps, lambda obj: _stdlib_dumps(obj).encode("utf-8")
+
+
+_BACKENDS: Dict[str, Callable[[], Codec]] = {"orjson": _load_orjson, "msgspec": _load_msgspec, "stdlib": _load_stdlib}
+
+
+def select_codec(name: str = "auto") -> Tuple[str, Codec]:
+    """Return `(backend_name, (loads, dumps, dumps_bytes))` for `name` (`auto` picks the fastest installed)."""
+    name = name.lower()
+    if name != "auto":
+        if name not in _BACKENDS:
+            raise RuntimeError(f"Unsupported JSON_CODEC: {name}")
+        return name, _BACKENDS[name]()
+    for candidate in ("orjson", "msgspec"):
+        try:
+            return candidate, _BACKENDS[candidate]()
+        except ImportError:
+            continue
+    return "stdlib", _load_stdlib()
+
+
+BACKEND, (loads, dumps, dumps_bytes) = select_codec(os.getenv("JSON_CODEC", "auto"))
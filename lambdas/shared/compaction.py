@@ -0,0 +1,462 @@
+"""
+Incremental, idempotent Silver compaction (pure pyarrow; local paths or S3 via `pyarrow.fs`).
+
+Why this exists:
+- The Glue job re-read a whole `dt=` partition through a single reducer on every run, so cost grew
+  with partition size and every run redid all previous work.
+- Here a per-partition manifest records which input files are already compacted. A run only merges
+  the new files, packs them into outputs near `target_file_bytes`, and commits by writing the
+  manifest last. The same code runs in Lambda (small partitions, see `workflows/compaction`), in
+  the Glue job and in local tests.
+
+Layout (`{partition}` is `Partition(dt, hour).path`: `dt=...`, or `dt=.../hour=...` when hourly):
+- inputs: `{source_root}/{record_type}/{partition}/*.parquet`
+- outputs: `{output_root}/{record_type}/{partition}/part-{plan_id}-{n:05d}.parquet`
+- manifest: `{manifest_root}/{record_type}/{partition}/manifest.json` (keep it outside crawled prefixes)
+
+Commit protocol (one compactor per partition at a time, e.g. Glue job max concurrency 1):
+1. Record the planned groups as `pending` in the manifest.
+2. Write the output files. Their names are fixed by the plan, so a retry overwrites instead of
+   duplicating.
+3. Write the manifest with the inputs marked compacted and `pending` cleared: the commit point.
+A run that finds `pending` re-executes exactly that plan before planning new work.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.schemas import parquet_profile, parquet_writer_options, sort_table, to_pyarrow_schema
+from lambdas.shared.utils import new_id
+
+
+MANIFEST_VERSION = 1
+DEFAULT_TARGET_FILE_BYTES = 128 * 1024 * 1024
+# Decoded / object size assumed when only object sizes are known (zstd + dictionary pages).
+PARQUET_EXPANSION_FACTOR = 8
+
+
+def resolve_root(uri: str, filesystem: Any = None) -> Tuple[Any, str]:
+    """`(filesystem, path)` for a local path or `s3://bucket/prefix` URI."""
+    from pyarrow import fs as pafs  # type: ignore
+
+    if filesystem is not None:
+        return filesystem, uri.rstrip("/")
+    if "://" not in uri:
+        return pafs.LocalFileSystem(), uri.rstrip("/")
+    filesystem, path = pafs.FileSystem.from_uri(uri)
+    return filesystem, path.rstrip("/")
+
+
+def partition_dir(root: str, record_type: str, dt: str, hour: Optional[str] = None) -> str:
+    return f"{root}/{record_type}/{Partition(dt, hour).path}"
+
+
+def list_parquet_files(filesystem: Any, directory: str) -> Dict[str, int]:
+    """`{path: size}` of data files directly under `directory` (`_`/`.`-prefixed names are skipped, as in Athena)."""
+    from pyarrow import fs as pafs  # type: ignore
+
+    files: Dict[str, int] = {}
+    for info in filesystem.get_file_info(pafs.FileSelector(directory, allow_not_found=True)):
+        if info.type != pafs.FileType.File or info.base_name.startswith(("_", ".")):
+            continue
+        if info.base_name.endswith(".parquet"):
+            files[info.path] = int(info.size or 0)
+    return files
+
+
+def load_manifest(filesystem: Any, path: str) -> Dict[str, Any]:
+    from pyarrow import fs as pafs  # type: ignore
+
+    if filesystem.get_file_info(path).type == pafs.FileType.NotFound:
+        return {"version": MANIFEST_VERSION, "compacted": {}, "outputs": [], "pending": None}
+    with filesystem.open_input_stream(path) as f:
+        manifest = json.loads(f.read())
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported compaction manifest version: {manifest.get('version')}")
+    return manifest
+
+
+def write_manifest(filesystem: Any, path: str, manifest: Mapping[str, Any]) -> None:
+    from pyarrow import fs as pafs  # type: ignore
+
+    body = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+    filesystem.create_dir(path.rsplit("/", 1)[0], recursive=True)
+    if isinstance(filesystem, pafs.LocalFileSystem):
+        # Local rename is atomic; on S3 the single PUT on close already is.
+        tmp = f"{path}.{new_id()}.tmp"
+        with filesystem.open_output_stream(tmp) as f:
+            f.write(body)
+        filesystem.move(tmp, path)
+        return
+    with filesystem.open_output_stream(path) as f:
+        f.write(body)
+
+
+def plan_groups(files: Mapping[str, int], target_file_bytes: int) -> List[List[str]]:
+    """Pack files (in path order) into consecutive groups of at most `target_file_bytes` input bytes."""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for path in sorted(files):
+        n = files[path]
+        if current and size + n > target_file_bytes:
+            groups.append(current)
+            current, size = [], 0
+        current.append(path)
+        size += n
+    if current:
+        groups.append(current)
+    return groups
+
+
+def default_memory_budget_bytes() -> int:
+    """A quarter of the host's memory: Lambda's configured size, else physical RAM (Glue, local runs)."""
+    memory_mb = os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE")
+    if memory_mb:
+        return int(memory_mb) * 1024 * 1024 // 4
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 4
+    except (AttributeError, OSError, ValueError):
+        return 512 * 1024 * 1024
+
+
+def uncompressed_bytes(filesystem: Any, paths: List[str]) -> int:
+    """
+    Decoded size of Parquet files from their footers (row-group `total_byte_size`).
+
+    Object sizes are compressed: with zstd and dictionary encoding a file commonly expands 5-10x
+    once read into Arrow, so memory decisions use this instead.
+    """
+    import pyarrow.parquet as pq  # type: ignore
+
+    total = 0
+    for path in paths:
+        with filesystem.open_input_file(path) as f:
+            metadata = pq.ParquetFile(f).metadata
+            total += sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    return total
+
+
+def _ingested_at(table: Any, compacted_at: datetime) -> Any:
+    import pyarrow as pa  # type: ignore
+
+    return table.append_column("_ingested_at", pa.array([compacted_at] * table.num_rows, type=pa.timestamp("us", tz="UTC")))
+
+
+def _rebatch(tables: Iterable[Any], batch_rows: int) -> Iterator[Any]:
+    """Re-slice a stream of tables into tables of exactly `batch_rows` rows (the last one shorter)."""
+    import pyarrow as pa  # type: ignore
+
+    buffered: List[Any] = []
+    rows = 0
+    for table in tables:
+        if not table.num_rows:
+            continue
+        buffered.append(table)
+        rows += table.num_rows
+        while rows >= batch_rows:
+            combined = pa.concat_tables(buffered)
+            yield combined.slice(0, batch_rows)
+            rows -= batch_rows
+            buffered = [combined.slice(batch_rows)] if rows else []
+    if rows:
+        yield pa.concat_tables(buffered)
+
+
+def _stream_tables(filesystem: Any, inputs: List[str], schema: Any, batch_rows: int) -> Iterator[Any]:
+    """Yield tables of ~`batch_rows` rows read row group by row group, in input order."""
+    import pyarrow as pa  # type: ignore
+    import pyarrow.dataset as ds  # type: ignore
+
+    def _tables() -> Iterator[Any]:
+        for path in inputs:
+            # One dataset per file so each file keeps its own physical schema (e.g. string vs timestamp `event_time`).
+            for batch in ds.dataset(path, filesystem=filesystem, format="parquet").to_batches(columns=schema.names, batch_size=batch_rows):
+                yield pa.Table.from_batches([batch]).cast(schema)
+
+    return _rebatch(_tables(), batch_rows)
+
+
+def _at_or_before(table: Any, bound: Any, sort_by: List[str]) -> Any:
+    """Mask of `table` rows ordered at or before the one-row table `bound` (ascending, nulls last)."""
+    import pyarrow.compute as pc  # type: ignore
+
+    mask = None
+    for col in reversed(sort_by):
+        values, key = table.column(col), bound.column(col)[0]
+        if key.is_valid:
+            before = pc.fill_null(pc.less(values, key), False)
+            tie = pc.fill_null(pc.equal(values, key), False)
+        else:
+            before, tie = pc.is_valid(values), pc.is_null(values)
+        mask = pc.or_(before, tie) if mask is None else pc.or_(before, pc.and_(tie, mask))
+    return mask
+
+
+def _spill_runs(tables: Iterable[Any], profile: Mapping[str, Any], run_bytes: int, runs_expected: int, spill_dir: str) -> List[str]:
+    """Sort `tables` in runs of ~`run_bytes` decoded bytes, each written to a local Parquet file."""
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    paths: List[str] = []
+    buffered: List[Any] = []
+    size = 0
+
+    def _spill() -> None:
+        run = sort_table(pa.concat_tables(buffered), profile)
+        # Row groups sized so one group per run fits the merge's share of the budget.
+        row_bytes = max(1, run.nbytes // max(1, run.num_rows))
+        path = f"{spill_dir}/run-{len(paths):05d}.parquet"
+        pq.write_table(run, path, compression="lz4", row_group_size=max(1, run_bytes // (runs_expected * row_bytes)))
+        paths.append(path)
+
+    for table in tables:
+        buffered.append(table)
+        size += table.nbytes
+        if size >= run_bytes:
+            _spill()
+            buffered, size = [], 0
+    if buffered:
+        _spill()
+    return paths
+
+
+def _merge_runs(paths: List[str], profile: Mapping[str, Any]) -> Iterator[Any]:
+    """
+    k-way merge of sorted run files, one row group per run in memory.
+
+    Every row not yet read from run `i` sorts at or after the last row loaded from it, so rows at
+    or before the smallest such "last row" can be emitted. The run owning that bound is then fully
+    emitted and is the only one that needs its next row group.
+    """
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    sort_by = list(profile["sort_by"])
+    readers = {i: pq.ParquetFile(path) for i, path in enumerate(paths)}
+    next_group = dict.fromkeys(readers, 0)
+    last: Dict[int, Any] = {}
+    pending: List[Any] = []
+
+    def _load(i: int) -> None:
+        while next_group[i] < readers[i].num_row_groups:
+            table = readers[i].read_row_group(next_group[i])
+            next_group[i] += 1
+            if table.num_rows:
+                last[i] = table.slice(table.num_rows - 1)
+                pending.append(table)
+                return
+        last.pop(i, None)
+
+    for i in readers:
+        _load(i)
+    while last:
+        runs = list(last)
+        ends = pa.concat_tables([last[i] for i in runs]).append_column("_run", pa.array(runs, type=pa.int64()))
+        bound_run = sort_table(ends, profile).column("_run")[0].as_py()
+        carry = pa.concat_tables(pending)
+        mask = _at_or_before(carry, last[bound_run], sort_by)
+        yield sort_table(carry.filter(mask), profile)
+        pending = [carry.filter(pc.invert(mask))]
+        _load(bound_run)
+    if pending:
+        yield sort_table(pa.concat_tables(pending), profile)
+
+
+def merge_sorted(
+    tables: Iterable[Any], profile: Mapping[str, Any], *, decoded_bytes: int, memory_budget_bytes: int, batch_rows: int
+) -> Iterator[Any]:
+    """
+    Yield the rows of `tables` in `batch_rows`-row tables, ordered by the profile's `sort_by`.
+
+    Memory stays near `memory_budget_bytes` of decoded data:
+    - without `sort_by`, tables stream straight through;
+    - when `decoded_bytes` fits the budget, everything is sorted in memory;
+    - otherwise runs of half the budget are sorted and spilled to local Parquet files (`tempfile`,
+      i.e. /tmp in Lambda, needing about the compressed input size), then k-way merged.
+    """
+    import pyarrow as pa  # type: ignore
+
+    if not profile["sort_by"]:
+        yield from _rebatch(tables, batch_rows)
+        return
+    if decoded_bytes <= memory_budget_bytes:
+        buffered = list(tables)
+        if buffered:
+            yield from _rebatch([sort_table(pa.concat_tables(buffered), profile)], batch_rows)
+        return
+    run_bytes = max(1, memory_budget_bytes // 2)
+    with tempfile.TemporaryDirectory(prefix="merge-sort-") as spill_dir:
+        runs = _spill_runs(tables, profile, run_bytes, max(1, -(-decoded_bytes // run_bytes)), spill_dir)
+        yield from _rebatch(_merge_runs(runs, profile), batch_rows)
+
+
+def _write_group(
+    filesystem: Any,
+    inputs: Mapping[str, int],
+    output_path: str,
+    *,
+    record_type: str,
+    profile: Mapping[str, Any],
+    timestamp_type: str,
+    compacted_at: datetime,
+    memory_budget_bytes: int,
+) -> int:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    schema = to_pyarrow_schema(record_type, timestamp_type=timestamp_type)
+    paths = sorted(inputs)
+    out_schema = schema.append(pa.field("_ingested_at", pa.timestamp("us", tz="UTC")))
+    row_group_size = profile["row_group_size"]
+    filesystem.create_dir(output_path.rsplit("/", 1)[0], recursive=True)
+
+    # Row groups stream through; only groups proven small once decoded are sorted whole in memory.
+    tables = merge_sorted(
+        _stream_tables(filesystem, paths, schema, row_group_size),
+        profile,
+        decoded_bytes=uncompressed_bytes(filesystem, paths),
+        memory_budget_bytes=memory_budget_bytes,
+        batch_rows=row_group_size,
+    )
+    rows = 0
+    with filesystem.open_output_stream(output_path) as sink:
+        with pq.ParquetWriter(sink, out_schema, **parquet_writer_options(profile, out_schema)) as writer:
+            for table in tables:
+                writer.write_table(_ingested_at(table, compacted_at), row_group_size=row_group_size)
+                rows += table.num_rows
+    return rows
+
+
+def _resolve_partition(
+    source_root: str,
+    output_root: str,
+    manifest_root: Optional[str],
+    record_type: str,
+    dt: str,
+    hour: Optional[str],
+    filesystem: Any,
+) -> Tuple[Any, str, str, str]:
+    """`(filesystem, source_dir, output_dir, manifest_path)` for one partition."""
+    fs, source = resolve_root(source_root, filesystem)
+    _, output = resolve_root(output_root, fs)
+    _, manifests = resolve_root(manifest_root or f"{output_root.rstrip('/')}/_compaction", fs)
+    if source == output:
+        # Outputs would be re-listed as new inputs and every row would be visible twice.
+        raise ValueError("Compaction output root must differ from the source root")
+    return (
+        fs,
+        partition_dir(source, record_type, dt, hour),
+        partition_dir(output, record_type, dt, hour),
+        f"{partition_dir(manifests, record_type, dt, hour)}/manifest.json",
+    )
+
+
+def _new_files(fs: Any, source_dir: str, manifest: Mapping[str, Any]) -> Dict[str, int]:
+    return {p: n for p, n in list_parquet_files(fs, source_dir).items() if p not in manifest["compacted"]}
+
+
+def backlog_bytes(
+    source_root: str,
+    output_root: str,
+    record_type: str,
+    dt: str,
+    *,
+    hour: Optional[str] = None,
+    manifest_root: Optional[str] = None,
+    filesystem: Any = None,
+) -> int:
+    """Input bytes the next `compact_partition` run would read (its pending plan, else the new files)."""
+    fs, source_dir, _, manifest_path = _resolve_partition(source_root, output_root, manifest_root, record_type, dt, hour, filesystem)
+    manifest = load_manifest(fs, manifest_path)
+    if manifest.get("pending") is not None:
+        return sum(n for g in manifest["pending"]["groups"] for n in g["inputs"].values())
+    return sum(_new_files(fs, source_dir, manifest).values())
+
+
+def compact_partition(
+    source_root: str,
+    output_root: str,
+    record_type: str,
+    dt: str,
+    *,
+    hour: Optional[str] = None,
+    manifest_root: Optional[str] = None,
+    target_file_bytes: int = DEFAULT_TARGET_FILE_BYTES,
+    profile_overrides: Optional[Mapping[str, Any]] = None,
+    timestamp_type: str = "string",
+    memory_budget_bytes: Optional[int] = None,
+    filesystem: Any = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Compact the not-yet-compacted Parquet files of one partition; return a run summary.
+
+    `hour` selects one hour of an hourly (`dt/hour`) layout. All roots must live on the same
+    filesystem. `manifest_root` defaults to `{output_root}/_compaction`.
+    Output groups are sorted with bounded memory (`merge_sorted`): in memory only when their decoded
+    size (`uncompressed_bytes`) fits `memory_budget_bytes` (default: `default_memory_budget_bytes()`),
+    otherwise by an external merge sort, so large groups keep the profile's sort order too.
+    """
+    fs, source_dir, out_dir, manifest_path = _resolve_partition(source_root, output_root, manifest_root, record_type, dt, hour, filesystem)
+    profile = parquet_profile(record_type, profile_overrides)
+    compacted_at = now or datetime.now(timezone.utc)
+    if memory_budget_bytes is None:
+        memory_budget_bytes = default_memory_budget_bytes()
+
+    manifest = load_manifest(fs, manifest_path)
+    recovered = manifest.get("pending") is not None
+    if recovered:
+        plan = manifest["pending"]
+    else:
+        new_files = _new_files(fs, source_dir, manifest)
+        if not new_files:
+            return {"record_type": record_type, "dt": dt, "hour": hour, "inputs": 0, "outputs": [], "rows": 0, "recovered": False}
+        plan_id = new_id()
+        plan = {
+            "plan_id": plan_id,
+            "groups": [
+                {"output": f"{out_dir}/part-{plan_id}-{i:05d}.parquet", "inputs": {p: new_files[p] for p in group}}
+                for i, group in enumerate(plan_groups(new_files, target_file_bytes))
+            ],
+        }
+        manifest["pending"] = plan
+        write_manifest(fs, manifest_path, manifest)
+
+    rows = 0
+    for group in plan["groups"]:
+        rows += _write_group(
+            fs,
+            group["inputs"],
+            group["output"],
+            record_type=record_type,
+            profile=profile,
+            timestamp_type=timestamp_type,
+            compacted_at=compacted_at,
+            memory_budget_bytes=memory_budget_bytes,
+        )
+
+    # Commit point: inputs are recorded as compacted only once every output exists.
+    for group in plan["groups"]:
+        manifest["compacted"].update(group["inputs"])
+        manifest["outputs"].append(group["output"])
+    manifest["pending"] = None
+    manifest["updated_at"] = compacted_at.isoformat().replace("+00:00", "Z")
+    write_manifest(fs, manifest_path, manifest)
+
+    return {
+        "record_type": record_type,
+        "dt": dt,
+        "hour": hour,
+        "inputs": sum(len(g["inputs"]) for g in plan["groups"]),
+        "outputs": [g["output"] for g in plan["groups"]],
+        "rows": rows,
+        "recovered": recovered,
+    }
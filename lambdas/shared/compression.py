@@ -0,0 +1,61 @@
+"""
+Streaming decompression for compressed Bronze objects.
+
+Why this exists:
+- Producers may land `.jsonl.gz` / `.jsonl.zst` / `.jsonl.bz2` objects to cut S3 storage and transfer.
+- Objects are decompressed as a stream on top of the S3 body, so the line iterator never needs the
+  whole (compressed or inflated) object in memory.
+
+Compression is detected from the key suffix first, then from the object's `Content-Encoding`.
+zstd support needs the optional `zstandard` package (shipped in the ingest requirements).
+"""
+
+import bz2
+import gzip
+from typing import BinaryIO, Optional
+
+
+_SUFFIXES = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".bz2": "bzip2",
+}
+
+_CONTENT_ENCODINGS = {
+    "gzip": "gzip",
+    "x-gzip": "gzip",
+    "zstd": "zstd",
+    "bzip2": "bzip2",
+    "x-bzip2": "bzip2",
+}
+
+
+def detect_compression(key: str, content_encoding: Optional[str] = None) -> Optional[str]:
+    lowered = key.lower()
+    for suffix, codec in _SUFFIXES.items():
+        if lowered.endswith(suffix):
+            return codec
+    if content_encoding:
+        # Content-Encoding may list several codings; the last one applied is decoded first.
+        last = content_encoding.split(",")[-1].strip().lower()
+        return _CONTENT_ENCODINGS.get(last)
+    return None
+
+
+def open_decompressed(stream: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    if compression is None:
+        return stream
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")  # type: ignore[return-value]
+    if compression == "bzip2":
+        return bz2.BZ2File(stream, mode="rb")  # type: ignore[return-value]
+    if compression == "zstd":
+        try:
+            import zstandard  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("zstd-compressed object requires the 'zstandard' package") from e
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    raise ValueError(f"Unsupported compression: {compression}")
+
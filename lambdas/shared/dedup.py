@@ -0,0 +1,313 @@
+"""
+Record-level deduplication for at-least-once delivery (SQS redelivery, replays from Bronze).
+
+Why this exists:
+- Object-level idempotency (`bucket/key#etag`) stops the same S3 object from being ingested twice,
+  but redelivered SQS messages, replays and duplicate records inside a source file still reach
+  Silver as duplicate rows.
+- Transform drops records whose natural key (`DEFAULT_DEDUP_KEYS`, like `idempotency_key` in
+  `configs/*.yaml`) was already written, checking the cheapest layer first:
+  1. an in-invocation set (duplicates inside one batch never leave memory);
+  2. a Bloom filter per `(record_type, partition)` persisted in S3: a miss proves the key is new,
+     so most new records never touch DynamoDB;
+  3. DynamoDB `BatchGetItem`, only for Bloom hits (true duplicates or false positives).
+
+Keys are recorded only after their rows are durably written (Silver or staging), first in
+DynamoDB (`BatchWriteItem`), then OR-merged into the partition filter with a conditional PUT
+(`IfMatch` / `IfNoneMatch`), so concurrent writers never lose each other's bits. A failed write is
+therefore redelivered and written rather than dropped. Limits (dedup is best-effort):
+- two invocations racing on the same new key can both write it (the window is one batch);
+- if the filter update fails after the DynamoDB write, later duplicates of those keys pass as
+  Bloom misses (transform reports `DedupErrors`).
+
+Records missing any key field are never treated as duplicates.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import struct
+import threading
+import time
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.schemas import RECORD_SCHEMAS
+from lambdas.shared.utils import drain_unprocessed
+
+
+DEFAULT_DEDUP_KEYS: Mapping[str, Tuple[str, ...]] = {
+    "shipments": ("shipment_id", "event_time"),
+    "tracking_events": ("shipment_id", "event_time", "status"),
+    "invoice_lines": ("invoice_id", "sku", "event_time"),
+}
+
+BLOOM_OBJECT_NAME = "bloom.bin"
+_BLOOM_MAGIC = b"BLM1"
+_BLOOM_HEADER = struct.Struct(">4sQII")  # magic, bits, hashes, keys added
+
+# Warm-container cache of loaded filters: `(bucket, key) -> (etag, filter)`, revalidated by ETag.
+_BLOOM_CACHE: Dict[Tuple[str, str], Tuple[str, "BloomFilter"]] = {}
+_BLOOM_CACHE_LOCK = threading.Lock()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter (double hashing over one BLAKE2b digest per key)."""
+
+    __slots__ = ("bits", "hashes", "count", "_array")
+
+    def __init__(self, bits: int, hashes: int, count: int = 0, data: Optional[bytes] = None) -> None:
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        self._array = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fpp: float) -> "BloomFilter":
+        bits = max(64, int(-capacity * math.log(fpp) / (math.log(2) ** 2)))
+        return cls(bits, max(1, round(bits / capacity * math.log(2))))
+
+    def _positions(self, keys: Sequence[str]) -> Any:
+        """Bit positions as a `(len(keys), hashes)` array: `(h1 + i * h2) mod bits` per key."""
+        import numpy as np
+
+        blake2b = hashlib.blake2b
+        digests = b"".join(blake2b(k.encode("utf-8"), digest_size=16).digest() for k in keys)
+        halves = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+        bits = np.uint64(self.bits)
+        # Reduce first and step incrementally: `pos + step < 2 * bits` never overflows uint64, so
+        # positions match the arbitrary-precision formula (filters already in S3 stay valid).
+        pos = halves[:, 0] % bits
+        step = (halves[:, 1] | np.uint64(1)) % bits
+        out = np.empty((len(keys), self.hashes), dtype=np.uint64)
+        for i in range(self.hashes):
+            out[:, i] = pos
+            pos = (pos + step) % bits
+        return out
+
+    def add_many(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        import numpy as np
+
+        pos = self._positions(keys).ravel()
+        array = np.frombuffer(self._array, dtype=np.uint8)
+        np.bitwise_or.at(array, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+        self.count += len(keys)
+
+    def contains_many(self, keys: Sequence[str]) -> List[bool]:
+        """Membership per key (False means definitely not added)."""
+        if not keys:
+            return []
+        import numpy as np
+
+        pos = self._positions(keys)
+        array = np.frombuffer(self._array, dtype=np.uint8)
+        hits = (array[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return hits.all(axis=1).tolist()
+
+    def add(self, key: str) -> None:
+        self.add_many([key])
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains_many([key])[0]
+
+    def to_bytes(self) -> bytes:
+        return _BLOOM_HEADER.pack(_BLOOM_MAGIC, self.bits, self.hashes, self.count) + bytes(self._array)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, bits, hashes, count = _BLOOM_HEADER.unpack_from(data)
+        if magic != _BLOOM_MAGIC:
+            raise ValueError("Not a Bloom filter object")
+        return cls(bits, hashes, count, data[_BLOOM_HEADER.size :])
+
+
+def key_indexes(dedup_keys: Mapping[str, Sequence[str]]) -> Dict[str, Tuple[int, ...]]:
+    """Positions of each record type's key fields in its value tuple (`RECORD_SCHEMAS` order)."""
+    indexes: Dict[str, Tuple[int, ...]] = {}
+    for record_type, fields in RECORD_SCHEMAS.items():
+        names = [name for name, _ in fields]
+        key_fields = dedup_keys.get(record_type, DEFAULT_DEDUP_KEYS.get(record_type, ()))
+        unknown = [f for f in key_fields if f not in names]
+        if unknown:
+            raise ValueError(f"Unknown dedup key fields for {record_type}: {unknown}")
+        indexes[record_type] = tuple(names.index(f) for f in key_fields)
+    return indexes
+
+
+def _key_function(indexes: Tuple[int, ...]) -> Callable[[Tuple[Any, ...]], Optional[str]]:
+    """Compile `values -> key` for one record type (None when any key field is missing)."""
+    if not indexes:
+        return lambda values: None
+    get = itemgetter(*indexes)
+    if len(indexes) == 1:
+        return lambda values: None if get(values) is None else str(get(values))
+
+    def _key(values: Tuple[Any, ...]) -> Optional[str]:
+        parts = get(values)
+        if None in parts:
+            return None
+        return "\x1f".join(map(str, parts))
+
+    return _key
+
+
+def _is_precondition_failure(e: Exception) -> bool:
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409")
+
+
+class RecordDeduper:
+    """
+    Filters normalized value tuples per partition and records written keys.
+
+    `s3`/`bloom_prefix` enable the persisted Bloom layer; without them every key not caught by the
+    in-invocation set is looked up in DynamoDB. A filter holds `bloom_capacity` keys at `bloom_fpp`;
+    past that its false-positive rate (and so DynamoDB lookups) grows, but it never misses a key.
+    Unprocessed batch keys/items are retried with jittered backoff, up to `max_attempts` calls.
+    """
+
+    def __init__(
+        self,
+        ddb: Any,
+        table_name: str,
+        *,
+        s3: Any = None,
+        bucket: Optional[str] = None,
+        bloom_prefix: Optional[str] = None,
+        dedup_keys: Optional[Mapping[str, Sequence[str]]] = None,
+        ttl_seconds: int = 7 * 24 * 3600,
+        bloom_capacity: int = 200_000,
+        bloom_fpp: float = 0.01,
+        max_attempts: int = 8,
+        backoff_base_seconds: float = 0.05,
+        backoff_max_seconds: float = 2.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.ddb = ddb
+        self.table_name = table_name
+        self.s3 = s3
+        self.bucket = bucket
+        self.bloom_prefix = bloom_prefix.strip("/") if bloom_prefix else None
+        self.indexes = key_indexes(dedup_keys or {})
+        self._key_fns = {rt: _key_function(idx) for rt, idx in self.indexes.items()}
+        self.ttl_seconds = ttl_seconds
+        self.bloom_capacity = bloom_capacity
+        self.bloom_fpp = bloom_fpp
+        self._retry = {
+            "max_attempts": max_attempts,
+            "backoff_base_seconds": backoff_base_seconds,
+            "backoff_max_seconds": backoff_max_seconds,
+            "sleep": sleep,
+        }
+        self.seen: Set[Tuple[str, str]] = set()
+        self.stats = {"dropped_in_batch": 0, "dropped_seen": 0, "bloom_hits": 0, "ddb_lookups": 0}
+
+    def record_key(self, record_type: str, values: Tuple[Any, ...]) -> Optional[str]:
+        return self._key_fns[record_type](values)
+
+    @staticmethod
+    def _item_id(record_type: str, key: str) -> str:
+        return f"rec#{record_type}#{key}"
+
+    def _bloom_key(self, record_type: str, partition: Partition) -> str:
+        return f"{self.bloom_prefix}/{record_type}/{partition.path}/{BLOOM_OBJECT_NAME}"
+
+    def _load_bloom(self, record_type: str, partition: Partition) -> Tuple[Optional[str], Optional[BloomFilter]]:
+        """`(etag, filter)` for a partition, or `(None, None)` when no filter exists yet."""
+        key = self._bloom_key(record_type, partition)
+        cache_key = (self.bucket or "", key)
+        with _BLOOM_CACHE_LOCK:
+            cached = _BLOOM_CACHE.get(cache_key)
+        kwargs = {"IfNoneMatch": cached[0]} if cached else {}
+        try:
+            resp = self.s3.get_object(Bucket=self.bucket, Key=key, **kwargs)
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code in ("304", "NotModified") and cached:
+                return cached
+            if code in ("NoSuchKey", "404"):
+                return None, None
+            raise
+        loaded = (resp["ETag"], BloomFilter.from_bytes(resp["Body"].read()))
+        with _BLOOM_CACHE_LOCK:
+            _BLOOM_CACHE[cache_key] = loaded
+        return loaded
+
+    def _existing(self, record_type: str, keys: List[str]) -> Set[str]:
+        """Keys already recorded in DynamoDB."""
+        found: Set[str] = set()
+        by_id = {self._item_id(record_type, k): k for k in keys}
+        ids = list(by_id)
+        for i in range(0, len(ids), 100):
+            request = {self.table_name: {"Keys": [{"pk": {"S": item_id}} for item_id in ids[i : i + 100]], "ProjectionExpression": "pk"}}
+            for resp in drain_unprocessed(lambda r: self.ddb.batch_get_item(RequestItems=r), request, "UnprocessedKeys", **self._retry):
+                for item in resp.get("Responses", {}).get(self.table_name, []):
+                    found.add(by_id[item["pk"]["S"]])
+        self.stats["ddb_lookups"] += len(ids)
+        return found
+
+    def filter_rows(self, record_type: str, partition: Partition, rows: Sequence[Tuple[Any, ...]]) -> Tuple[List[int], List[Optional[str]]]:
+        """Return `(indexes of rows to keep, their keys)`, in row order, with duplicates removed."""
+        kept: Dict[int, Optional[str]] = {}
+        candidates: List[Tuple[int, str]] = []
+        for i, values in enumerate(rows):
+            key = self.record_key(record_type, values)
+            if key is None:
+                kept[i] = None
+                continue
+            marker = (record_type, key)
+            if marker in self.seen:
+                self.stats["dropped_in_batch"] += 1
+                continue
+            self.seen.add(marker)
+            candidates.append((i, key))
+
+        suspects = [key for _, key in candidates]
+        if self.bloom_prefix and candidates:
+            bloom = self._load_bloom(record_type, partition)[1]
+            suspects = [key for key, hit in zip(suspects, bloom.contains_many(suspects)) if hit] if bloom is not None else []
+            self.stats["bloom_hits"] += len(suspects)
+        existing = self._existing(record_type, suspects) if suspects else set()
+
+        for i, key in candidates:
+            if key in existing:
+                self.stats["dropped_seen"] += 1
+            else:
+                kept[i] = key
+        order = sorted(kept)
+        return order, [kept[i] for i in order]
+
+    def _merge_bloom(self, record_type: str, partition: Partition, keys: List[str], attempts: int = 5) -> None:
+        key = self._bloom_key(record_type, partition)
+        for _ in range(attempts):
+            etag, current = self._load_bloom(record_type, partition)
+            bloom = BloomFilter.for_capacity(self.bloom_capacity, self.bloom_fpp) if current is None else BloomFilter.from_bytes(current.to_bytes())
+            bloom.add_many(keys)
+            condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+            try:
+                self.s3.put_object(Bucket=self.bucket, Key=key, Body=bloom.to_bytes(), **condition)
+                return
+            except Exception as e:
+                if not _is_precondition_failure(e):
+                    raise
+        raise RuntimeError(f"Bloom filter update kept conflicting: {key}")
+
+    def mark_written(self, record_type: str, partition: Partition, keys: Iterable[Optional[str]]) -> None:
+        """Record keys whose rows are durably written (DynamoDB first, then the partition filter)."""
+        new_keys = list(dict.fromkeys(k for k in keys if k is not None))
+        if not new_keys:
+            return
+        expires_at = str(int(time.time()) + self.ttl_seconds)
+        requests = [
+            {"PutRequest": {"Item": {"pk": {"S": self._item_id(record_type, k)}, "expires_at": {"N": expires_at}}}}
+            for k in new_keys
+        ]
+        for i in range(0, len(requests), 25):
+            pending = {self.table_name: requests[i : i + 25]}
+            drain_unprocessed(lambda r: self.ddb.batch_write_item(RequestItems=r), pending, "UnprocessedItems", **self._retry)
+        if self.bloom_prefix:
+            self._merge_bloom(record_type, partition, new_keys)
@@ -0,0 +1,71 @@
+"""
+Multi-record SQS envelopes.
+
+Why this exists:
+- One normalized record per SQS message wastes most of the per-message size limit, and SQS cost
+  plus transform invocations scale with record count.
+- Ingest can opt in to packing many `json_dumps` records into one message body up to a byte
+  budget; transform unpacks envelopes transparently and treats the envelope (the SQS message)
+  as the unit of partial-batch failure.
+
+Wire format (UTF-8 JSON):
+`{"_envelope":1,"records":[<record>,<record>,...]}`
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+ENVELOPE_VERSION = 1
+SQS_MAX_MESSAGE_BYTES = 256 * 1024
+
+_PREFIX = '{"_envelope":%d,"records":[' % ENVELOPE_VERSION
+_SUFFIX = "]}"
+_OVERHEAD_BYTES = len(_PREFIX) + len(_SUFFIX)
+
+
+def pack_envelopes(bodies: Iterable[str], max_bytes: int = SQS_MAX_MESSAGE_BYTES) -> Iterator[str]:
+    """
+    Pack already-serialized JSON records into envelope bodies of at most `max_bytes` UTF-8 bytes.
+
+    A record that cannot fit in an envelope on its own is passed through as a plain message.
+    """
+    parts: List[str] = []
+    size = _OVERHEAD_BYTES
+    for body in bodies:
+        n = len(body.encode("utf-8"))
+        if n + _OVERHEAD_BYTES > max_bytes:
+            if parts:
+                yield _PREFIX + ",".join(parts) + _SUFFIX
+                parts = []
+                size = _OVERHEAD_BYTES
+            yield body
+            continue
+        # +1 for the separating comma.
+        if parts and size + n + 1 > max_bytes:
+            yield _PREFIX + ",".join(parts) + _SUFFIX
+            parts = []
+            size = _OVERHEAD_BYTES
+        size += n + (1 if parts else 0)
+        parts.append(body)
+    if parts:
+        yield _PREFIX + ",".join(parts) + _SUFFIX
+
+
+def is_envelope(payload: Any) -> bool:
+    return isinstance(payload, dict) and "_envelope" in payload
+
+
+def unpack_records(payload: Any) -> List[Dict[str, Any]]:
+    """Return the records carried by a decoded SQS message body (envelope or single record)."""
+    if not is_envelope(payload):
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object message body")
+        return [payload]
+
+    version = payload.get("_envelope")
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported envelope version: {version}")
+    records = payload.get("records")
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError("Envelope records must be a list of JSON objects")
+    return records
@@ -0,0 +1,107 @@
+"""
+Partition keys for Silver rows, computed inline while records are grouped.
+
+Why this exists:
+- Each record used to be partitioned by `partition_dt([record])`, and records without `event_time`
+  silently landed in today's partition, mixed with on-time data.
+- `Partitioner` derives the partition straight from the normalized `event_time` string (slicing,
+  no parsing), supports daily or hourly partitions, and applies an explicit late-data policy.
+
+Partition values:
+- A `Partition` is `(dt, hour)`; `hour` is None with daily granularity. Silver, staging, dedup and
+  compaction paths are built from `Partition.path` (`dt=2025-01-01` or `dt=2025-01-01/hour=05`),
+  and events/logs carry `dt` and `hour` as separate fields.
+- Every partition of one granularity has the same key set: with `dt/hour` the late partition is
+  `dt=late/hour=__` (`LATE_HOUR`), never a bare `dt=late/`.
+
+Late-data policies:
+- `current` (default, legacy): rows without `event_time` go to the current dt (or hour).
+- `partition`: rows without `event_time`, and rows older than `max_lateness_seconds` (when > 0),
+  go to the designated `late_partition` (e.g. `dt=late`, or `dt=late/hour=__` when hourly) for
+  separate backfill or review.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional
+
+
+GRANULARITIES = ("dt", "dt/hour")
+LATE_DATA_POLICIES = ("current", "partition")
+DEFAULT_LATE_PARTITION = "late"
+# Hour value of the late partition with `dt/hour` granularity.
+LATE_HOUR = "__"
+
+
+class Partition(NamedTuple):
+    """One Silver partition: `dt` (YYYY-MM-DD, or the late partition name) and `hour` (HH, None when daily)."""
+
+    dt: str
+    hour: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        """Hive path segment: `dt=...` or `dt=.../hour=...`."""
+        return f"dt={self.dt}" if self.hour is None else f"dt={self.dt}/hour={self.hour}"
+
+    def fields(self) -> Dict[str, Optional[str]]:
+        """`{"dt", "hour"}` for events and logs."""
+        return {"dt": self.dt, "hour": self.hour}
+
+
+class Partitioner:
+    def __init__(
+        self,
+        granularity: str = "dt",
+        *,
+        late_policy: str = "current",
+        late_partition: str = DEFAULT_LATE_PARTITION,
+        max_lateness_seconds: int = 0,
+        now: Optional[datetime] = None,
+    ) -> None:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported partition granularity: {granularity}")
+        if late_policy not in LATE_DATA_POLICIES:
+            raise ValueError(f"Unsupported late data policy: {late_policy}")
+        if late_policy == "partition" and (not late_partition or "/" in late_partition):
+            raise ValueError(f"Invalid late partition: {late_partition!r}")
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is not None:
+            now = now.astimezone(timezone.utc)
+        self.granularity = granularity
+        self.late_policy = late_policy
+        self.late_partition = late_partition
+        self.hourly = granularity == "dt/hour"
+        self.late = Partition(late_partition, LATE_HOUR if self.hourly else None)
+        # Fixed per invocation, so one batch never straddles two "current" partitions.
+        self.current = self._format(now.strftime("%Y-%m-%dT%H"))
+        # Canonical `YYYY-MM-DDTHH:MM:SS...Z` strings order like the instants they encode.
+        self.cutoff: Optional[str] = None
+        if late_policy == "partition" and max_lateness_seconds > 0:
+            self.cutoff = (now - timedelta(seconds=max_lateness_seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _format(self, event_time: str) -> Partition:
+        return Partition(event_time[:10], event_time[11:13] if self.hourly else None)
+
+    def partition(self, event_time: Optional[str]) -> Partition:
+        """Partition of a normalized (canonical ISO-8601 `...Z`) `event_time`, or None."""
+        if not event_time:
+            return self.late if self.late_policy == "partition" else self.current
+        if self.cutoff is not None and event_time < self.cutoff:
+            return self.late
+        return self._format(event_time)
+
+
+def rows_per_file(rows: int, nbytes: int, *, max_rows: int, max_bytes: int = 0) -> int:
+    """
+    Rows per output file for a partition holding `rows` rows / `nbytes` input bytes.
+
+    Files hold at most `max_rows` rows. When the partition exceeds `max_bytes` (0: no byte cap),
+    rows are spread evenly over just enough files to keep each under the cap.
+    """
+    per_file = max(1, max_rows)
+    if max_bytes > 0 and nbytes > max_bytes and rows:
+        files = -(-nbytes // max_bytes)
+        per_file = min(per_file, max(1, -(-rows // files)))
+    return per_file
@@ -0,0 +1,231 @@
+"""
+Sampled in-process profiling for the Lambda handlers (cProfile or tracemalloc).
+
+Why this exists:
+- Production slowness is hard to reproduce locally. Stage timings (`lambdas.shared.timing`) show
+  which stage is slow but not which functions (`normalize_record`, `Table.from_pylist`, ...).
+- `@profiled(service)` profiles about 1 in `PROFILE_SAMPLE_EVERY` invocations against real traffic
+  and writes the result tagged with the request ID and input size.
+
+Environment variables:
+- `PROFILE_SAMPLE_EVERY` (default: 0 = off): profile about 1 in N invocations (1 = every one).
+- `PROFILE_MODE` (default: "cprofile"): "cprofile" (CPU time, handler thread only) or
+  "tracemalloc" (allocations from all threads, `PROFILE_TRACEMALLOC_FRAMES` deep, default 25).
+- `PROFILE_OUTPUT` (required when sampling): `s3://bucket/prefix`, or a local directory for tests
+  and local runs. The function role needs `s3:PutObject` on the prefix.
+- `PROFILE_TOP` (default: 50): entries kept in the summary.
+
+Output per profiled invocation, under `{PROFILE_OUTPUT}/{service}/{YYYY-MM-DD}/{request_id}`:
+- `.json`: service, request ID, input bytes and records, duration, mode, and the top functions by
+  cumulative time (cProfile) or the top allocation sites by size (tracemalloc).
+- `.collapsed`: folded stacks (`frame;frame;... value`) for flamegraph.pl or speedscope.
+  - tracemalloc: each line is a full allocation traceback, weighted by the bytes still allocated
+    when the handler returns.
+  - cProfile records caller -> callee pairs rather than whole stacks, so each line is one such
+    pair, weighted by the callee's own time (us) under that caller.
+- `.pstats` (cProfile only): the raw profile, for `python -m pstats` or snakeviz.
+
+Profiling never fails an invocation: configuration and output errors are logged, not raised.
+"""
+
+import functools
+import marshal
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lambdas.shared.utils import env, json_dumps, log, new_id
+
+
+MODES = ("cprofile", "tracemalloc")
+
+
+def sampled(every: int, rng: Callable[[], float] = random.random) -> bool:
+    """Whether to profile this invocation when sampling 1 in `every` (0: never)."""
+    return every > 0 and (every == 1 or rng() * every < 1)
+
+
+def input_size(event: Any) -> Tuple[int, int]:
+    """`(bytes, records)` of an invocation's input: S3 object sizes / SQS bodies, else the event JSON."""
+    records = event.get("Records") if isinstance(event, dict) else None
+    if not isinstance(records, list):
+        return len(json_dumps(event).encode("utf-8")), 1
+    nbytes = 0
+    for r in records:
+        body = r.get("body")
+        size = (r.get("s3") or {}).get("object", {}).get("size")
+        if isinstance(body, str):
+            nbytes += len(body.encode("utf-8"))
+        elif isinstance(size, int):
+            nbytes += size
+    return nbytes, len(records)
+
+
+def _frame_label(filename: str, lineno: int, name: Optional[str] = None) -> str:
+    # Folded stacks use `;` between frames; keep paths short (package/module.py).
+    where = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    label = f"{name} ({where}:{lineno})" if name else f"{where}:{lineno}"
+    return label.replace(";", ",")
+
+
+def _cprofile_func_label(func: Tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":  # built-ins: `<built-in method ...>`, `<method 'sort' of 'list' objects>`
+        return name.replace(";", ",")
+    return _frame_label(filename, lineno, name)
+
+
+def _cprofile_results(profile: Any, top: int) -> Tuple[List[Dict[str, Any]], List[str], Dict[str, bytes]]:
+    import io
+    import pstats
+
+    stats = pstats.Stats(profile, stream=io.StringIO()).stats  # {func: (cc, nc, tt, ct, callers)}
+    ranked = sorted(stats.items(), key=lambda item: -item[1][3])[:top]
+    summary = [
+        {
+            "function": _cprofile_func_label(func),
+            "calls": nc,
+            "self_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3),
+        }
+        for func, (_, nc, tt, ct, _) in ranked
+    ]
+    collapsed = []
+    for func, (_, _, tt, _, callers) in stats.items():
+        label = _cprofile_func_label(func)
+        if not callers and tt:
+            collapsed.append(f"{label} {round(tt * 1e6)}")
+        for caller, edge in callers.items():
+            edge_us = round(edge[2] * 1e6)  # (nc, cc, tt, ct) per caller
+            if edge_us:
+                collapsed.append(f"{_cprofile_func_label(caller)};{label} {edge_us}")
+    return summary, collapsed, {".pstats": marshal.dumps(stats)}
+
+
+def _tracemalloc_results(snapshot: Any, top: int) -> Tuple[List[Dict[str, Any]], List[str], Dict[str, bytes]]:
+    import tracemalloc
+
+    snapshot = snapshot.filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    )
+    summary = [
+        {"site": _frame_label(stat.traceback[0].filename, stat.traceback[0].lineno), "bytes": stat.size, "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+    collapsed = [
+        ";".join(_frame_label(frame.filename, frame.lineno) for frame in stat.traceback) + f" {stat.size}"
+        for stat in snapshot.statistics("traceback")
+    ]
+    return summary, collapsed, {}
+
+
+def _write(output: str, name: str, data: bytes, s3: Any = None) -> str:
+    """Write `data` to `{output}/{name}`; return its location."""
+    if output.startswith("s3://"):
+        bucket, _, prefix = output[len("s3://") :].partition("/")
+        key = f"{prefix.strip('/')}/{name}" if prefix.strip("/") else name
+        s3.put_object(Bucket=bucket, Key=key, Body=data)
+        return f"s3://{bucket}/{key}"
+    path = os.path.join(output, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _run_profiled(fn: Callable[[Any, Any], Any], event: Any, context: Any, service: str) -> Any:
+    mode = env("PROFILE_MODE", "cprofile").lower()
+    output = os.getenv("PROFILE_OUTPUT", "").rstrip("/")
+    if mode not in MODES or not output:
+        log("profile_config_error", service=service, mode=mode, output=output)
+        return fn(event, context)
+    top = int(env("PROFILE_TOP", "50"))
+
+    profile: Any = None
+    tracing = False
+    try:
+        if mode == "cprofile":
+            import cProfile
+
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            import tracemalloc
+
+            # Leave tracing that someone else started (e.g. `python -X tracemalloc`) running afterwards.
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start(int(env("PROFILE_TRACEMALLOC_FRAMES", "25")))
+            tracemalloc.reset_peak()
+    except Exception as e:  # e.g. another profiler is already active
+        log("profile_start_error", service=service, mode=mode, error=str(e))
+        return fn(event, context)
+
+    started = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        return fn(event, context)
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        snapshot = None
+        peak_bytes = None
+        if profile is not None:
+            profile.disable()
+        else:
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+        try:
+            if profile is not None:
+                entries, collapsed, extra = _cprofile_results(profile, top)
+            else:
+                entries, collapsed, extra = _tracemalloc_results(snapshot, top)
+            request_id = getattr(context, "aws_request_id", None) or new_id("local-")
+            nbytes, nrecords = input_size(event)
+            summary = {
+                "service": service,
+                "request_id": request_id,
+                "function_name": getattr(context, "function_name", None),
+                "mode": mode,
+                "profiled_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                "input_bytes": nbytes,
+                "input_records": nrecords,
+                "duration_ms": duration_ms,
+                "error": error,
+                **({"peak_traced_bytes": peak_bytes} if peak_bytes is not None else {}),
+                "top": entries,
+            }
+            base = f"{service}/{datetime.now(timezone.utc):%Y-%m-%d}/{request_id}"
+            s3 = None
+            if output.startswith("s3://"):
+                import boto3
+
+                s3 = boto3.client("s3")
+            files = {".json": json_dumps(summary).encode("utf-8"), ".collapsed": ("\n".join(collapsed) + "\n").encode("utf-8"), **extra}
+            written = [_write(output, base + suffix, data, s3) for suffix, data in files.items()]
+            log("profile_written", service=service, mode=mode, request_id=request_id, input_bytes=nbytes, files=written)
+        except Exception as e:
+            log("profile_write_error", service=service, mode=mode, error=str(e))
+
+
+def profiled(service: str) -> Callable[[Callable[[Any, Any], Any]], Callable[[Any, Any], Any]]:
+    """Decorate a Lambda handler so sampled invocations are profiled (see module docstring)."""
+
+    def decorate(fn: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+        @functools.wraps(fn)
+        def wrapper(event: Any, context: Any) -> Any:
+            if not sampled(int(env("PROFILE_SAMPLE_EVERY", "0"))):
+                return fn(event, context)
+            return _run_profiled(fn, event, context, service)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,105 @@
+"""
+Write-only S3 object stream backed by multipart upload.
+
+Why this exists:
+- Writing Parquet into a `BytesIO` and then calling `getvalue()` holds the encoded file twice in
+  memory, so Lambda memory (not S3) caps `MAX_RECORDS_PER_FILE`.
+- `pq.ParquetWriter` can write row groups straight into this file object; full parts are uploaded
+  as they fill, so memory stays around one part plus one row group regardless of file size.
+
+Behaviour:
+- Objects smaller than one part are sent with a single `PutObject` on close (no multipart overhead).
+- Any exception inside the `with` block aborts the multipart upload, so no orphaned parts are
+  billed. A Lambda timeout cannot run the abort; the buckets' lifecycle rule reaps those.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any, Dict, List, Optional
+
+
+S3_MIN_PART_BYTES = 5 * 1024 * 1024
+DEFAULT_PART_BYTES = 8 * 1024 * 1024
+
+
+class S3MultipartWriter(io.RawIOBase):
+    def __init__(self, s3: Any, bucket: str, key: str, *, part_bytes: int = DEFAULT_PART_BYTES, **put_kwargs: Any) -> None:
+        super().__init__()
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        # S3 rejects non-final parts below 5 MiB.
+        self.part_bytes = max(part_bytes, S3_MIN_PART_BYTES)
+        self.put_kwargs = put_kwargs
+        self.upload_id: Optional[str] = None
+        self.parts: List[Dict[str, Any]] = []
+        self.bytes_written = 0
+        self._buf = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def write(self, data: Any) -> int:
+        if self.closed:
+            raise ValueError("write to closed S3MultipartWriter")
+        n = len(data)
+        self._buf += data
+        self.bytes_written += n
+        while len(self._buf) >= self.part_bytes:
+            self._upload_part(self.part_bytes)
+        return n
+
+    def _upload_part(self, size: int) -> None:
+        if self.upload_id is None:
+            resp = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.put_kwargs)
+            self.upload_id = resp["UploadId"]
+        body = bytes(self._buf[:size])
+        del self._buf[:size]
+        part_number = len(self.parts) + 1
+        resp = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=body
+        )
+        self.parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+
+    def close(self) -> None:
+        """Complete the upload (or send the single small object)."""
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buf), **self.put_kwargs)
+            else:
+                if self._buf:
+                    self._upload_part(len(self._buf))
+                self.s3.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+                )
+        except BaseException:
+            self.abort()
+            raise
+        self._buf = bytearray()
+        super().close()
+
+    def abort(self) -> None:
+        """Discard everything written so far; nothing becomes visible at `key`."""
+        self._buf = bytearray()
+        try:
+            if self.upload_id is not None:
+                upload_id, self.upload_id = self.upload_id, None
+                self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=upload_id)
+        finally:
+            super().close()
+
+    def __del__(self) -> None:
+        # `IOBase.__del__` would call `close()` and publish a partial object; never commit implicitly.
+        pass
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -8,37 +8,177 @@ Why this exists:
 
 from __future__ import annotations
 
+import os
+import re
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Mapping
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 
 
 RECORD_TYPES = ("shipments", "tracking_events", "invoice_lines")
 
 
-SCHEMAS: Mapping[str, List[str]] = {
-    "shipments": ["record_type", "event_time", "shipment_id", "origin", "destination", "carrier", "weight_kg"],
-    "tracking_events": ["record_type", "event_time", "shipment_id", "status", "city"],
-    "invoice_lines": ["record_type", "event_time", "invoice_id", "sku", "quantity", "unit_price", "line_total"],
+# Single declarative source of truth: ordered `(column, logical_type)` per record type.
+# Logical types: "string", "float64", "int64", "timestamp" (ISO-8601 UTC string, `...Z`).
+# `SCHEMAS`, `to_pyarrow_schema` and the compiled normalizers below are all derived from this.
+RECORD_SCHEMAS: Mapping[str, Tuple[Tuple[str, str], ...]] = {
+    "shipments": (
+        ("record_type", "string"),
+        ("event_time", "timestamp"),
+        ("shipment_id", "string"),
+        ("origin", "string"),
+        ("destination", "string"),
+        ("carrier", "string"),
+        ("weight_kg", "float64"),
+    ),
+    "tracking_events": (
+        ("record_type", "string"),
+        ("event_time", "timestamp"),
+        ("shipment_id", "string"),
+        ("status", "string"),
+        ("city", "string"),
+    ),
+    "invoice_lines": (
+        ("record_type", "string"),
+        ("event_time", "timestamp"),
+        ("invoice_id", "string"),
+        ("sku", "string"),
+        ("quantity", "int64"),
+        ("unit_price", "float64"),
+        ("line_total", "float64"),
+    ),
 }
 
 
+SCHEMAS: Mapping[str, List[str]] = {rt: [name for name, _ in fields] for rt, fields in RECORD_SCHEMAS.items()}
+
+
+def _to_string(v: Any) -> Optional[str]:
+    if isinstance(v, (bool, int, float)):
+        return str(v)
+    raise ValueError(f"Expected string, got {type(v).__name__}")
+
+
+def _to_float(v: Any) -> Optional[float]:
+    if isinstance(v, bool):
+        raise ValueError("Expected number, got bool")
+    if isinstance(v, int):
+        return float(v)
+    if isinstance(v, str):
+        v = v.strip()
+        return float(v) if v else None
+    raise ValueError(f"Expected number, got {type(v).__name__}")
+
+
+def _to_int(v: Any) -> Optional[int]:
+    if isinstance(v, bool):
+        raise ValueError("Expected integer, got bool")
+    if isinstance(v, str):
+        v = v.strip()
+        if not v:
+            return None
+        try:
+            return int(v)
+        except ValueError:
+            v = float(v)
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    raise ValueError(f"Expected integer, got {v!r}")
+
+
+def _to_timestamp(v: Any) -> Optional[str]:
+    if isinstance(v, str):
+        return _iso_to_iso_z(v) if v.strip() else None
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        # Epoch seconds.
+        return datetime.fromtimestamp(v, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+    raise ValueError(f"Expected timestamp, got {type(v).__name__}")
+
+
+# Per logical type: (exact class that passes through untouched, slow-path coercer).
+_COERCERS: Mapping[str, Tuple[str, str]] = {
+    "string": ("str", "_to_string"),
+    "float64": ("float", "_to_float"),
+    "int64": ("int", "_to_int"),
+    "timestamp": ("", "_to_timestamp"),
+}
+
+
+def _normalizer_source(record_type: str, fields: Tuple[Tuple[str, str], ...], as_tuple: bool = False) -> str:
+    """
+    Generate one straight-line function per record type: field extraction, type coercion and
+    timestamp normalization in a single pass, with no per-record schema lookups or loops.
+    Values that already have the target type only pay for a `__class__` check.
+    With `as_tuple=True` the function returns the values in schema order instead of a dict.
+    """
+    suffix = "_values" if as_tuple else ""
+    lines = [f"def normalize_{record_type}{suffix}(record):", "    get = record.get"]
+    items: List[Tuple[str, str]] = []
+    for i, (name, logical_type) in enumerate(fields):
+        if name == "record_type":
+            items.append((name, repr(record_type)))
+            continue
+        fast_cls, coercer = _COERCERS[logical_type]
+        lines.append(f"    v{i} = get({name!r})")
+        if logical_type == "timestamp":
+            # Non-empty strings (the common case) go straight to the ISO normalizer.
+            lines.append(f"    if v{i} is not None: v{i} = _iso_to_iso_z(v{i}) if v{i}.__class__ is str and v{i} else {coercer}(v{i})")
+        else:
+            lines.append(f"    if v{i} is not None and v{i}.__class__ is not {fast_cls}: v{i} = {coercer}(v{i})")
+        items.append((name, f"v{i}"))
+    if as_tuple:
+        lines.append("    return (" + ", ".join(expr for _, expr in items) + ",)")
+    else:
+        lines.append("    return {" + ", ".join(f"{name!r}: {expr}" for name, expr in items) + "}")
+    return "\n".join(lines) + "\n"
+
+
+def _compile_normalizers(as_tuple: bool = False) -> Dict[str, Callable[[Mapping[str, Any]], Any]]:
+    compiled: Dict[str, Callable[[Mapping[str, Any]], Any]] = {}
+    suffix = "_values" if as_tuple else ""
+    for record_type, fields in RECORD_SCHEMAS.items():
+        namespace: Dict[str, Any] = {c: globals()[c] for _, c in _COERCERS.values()}
+        namespace["_iso_to_iso_z"] = _iso_to_iso_z
+        code = compile(_normalizer_source(record_type, fields, as_tuple), f"<normalize_{record_type}{suffix}>", "exec")
+        exec(code, namespace)
+        compiled[record_type] = namespace[f"normalize_{record_type}{suffix}"]
+    return compiled
+
+
 def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
     record_type = record.get("record_type")
-    if record_type not in SCHEMAS:
+    normalizer = _NORMALIZERS.get(record_type) if isinstance(record_type, str) else None
+    if normalizer is None:
         raise ValueError(f"Unsupported record_type: {record_type}")
+    return normalizer(record)
 
-    out: Dict[str, Any] = {}
-    for k in SCHEMAS[record_type]:
-        out[k] = record.get(k)
-    out["record_type"] = record_type
 
-    event_time = out.get("event_time")
-    if isinstance(event_time, str):
-        out["event_time"] = _iso_to_iso_z(event_time)
-    return out
+def normalize_record_values(record: Mapping[str, Any]) -> Tuple[str, Tuple[Any, ...]]:
+    """Like `normalize_record`, but return `(record_type, values)` with values in `RECORD_SCHEMAS` order."""
+    record_type = record.get("record_type")
+    normalizer = _VALUE_NORMALIZERS.get(record_type) if isinstance(record_type, str) else None
+    if normalizer is None:
+        raise ValueError(f"Unsupported record_type: {record_type}")
+    return record_type, normalizer(record)
+
+
+# Already-canonical output of `_iso_to_iso_z`: `YYYY-MM-DDTHH:MM:SS(.ffffff)?Z`. Days 29-31 are left to
+# the slow path so month lengths and leap years are still validated by `datetime`.
+_CANONICAL_TS = re.compile(r"\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|1\d|2[0-8])T(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d(?:\.\d{6})?Z")
 
 
 def _iso_to_iso_z(s: str) -> str:
+    # Fast path: canonical strings are returned as-is without building a datetime.
+    # `isoformat()` omits an all-zero fraction, so `.000000Z` is not canonical.
+    n = len(s)
+    if (n == 20 or (n == 27 and not s.endswith(".000000Z"))) and _CANONICAL_TS.fullmatch(s):
+        return s
+    return _parse_iso_to_iso_z(s)
+
+
+@lru_cache(maxsize=int(os.getenv("TIMESTAMP_CACHE_SIZE", "65536")))
+def _parse_iso_to_iso_z(s: str) -> str:
+    # Tracking feeds repeat the same timestamps heavily within a file; memoize the slow path.
     if s.endswith("Z"):
         s = s[:-1] + "+00:00"
     dt = datetime.fromisoformat(s)
@@ -47,44 +187,121 @@ def _iso_to_iso_z(s: str) -> str:
     return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def to_pyarrow_schema(record_type: str):
+_NORMALIZERS = _compile_normalizers()
+_VALUE_NORMALIZERS = _compile_normalizers(as_tuple=True)
+
+
+@lru_cache(maxsize=None)
+def to_pyarrow_schema(record_type: str, timestamp_type: str = "string"):
+    """
+    Arrow schema for `record_type` (cached: schemas are immutable and rebuilt on every write otherwise).
+
+    `timestamp_type="timestamp"` types timestamp columns as `timestamp[us, tz=UTC]` instead of ISO
+    strings, so Athena can prune on them. Pick one per table: Glue/Athena cannot mix both types
+    across files of the same table.
+    """
     import pyarrow as pa  # type: ignore
 
-    if record_type == "shipments":
-        return pa.schema(
-            [
-                ("record_type", pa.string()),
-                ("event_time", pa.string()),
-                ("shipment_id", pa.string()),
-                ("origin", pa.string()),
-                ("destination", pa.string()),
-                ("carrier", pa.string()),
-                ("weight_kg", pa.float64()),
-            ]
-        )
-    if record_type == "tracking_events":
-        return pa.schema(
-            [
-                ("record_type", pa.string()),
-                ("event_time", pa.string()),
-                ("shipment_id", pa.string()),
-                ("status", pa.string()),
-                ("city", pa.string()),
-            ]
-        )
-    if record_type == "invoice_lines":
-        return pa.schema(
-            [
-                ("record_type", pa.string()),
-                ("event_time", pa.string()),
-                ("invoice_id", pa.string()),
-                ("sku", pa.string()),
-                ("quantity", pa.int64()),
-                ("unit_price", pa.float64()),
-                ("line_total", pa.float64()),
-            ]
-        )
-    raise ValueError(f"Unsupported record_type: {record_type}")
+    if record_type not in RECORD_SCHEMAS:
+        raise ValueError(f"Unsupported record_type: {record_type}")
+    if timestamp_type not in ("string", "timestamp"):
+        raise ValueError(f"Unsupported timestamp_type: {timestamp_type}")
+    arrow_types = {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC") if timestamp_type == "timestamp" else pa.string(),
+    }
+    return pa.schema([(name, arrow_types[logical_type]) for name, logical_type in RECORD_SCHEMAS[record_type]])
+
+
+# Parquet encoding profile per record type, shared by the transform writer, buffered flushes and
+# compaction. Dictionary encoding only on low-cardinality columns; Bloom filters on lookup ids.
+DEFAULT_PARQUET_PROFILE: Mapping[str, Any] = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "row_group_size": 50000,
+    "use_dictionary": True,
+    "write_statistics": True,
+    "write_page_index": True,
+    "bloom_filter_columns": (),
+    "bloom_filter_fpp": 0.01,
+    # Rows are sorted by these columns before encoding so row-group min/max stats become selective.
+    "sort_by": (),
+}
+
+PARQUET_PROFILES: Mapping[str, Mapping[str, Any]] = {
+    "shipments": {
+        "use_dictionary": ("record_type", "origin", "destination", "carrier"),
+        "bloom_filter_columns": ("shipment_id",),
+        "sort_by": ("shipment_id", "event_time"),
+    },
+    "tracking_events": {
+        "use_dictionary": ("record_type", "status", "city"),
+        "bloom_filter_columns": ("shipment_id",),
+        "sort_by": ("shipment_id", "event_time"),
+    },
+    "invoice_lines": {
+        "use_dictionary": ("record_type", "sku"),
+        "bloom_filter_columns": ("invoice_id",),
+        "sort_by": ("invoice_id", "event_time"),
+    },
+}
+
+
+def parquet_profile(record_type: str, overrides: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """Resolved profile: defaults, then the record type's entry, then `overrides` (e.g. from JSON config)."""
+    if record_type not in RECORD_SCHEMAS:
+        raise ValueError(f"Unsupported record_type: {record_type}")
+    profile = {**DEFAULT_PARQUET_PROFILE, **PARQUET_PROFILES.get(record_type, {}), **(overrides or {})}
+    unknown = set(profile) - set(DEFAULT_PARQUET_PROFILE)
+    if unknown:
+        raise ValueError(f"Unsupported parquet profile keys: {sorted(unknown)}")
+    return profile
+
+
+@lru_cache(maxsize=1)
+def _parquet_writer_params() -> frozenset:
+    import inspect
+
+    import pyarrow.parquet as pq  # type: ignore
+
+    return frozenset(inspect.signature(pq.ParquetWriter.__init__).parameters)
+
+
+def parquet_writer_options(profile: Mapping[str, Any], schema: Any = None) -> Dict[str, Any]:
+    """
+    `pq.ParquetWriter` keyword arguments for a resolved profile (`row_group_size` and `sort_by` are
+    applied by the caller when writing). Options the installed pyarrow does not support (e.g. Bloom
+    filters on older releases) are dropped rather than failing the write. With `schema`, the
+    `sort_by` columns are also recorded as the file's `sorting_columns` metadata.
+    """
+    options: Dict[str, Any] = {
+        "compression": profile["compression"],
+        # snappy / none reject any level.
+        "compression_level": profile["compression_level"] if profile["compression"] in ("zstd", "gzip", "brotli") else None,
+        "use_dictionary": profile["use_dictionary"] if isinstance(profile["use_dictionary"], bool) else list(profile["use_dictionary"]),
+        "write_statistics": profile["write_statistics"],
+        "write_page_index": profile["write_page_index"],
+    }
+    if profile["bloom_filter_columns"]:
+        options["bloom_filter_options"] = {
+            col: {"ndv": int(profile["row_group_size"]), "fpp": float(profile["bloom_filter_fpp"])}
+            for col in profile["bloom_filter_columns"]
+        }
+    if profile["sort_by"] and schema is not None and "sorting_columns" in _parquet_writer_params():
+        import pyarrow.parquet as pq  # type: ignore
+
+        options["sorting_columns"] = [pq.SortingColumn(schema.get_field_index(col)) for col in profile["sort_by"]]
+    supported = _parquet_writer_params()
+    return {k: v for k, v in options.items() if k in supported}
+
+
+def sort_table(table: Any, profile: Mapping[str, Any]) -> Any:
+    """Apply the profile's `sort_by` (ascending, nulls last) to an Arrow table."""
+    if not profile["sort_by"]:
+        return table
+    return table.sort_by([(col, "ascending") for col in profile["sort_by"]])
 
 
 def partition_dt(records: Iterable[Dict[str, Any]]) -> str:
@@ -0,0 +1,123 @@
+"""
+Bounded-concurrency SQS batch publisher.
+
+Why this exists:
+- Sequential `send_message_batch` calls cap ingest at one round trip per 10 records, which is what
+  pushes large Bronze objects into the Lambda timeout.
+- SQS reports per-entry failures in the response `Failed` array; only those entries are retried
+  (with jittered exponential backoff) instead of resending the whole batch.
+
+Batches are built lazily from the input iterable, and at most `max_in_flight` batches are
+outstanding at any time, so memory stays bounded when the input is a generator. Batches are also
+cut when their total payload would exceed `max_batch_bytes`, which matters once bodies are
+multi-record envelopes (see `lambdas.shared.envelope`).
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from lambdas.shared.utils import bounded_map, jittered_backoff
+
+
+SQS_MAX_BATCH_ENTRIES = 10
+SQS_MAX_BATCH_BYTES = 1024 * 1024
+
+
+def iter_batch_entries(
+    bodies: Iterable[str],
+    size: int = SQS_MAX_BATCH_ENTRIES,
+    max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+) -> Iterator[List[Dict[str, Any]]]:
+    entries: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for body in bodies:
+        n = len(body.encode("utf-8"))
+        if entries and batch_bytes + n > max_batch_bytes:
+            yield entries
+            entries = []
+            batch_bytes = 0
+        entries.append({"Id": str(len(entries)), "MessageBody": body})
+        batch_bytes += n
+        if len(entries) == size:
+            yield entries
+            entries = []
+            batch_bytes = 0
+    if entries:
+        yield entries
+
+
+def send_batch_with_retry(
+    sqs: Any,
+    queue_url: str,
+    entries: List[Dict[str, Any]],
+    *,
+    max_attempts: int = 5,
+    backoff_base_seconds: float = 0.05,
+    backoff_max_seconds: float = 2.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    pending = entries
+    max_attempts = max(1, max_attempts)
+    for attempt in range(1, max_attempts + 1):
+        resp = sqs.send_message_batch(QueueUrl=queue_url, Entries=pending)
+        failed = resp.get("Failed") or []
+        if not failed:
+            return len(entries)
+
+        sender_faults = [f for f in failed if f.get("SenderFault")]
+        if sender_faults:
+            # Malformed entries will never succeed on retry.
+            raise RuntimeError(f"sqs_send_failed={len(sender_faults)} sender_fault=true first={sender_faults[0].get('Message')}")
+        if attempt == max_attempts:
+            raise RuntimeError(f"sqs_send_failed={len(failed)} attempts={attempt} first={failed[0].get('Message')}")
+
+        failed_ids = {f.get("Id") for f in failed}
+        pending = [e for e in pending if e["Id"] in failed_ids]
+        sleep(jittered_backoff(attempt, backoff_base_seconds, backoff_max_seconds))
+    raise AssertionError("unreachable")
+
+
+def publish_batches(
+    sqs: Any,
+    queue_url: str,
+    bodies: Iterable[str],
+    *,
+    concurrency: int = 8,
+    max_in_flight: int = 0,
+    max_attempts: int = 5,
+    backoff_base_seconds: float = 0.05,
+    max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """
+    Publish message bodies in batches of up to 10 and return the number of messages sent.
+
+    Entry order is kept within each batch; batches themselves may complete out of order.
+    The first batch that exhausts its retries raises `RuntimeError` after in-flight batches drain.
+    """
+    batches = iter_batch_entries(bodies, max_batch_bytes=max_batch_bytes)
+
+    def _send(entries: List[Dict[str, Any]]) -> int:
+        return send_batch_with_retry(
+            sqs,
+            queue_url,
+            entries,
+            max_attempts=max_attempts,
+            backoff_base_seconds=backoff_base_seconds,
+            sleep=sleep,
+        )
+
+    sent = 0
+    results = bounded_map(
+        _send,
+        batches,
+        concurrency=concurrency,
+        max_in_flight=max_in_flight or 2 * concurrency,
+        thread_name_prefix="sqs-publish",
+    )
+    for _, error, count in results:
+        if error is not None:
+            results.close()  # cancels batches not yet started; running ones finish first
+            raise error
+        sent += count
+    return sent
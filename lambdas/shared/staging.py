@@ -0,0 +1,297 @@
+"""
+S3 staging buffer for Silver micro-batches.
+
+Why this exists:
+- With small SQS batches every transform invocation writes one tiny Parquet file per
+  `(record_type, partition)`, and Athena scans / Glue crawls slow down as millions of them pile up.
+- In staging mode transform writes its per-invocation Parquet parts under a staging prefix
+  (outside the crawled Silver prefix) and acks SQS messages once their rows are durably staged.
+  A partition is merged into one Silver file once its staged rows, bytes or age cross a threshold.
+
+Layout (Silver bucket; `{partition}` is `Partition.path`, `dt=...` or `dt=.../hour=...`):
+- `{staging_prefix}/{record_type}/{partition}/part_{staged_at_ms}_{rows}_{id}.parquet`: staged parts
+- `{staging_prefix}/{record_type}/{partition}/_flush.lock`: flush lock
+- `{staging_prefix}/{record_type}/{partition}/_flush_{flush_id}.json`: flush manifest (intent record)
+
+Flush protocol (at most one flusher per partition):
+0. LIST the partition without the lock; stop unless a flush is due (or a manifest is left over), so
+   invocations with nothing due never touch the lock. The checks are repeated under the lock.
+1. Take the lock with a conditional create (`PutObject(IfNoneMatch="*")`). A lock older than
+   `lock_ttl_seconds` (keep it above the Lambda timeout) is treated as abandoned and broken.
+   Release is conditional on the lock's ETag, so a flusher whose lock was broken cannot delete
+   the lock of the flusher that took over.
+2. Recover leftovers: for each manifest, if its output object exists the previous flush committed
+   and only its inputs still need deleting; otherwise the manifest is dropped and its inputs stay staged.
+3. Snapshot the oldest staged parts, write the manifest, write the Silver object named in it,
+   delete the inputs, then delete the manifest. Parts are merged with bounded memory
+   (`lambdas.shared.compaction.merge_sorted`), never concatenated whole.
+
+A crash at any step leaves either staged parts (flushed again later) or a manifest whose output
+exists (finished by step 2), so every staged row reaches Silver exactly once.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import time
+from typing import Any, Callable, Iterator, List, Mapping, Optional, Tuple
+
+from lambdas.shared.compaction import PARQUET_EXPANSION_FACTOR, default_memory_budget_bytes, merge_sorted
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.s3_stream import S3MultipartWriter
+from lambdas.shared.schemas import RECORD_TYPES, parquet_profile, parquet_writer_options, to_pyarrow_schema
+from lambdas.shared.utils import new_id
+
+
+LOCK_NAME = "_flush.lock"
+MANIFEST_PREFIX = "_flush_"
+PART_PREFIX = "part_"
+
+
+class StagedPart:
+    __slots__ = ("key", "size", "rows", "staged_at_ms")
+
+    def __init__(self, key: str, size: int, rows: int, staged_at_ms: int) -> None:
+        self.key = key
+        self.size = size
+        self.rows = rows
+        self.staged_at_ms = staged_at_ms
+
+
+def partition_prefix(staging_prefix: str, record_type: str, partition: Partition) -> str:
+    return f"{staging_prefix.rstrip('/')}/{record_type}/{partition.path}/"
+
+
+def staged_part_key(staging_prefix: str, record_type: str, partition: Partition, rows: int, now_ms: Optional[int] = None) -> str:
+    # Row count and staging time live in the key so flush decisions need only a LIST.
+    staged_at_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return f"{partition_prefix(staging_prefix, record_type, partition)}{PART_PREFIX}{staged_at_ms:013d}_{rows}_{new_id()}.parquet"
+
+
+def _parse_part(key: str, size: int) -> Optional[StagedPart]:
+    name = key.rsplit("/", 1)[-1]
+    if not (name.startswith(PART_PREFIX) and name.endswith(".parquet")):
+        return None
+    try:
+        staged_at_ms, rows, _ = name[len(PART_PREFIX) : -len(".parquet")].split("_", 2)
+        return StagedPart(key, size, int(rows), int(staged_at_ms))
+    except ValueError:
+        return None
+
+
+def list_partition(s3: Any, bucket: str, prefix: str) -> Tuple[List[StagedPart], List[str]]:
+    """Return `(staged parts oldest first, manifest keys)` under one partition prefix."""
+    parts: List[StagedPart] = []
+    manifests: List[str] = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.rsplit("/", 1)[-1].startswith(MANIFEST_PREFIX):
+                manifests.append(key)
+                continue
+            part = _parse_part(key, int(obj.get("Size", 0)))
+            if part is not None:
+                parts.append(part)
+    parts.sort(key=lambda p: (p.staged_at_ms, p.key))
+    return parts, manifests
+
+
+def _child_prefixes(paginator: Any, bucket: str, prefix: str, name_prefix: str) -> List[str]:
+    names: List[str] = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+        for cp in page.get("CommonPrefixes", []):
+            name = cp["Prefix"][len(prefix) :].rstrip("/")
+            if name.startswith(name_prefix):
+                names.append(name[len(name_prefix) :])
+    return names
+
+
+def list_staged_partitions(s3: Any, bucket: str, staging_prefix: str, granularity: str = "dt") -> List[Tuple[str, Partition]]:
+    """Return every `(record_type, partition)` that currently has objects under the staging prefix."""
+    found: List[Tuple[str, Partition]] = []
+    paginator = s3.get_paginator("list_objects_v2")
+    for record_type in RECORD_TYPES:
+        type_prefix = f"{staging_prefix.rstrip('/')}/{record_type}/"
+        for dt in _child_prefixes(paginator, bucket, type_prefix, "dt="):
+            if granularity != "dt/hour":
+                found.append((record_type, Partition(dt)))
+                continue
+            hours = _child_prefixes(paginator, bucket, f"{type_prefix}dt={dt}/", "hour=")
+            found.extend((record_type, Partition(dt, hour)) for hour in hours)
+    return found
+
+
+def flush_due(parts: List[StagedPart], *, max_rows: int, max_bytes: int, max_age_seconds: int, now_ms: int) -> bool:
+    if not parts:
+        return False
+    if sum(p.rows for p in parts) >= max_rows or sum(p.size for p in parts) >= max_bytes:
+        return True
+    return now_ms - parts[0].staged_at_ms >= max_age_seconds * 1000
+
+
+def _is_precondition_failure(e: Exception) -> bool:
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409")
+
+
+def _object_exists(s3: Any, bucket: str, key: str) -> bool:
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except Exception as e:
+        if getattr(e, "response", {}).get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def _delete_keys(s3: Any, bucket: str, keys: List[str]) -> None:
+    for i in range(0, len(keys), 1000):
+        s3.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": k} for k in keys[i : i + 1000]], "Quiet": True})
+
+
+def acquire_lock(s3: Any, bucket: str, lock_key: str, *, owner: str, ttl_seconds: int, now_ms: int) -> Optional[str]:
+    """Create the lock object (breaking one older than `ttl_seconds`); return its ETag, None if held."""
+    body = json.dumps({"owner": owner, "acquired_at_ms": now_ms}).encode("utf-8")
+    for _ in range(2):
+        try:
+            return s3.put_object(Bucket=bucket, Key=lock_key, Body=body, IfNoneMatch="*")["ETag"]
+        except Exception as e:
+            if not _is_precondition_failure(e):
+                raise
+        try:
+            held = s3.get_object(Bucket=bucket, Key=lock_key)
+            acquired_at_ms = int(json.loads(held["Body"].read()).get("acquired_at_ms", 0))
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                continue  # released in between; retry the create
+            raise
+        if now_ms - acquired_at_ms < ttl_seconds * 1000:
+            return None
+        # Abandoned (holder crashed or timed out): break it, but only if nobody replaced it meanwhile.
+        try:
+            s3.delete_object(Bucket=bucket, Key=lock_key, IfMatch=held["ETag"])
+        except Exception as e:
+            if not _is_precondition_failure(e):
+                raise
+            return None
+    return None
+
+
+def release_lock(s3: Any, bucket: str, lock_key: str, etag: str) -> None:
+    """Delete the lock only if it is still the object `acquire_lock` created (not broken and retaken)."""
+    try:
+        s3.delete_object(Bucket=bucket, Key=lock_key, IfMatch=etag)
+    except Exception as e:
+        if not _is_precondition_failure(e):
+            raise
+
+
+def _merge_parts(
+    s3: Any,
+    bucket: str,
+    parts: List[StagedPart],
+    record_type: str,
+    timestamp_type: str,
+    output_key: str,
+    profile_overrides: Optional[Mapping[str, Any]] = None,
+    memory_budget_bytes: Optional[int] = None,
+) -> None:
+    import pyarrow.parquet as pq  # type: ignore
+
+    schema = to_pyarrow_schema(record_type, timestamp_type=timestamp_type)
+    profile = parquet_profile(record_type, profile_overrides)
+
+    def _tables() -> Iterator[Any]:
+        # One staged part (a single invocation's micro-batch) in memory at a time.
+        for part in parts:
+            body = s3.get_object(Bucket=bucket, Key=part.key)["Body"].read()
+            yield pq.read_table(io.BytesIO(body)).select(schema.names).cast(schema)
+
+    tables = merge_sorted(
+        _tables(),
+        profile,
+        decoded_bytes=sum(p.size for p in parts) * PARQUET_EXPANSION_FACTOR,
+        memory_budget_bytes=default_memory_budget_bytes() if memory_budget_bytes is None else memory_budget_bytes,
+        batch_rows=profile["row_group_size"],
+    )
+    with S3MultipartWriter(s3, bucket, output_key) as sink:
+        with pq.ParquetWriter(sink, schema, **parquet_writer_options(profile, schema)) as writer:
+            for table in tables:
+                writer.write_table(table, row_group_size=profile["row_group_size"])
+
+
+def flush_partition(
+    s3: Any,
+    bucket: str,
+    *,
+    staging_prefix: str,
+    silver_prefix: str,
+    record_type: str,
+    partition: Partition,
+    max_rows: int,
+    max_bytes: int,
+    max_age_seconds: int,
+    lock_ttl_seconds: int = 1800,
+    timestamp_type: str = "string",
+    force: bool = False,
+    profile_overrides: Optional[Mapping[str, Any]] = None,
+    memory_budget_bytes: Optional[int] = None,
+    clock: Callable[[], float] = time.time,
+) -> List[str]:
+    """
+    Merge due staged parts of one partition into Silver; return the Silver keys written.
+
+    Returns an empty list when nothing is due or another flusher holds the partition lock.
+    With `force=True` every staged part is flushed regardless of thresholds.
+    `memory_budget_bytes` bounds the decoded rows held while merging (default: a quarter of memory).
+    """
+    prefix = partition_prefix(staging_prefix, record_type, partition)
+    thresholds = {"max_rows": max_rows, "max_bytes": max_bytes, "max_age_seconds": max_age_seconds}
+    parts, manifests = list_partition(s3, bucket, prefix)
+    if not manifests and not (parts and (force or flush_due(parts, **thresholds, now_ms=int(clock() * 1000)))):
+        return []
+
+    lock_key = prefix + LOCK_NAME
+    owner = new_id()
+    lock_etag = acquire_lock(s3, bucket, lock_key, owner=owner, ttl_seconds=lock_ttl_seconds, now_ms=int(clock() * 1000))
+    if not lock_etag:
+        return []
+
+    written: List[str] = []
+    try:
+        # Re-list under the lock: another flusher may have finished in between.
+        parts, manifests = list_partition(s3, bucket, prefix)
+        for manifest_key in manifests:
+            manifest = json.loads(s3.get_object(Bucket=bucket, Key=manifest_key)["Body"].read())
+            if _object_exists(s3, bucket, manifest["output_key"]):
+                _delete_keys(s3, bucket, manifest["inputs"])
+            s3.delete_object(Bucket=bucket, Key=manifest_key)
+        if manifests:
+            parts, _ = list_partition(s3, bucket, prefix)
+
+        while parts and (force or flush_due(parts, **thresholds, now_ms=int(clock() * 1000))):
+            # Oldest parts first, cut at the row/byte threshold so flushed files land near the target size.
+            batch: List[StagedPart] = []
+            rows = size = 0
+            for part in parts:
+                if batch and (rows >= max_rows or size >= max_bytes):
+                    break
+                batch.append(part)
+                rows += part.rows
+                size += part.size
+            parts = parts[len(batch) :]
+
+            flush_id = new_id()
+            output_key = f"{silver_prefix.rstrip('/')}/{record_type}/{partition.path}/batch_{flush_id}.parquet"
+            manifest_key = f"{prefix}{MANIFEST_PREFIX}{flush_id}.json"
+            manifest = {"flush_id": flush_id, "output_key": output_key, "inputs": [p.key for p in batch], "rows": rows}
+            s3.put_object(Bucket=bucket, Key=manifest_key, Body=json.dumps(manifest).encode("utf-8"))
+            _merge_parts(s3, bucket, batch, record_type, timestamp_type, output_key, profile_overrides, memory_budget_bytes)
+            _delete_keys(s3, bucket, manifest["inputs"])
+            s3.delete_object(Bucket=bucket, Key=manifest_key)
+            written.append(output_key)
+    finally:
+        release_lock(s3, bucket, lock_key, lock_etag)
+    return written
+
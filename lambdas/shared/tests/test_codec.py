@@ -0,0 +1,36 @@
+import dataclasses
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from lambdas.shared.codec import select_codec
+
+
+@pytest.mark.parametrize("backend", ["stdlib", "orjson", "msgspec"])
+def test_json_codec_backends_match_stdlib_semantics(backend):
+    if backend != "stdlib":
+        pytest.importorskip(backend)
+    _, (loads, dumps, dumps_bytes) = select_codec(backend)
+
+    @dataclasses.dataclass
+    class _Point:
+        x: int
+
+    payload = {
+        "city": "Zürich 深圳",
+        "when": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "amount": Decimal("1.10"),
+        "point": _Point(1),
+        "big": 2**70,
+        1: [True, None, 1.5],
+    }
+    expected = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+    assert dumps(payload) == expected
+    assert dumps_bytes(payload) == expected.encode("utf-8")
+
+    for raw in ('{"a":"é","n":[1,2.5,null]}', b'{"a":"\\u00e9"}', b'{"x":NaN}'):
+        assert json.dumps(loads(raw)) == json.dumps(json.loads(raw))
+    with pytest.raises(ValueError):
+        loads(b"not-json")
@@ -0,0 +1,31 @@
+import pytest
+
+from lambdas.shared.columnar import ColumnarBatches, rows_to_table
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.schemas import normalize_record, normalize_record_values, to_pyarrow_schema
+
+
+def test_columnar_batches_match_from_pylist():
+    pa = pytest.importorskip("pyarrow")
+
+    raw = [
+        {"record_type": "invoice_lines", "event_time": "2025-01-02T03:04:05+00:00", "invoice_id": "i1", "quantity": "2", "unit_price": 1},
+        {"record_type": "invoice_lines", "event_time": "2025-01-02T23:00:00Z", "sku": "s", "line_total": 9.5},
+        {"record_type": "invoice_lines", "event_time": "2025-01-03T00:00:00Z", "invoice_id": "i3"},
+        {"record_type": "tracking_events", "shipment_id": "shp_1", "status": "IN_TRANSIT"},
+    ]
+    batches = ColumnarBatches(fallback_dt="1999-01-01")
+    for i, rec in enumerate(raw):
+        batches.add(f"m{i}", *normalize_record_values(rec))
+
+    assert sorted(batches.partitions) == [
+        ("invoice_lines", Partition("2025-01-02")),
+        ("invoice_lines", Partition("2025-01-03")),
+        ("tracking_events", Partition("1999-01-01")),
+    ]
+    part = batches.partitions[("invoice_lines", Partition("2025-01-02"))]
+    assert part.msg_ids == ["m0", "m1"]
+
+    expected = pa.Table.from_pylist([normalize_record(r) for r in raw[:2]], schema=to_pyarrow_schema("invoice_lines"))
+    assert rows_to_table("invoice_lines", part.rows).equals(expected)
+    assert rows_to_table("shipments", []).schema == to_pyarrow_schema("shipments")
@@ -0,0 +1,147 @@
+import json
+
+import pytest
+
+from lambdas.shared import compaction
+from lambdas.shared.columnar import rows_to_table
+from lambdas.shared.schemas import RECORD_SCHEMAS
+
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _write_silver(root, name, ids):
+    fields = [f for f, _ in RECORD_SCHEMAS["shipments"]]
+    rows = []
+    for i in ids:
+        values = dict.fromkeys(fields)
+        values.update(record_type="shipments", shipment_id=f"s{i:04d}", carrier="UPS", event_time="2025-12-31T00:00:00Z")
+        rows.append(tuple(values[f] for f in fields))
+    path = root / "silver" / "shipments" / "dt=2025-12-31" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(rows_to_table("shipments", rows), str(path))
+    return path
+
+
+def _compact(tmp_path, **kwargs):
+    return compaction.compact_partition(
+        str(tmp_path / "silver"), str(tmp_path / "compacted"), "shipments", "2025-12-31", **kwargs
+    )
+
+
+def _compacted_ids(tmp_path):
+    out = tmp_path / "compacted" / "shipments" / "dt=2025-12-31"
+    return sorted(i for f in out.glob("*.parquet") for i in pq.read_table(str(f)).column("shipment_id").to_pylist())
+
+
+def test_compaction_is_incremental_and_idempotent(tmp_path):
+    _write_silver(tmp_path, "a.parquet", range(0, 10))
+    _write_silver(tmp_path, "b.parquet", range(10, 20))
+
+    first = _compact(tmp_path)
+    assert first["inputs"] == 2 and first["rows"] == 20 and len(first["outputs"]) == 1
+    out = pq.read_table(first["outputs"][0])
+    assert "_ingested_at" in out.column_names
+    assert out.column("shipment_id").to_pylist() == [f"s{i:04d}" for i in range(20)]
+
+    # Rerun with nothing new: no work, no new outputs.
+    assert _compact(tmp_path)["inputs"] == 0
+
+    _write_silver(tmp_path, "c.parquet", range(20, 25))
+    second = _compact(tmp_path)
+    assert second["inputs"] == 1 and second["rows"] == 5
+    assert _compacted_ids(tmp_path) == [f"s{i:04d}" for i in range(25)]
+
+    manifest = json.loads((tmp_path / "compacted" / "_compaction" / "shipments" / "dt=2025-12-31" / "manifest.json").read_text())
+    assert manifest["pending"] is None and len(manifest["compacted"]) == 3 and len(manifest["outputs"]) == 2
+
+
+def test_compaction_packs_outputs_to_target_size(tmp_path):
+    sizes = [_write_silver(tmp_path, f"{n}.parquet", range(n * 10, n * 10 + 10)).stat().st_size for n in range(4)]
+    result = _compact(tmp_path, target_file_bytes=sizes[0] * 2)
+    assert result["inputs"] == 4 and len(result["outputs"]) == 2
+    assert _compacted_ids(tmp_path) == [f"s{i:04d}" for i in range(40)]
+
+
+def test_compaction_replays_pending_plan_after_crash(tmp_path, monkeypatch):
+    _write_silver(tmp_path, "a.parquet", range(0, 10))
+    _write_silver(tmp_path, "b.parquet", range(10, 20))
+
+    def _crash(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    with monkeypatch.context() as m:
+        m.setattr(compaction, "_write_group", _crash)
+        with pytest.raises(RuntimeError):
+            _compact(tmp_path)
+
+    # A file landing after the crash is not folded into the interrupted plan.
+    _write_silver(tmp_path, "c.parquet", range(20, 25))
+    recovered = _compact(tmp_path)
+    assert recovered["recovered"] is True and recovered["inputs"] == 2
+
+    assert _compact(tmp_path)["inputs"] == 1
+    assert _compacted_ids(tmp_path) == [f"s{i:04d}" for i in range(25)]
+
+
+def test_compaction_rejects_in_place_output(tmp_path):
+    with pytest.raises(ValueError):
+        compaction.compact_partition(str(tmp_path / "silver"), str(tmp_path / "silver"), "shipments", "2025-12-31")
+
+
+def test_compaction_streams_groups_over_memory_budget(tmp_path):
+    for n in range(3):
+        _write_silver(tmp_path, f"{n}.parquet", range(n * 7, n * 7 + 7))
+    result = _compact(tmp_path, memory_budget_bytes=0, profile_overrides={"row_group_size": 5})
+    assert result["rows"] == 21
+
+    f = pq.ParquetFile(result["outputs"][0])
+    assert [f.metadata.row_group(i).num_rows for i in range(f.num_row_groups)] == [5, 5, 5, 5, 1]
+    assert f.schema_arrow.names[-1] == "_ingested_at"
+    assert _compacted_ids(tmp_path) == [f"s{i:04d}" for i in range(21)]
+
+
+def test_memory_decisions_use_decoded_not_object_size(tmp_path, monkeypatch):
+    path = _write_silver(tmp_path, "a.parquet", range(0, 2000))
+    fs, _ = compaction.resolve_root(str(tmp_path))
+    decoded = compaction.uncompressed_bytes(fs, [str(path)])
+    assert decoded > path.stat().st_size
+
+    # A budget between object size and decoded size takes the external sort instead of reading it whole.
+    spilled = []
+    spill_runs = compaction._spill_runs
+    monkeypatch.setattr(compaction, "_spill_runs", lambda *a, **k: spilled.extend(spill_runs(*a, **k)) or list(spilled))
+    result = _compact(tmp_path, memory_budget_bytes=(path.stat().st_size + decoded) // 2)
+    assert result["rows"] == 2000 and spilled
+
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "2048")
+    assert compaction.default_memory_budget_bytes() == 512 * 1024 * 1024
+
+
+def test_external_merge_sort_matches_in_memory_sort():
+    import random
+
+    rng = random.Random(7)
+    profile = {"sort_by": ("shipment_id", "event_time")}
+    tables = []
+    for _ in range(12):
+        n = rng.randint(0, 40)
+        tables.append(
+            pa.table(
+                {
+                    "shipment_id": [rng.choice([None, "a", "b", "c", "d"]) for _ in range(n)],
+                    "event_time": [rng.choice([None, "t1", "t2", "t3"]) for _ in range(n)],
+                    "n": list(range(n)),
+                }
+            )
+        )
+    expected = pa.concat_tables(tables).sort_by([("shipment_id", "ascending"), ("event_time", "ascending")])
+
+    for budget in (0, 2048, 10**9):
+        out = list(compaction.merge_sorted(iter(tables), profile, decoded_bytes=10**6, memory_budget_bytes=budget, batch_rows=16))
+        assert all(t.num_rows == 16 for t in out[:-1])
+        merged = pa.concat_tables(out)
+        keys = ["shipment_id", "event_time"]
+        assert merged.select(keys).to_pylist() == expected.select(keys).to_pylist()
+        assert sorted(merged.to_pylist(), key=repr) == sorted(expected.to_pylist(), key=repr)
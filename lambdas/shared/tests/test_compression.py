@@ -0,0 +1,49 @@
+import bz2
+import gzip
+import io
+
+import pytest
+
+from lambdas.shared.compression import detect_compression, open_decompressed
+from lambdas.shared.utils import iter_json_records_stream
+
+
+class _Body:
+    """Minimal S3 `StreamingBody` stand-in."""
+
+    def __init__(self, b: bytes):
+        self._b = io.BytesIO(b)
+
+    def read(self, amt=None):
+        return self._b.read(amt)
+
+    def close(self):
+        self._b.close()
+
+
+@pytest.mark.parametrize(
+    "key,content_encoding,codec",
+    [
+        ("bronze/shipments/a.jsonl.gz", None, "gzip"),
+        ("bronze/shipments/a.jsonl.bz2", None, "bzip2"),
+        ("bronze/shipments/a.jsonl.zst", None, "zstd"),
+        ("bronze/shipments/a.jsonl", "gzip", "gzip"),
+        ("bronze/shipments/a.jsonl", None, None),
+    ],
+)
+def test_compressed_bronze_objects_stream_through_parser(key, content_encoding, codec):
+    lines = b"".join(b'{"record_type":"shipments","shipment_id":"shp_%d"}\n' % i for i in range(2000))
+    if codec == "gzip":
+        payload = gzip.compress(lines)
+    elif codec == "bzip2":
+        payload = bz2.compress(lines)
+    elif codec == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        payload = zstandard.ZstdCompressor().compress(lines)
+    else:
+        payload = lines
+
+    assert detect_compression(key, content_encoding) == codec
+    stream = open_decompressed(_Body(payload), codec)
+    records = list(iter_json_records_stream(stream, chunk_size=257))
+    assert [r["shipment_id"] for r in records] == [f"shp_{i}" for i in range(2000)]
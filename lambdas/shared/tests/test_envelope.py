@@ -0,0 +1,22 @@
+import json
+
+from lambdas.shared.envelope import pack_envelopes, unpack_records
+from lambdas.shared.sqs_publisher import iter_batch_entries
+from lambdas.shared.utils import json_dumps
+
+
+def test_envelopes_respect_byte_budget_and_round_trip():
+    records = [{"record_type": "shipments", "shipment_id": f"shp_{i}", "city": "Zürich" * (i % 5)} for i in range(500)]
+    huge = {"record_type": "shipments", "shipment_id": "big", "pad": "x" * 5000}
+    bodies = [json_dumps(r) for r in records[:250]] + [json_dumps(huge)] + [json_dumps(r) for r in records[250:]]
+
+    messages = list(pack_envelopes(bodies, max_bytes=4096))
+    assert all(len(m.encode("utf-8")) <= 4096 for m in messages if "_envelope" in m)
+    assert sum(1 for m in messages if "_envelope" not in m) == 1  # oversize record passes through unwrapped
+
+    unpacked = [r for m in messages for r in unpack_records(json.loads(m))]
+    assert unpacked == records[:250] + [huge] + records[250:]
+
+    batches = list(iter_batch_entries(messages, max_batch_bytes=10_000))
+    assert all(sum(len(e["MessageBody"].encode("utf-8")) for e in b) <= 10_000 or len(b) == 1 for b in batches)
+    assert [e["MessageBody"] for b in batches for e in b] == messages
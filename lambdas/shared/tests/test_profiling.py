@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import lambdas.transform.app as transform
+from lambdas.shared.profiling import input_size, profiled, sampled
+
+
+CONTEXT = type("C", (), {"aws_request_id": "req-1", "function_name": "serverless-elt-transform"})()
+BODY = '{"record_type":"shipments","event_time":"2025-01-01T00:00:00Z","shipment_id":"shp_%d"}'
+
+
+def _transform_event(n):
+    return {"Records": [{"messageId": f"m{i}", "body": BODY % i} for i in range(n)]}
+
+
+@pytest.fixture
+def fake_silver(monkeypatch):
+    monkeypatch.setenv("SILVER_BUCKET", "out-bucket")
+    monkeypatch.setattr(transform, "_clients", lambda: None)
+    monkeypatch.setattr(transform, "_s3_put_parquet", lambda *args, **kwargs: None)
+
+
+def _artifacts(tmp_path, service):
+    (day,) = (tmp_path / service).iterdir()
+    return {p.name: p for p in day.iterdir()}
+
+
+def test_sampling_and_input_size():
+    assert not sampled(0)
+    assert sampled(1, rng=lambda: 0.99)
+    assert sampled(10, rng=lambda: 0.05) and not sampled(10, rng=lambda: 0.15)
+
+    assert input_size({"Records": [{"body": "abc"}, {"body": "é"}]}) == (5, 2)
+    assert input_size({"Records": [{"s3": {"object": {"key": "k", "size": 1024}}}]}) == (1024, 1)
+    assert input_size({"since": "x"}) == (len('{"since":"x"}'), 1)
+
+
+def test_cprofile_writes_summary_collapsed_stacks_and_pstats(monkeypatch, tmp_path, fake_silver):
+    monkeypatch.setenv("PROFILE_SAMPLE_EVERY", "1")
+    monkeypatch.setenv("PROFILE_OUTPUT", str(tmp_path))
+
+    event = _transform_event(20)
+    assert transform.handler(event, CONTEXT) == {"batchItemFailures": []}
+
+    files = _artifacts(tmp_path, "transform")
+    assert sorted(files) == ["req-1.collapsed", "req-1.json", "req-1.pstats"]
+    summary = json.loads(files["req-1.json"].read_text())
+    assert summary["service"] == "transform" and summary["mode"] == "cprofile"
+    assert (summary["input_bytes"], summary["input_records"]) == input_size(event)
+    assert any("normalize_record_values" in entry["function"] for entry in summary["top"])
+    assert "normalize_record_values" in files["req-1.collapsed"].read_text()
+
+
+def test_tracemalloc_reports_allocation_sites(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_SAMPLE_EVERY", "1")
+    monkeypatch.setenv("PROFILE_MODE", "tracemalloc")
+    monkeypatch.setenv("PROFILE_OUTPUT", str(tmp_path))
+    kept = []
+
+    @profiled("replay")
+    def handler(event, context):
+        kept.append(bytearray(4 * 1024 * 1024))
+        return {"ok": True}
+
+    assert handler({"src_prefix": "bronze/"}, CONTEXT) == {"ok": True}
+
+    files = _artifacts(tmp_path, "replay")
+    assert sorted(files) == ["req-1.collapsed", "req-1.json"]
+    summary = json.loads(files["req-1.json"].read_text())
+    assert summary["peak_traced_bytes"] >= 4 * 1024 * 1024
+    assert summary["top"][0]["bytes"] >= 4 * 1024 * 1024 and "test_profiling.py" in summary["top"][0]["site"]
+
+
+def test_profiling_errors_never_fail_the_invocation(monkeypatch, tmp_path, fake_silver):
+    monkeypatch.setenv("PROFILE_SAMPLE_EVERY", "1")
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("PROFILE_OUTPUT", str(blocker))
+    assert transform.handler(_transform_event(1), CONTEXT) == {"batchItemFailures": []}
+
+    monkeypatch.setenv("PROFILE_OUTPUT", "")
+    assert transform.handler(_transform_event(1), CONTEXT) == {"batchItemFailures": []}
+
+
+def test_profiles_are_written_to_s3(make_bucket, monkeypatch):
+    monkeypatch.setenv("PROFILE_SAMPLE_EVERY", "1")
+    monkeypatch.setenv("PROFILE_OUTPUT", "s3://profiles-bucket/profiles/")
+
+    @profiled("quality")
+    def handler(event, context):
+        return sum(range(1000))
+
+    s3 = make_bucket("profiles-bucket")
+    assert handler({"silver_bucket": "s"}, CONTEXT) == sum(range(1000))
+    keys = [o["Key"] for o in s3.list_objects_v2(Bucket="profiles-bucket")["Contents"]]
+
+    assert len(keys) == 3
+    assert all(k.startswith("profiles/quality/") and "/req-1." in k for k in keys)
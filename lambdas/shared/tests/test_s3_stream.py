@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from lambdas.shared.s3_stream import S3_MIN_PART_BYTES, S3MultipartWriter
+
+
+@pytest.fixture
+def s3(make_bucket):
+    return make_bucket("silver-bucket")
+
+
+def _pending_uploads(s3):
+    return s3.list_multipart_uploads(Bucket="silver-bucket").get("Uploads", [])
+
+
+def test_small_object_uses_single_put(s3):
+    with S3MultipartWriter(s3, "silver-bucket", "k") as sink:
+        sink.write(b"abc")
+        sink.write(b"def")
+    assert sink.upload_id is None and sink.parts == []
+    assert s3.get_object(Bucket="silver-bucket", Key="k")["Body"].read() == b"abcdef"
+
+
+def test_large_parquet_streams_in_parts_with_bounded_buffer(s3):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    peak = 0
+
+    class _Tracking(S3MultipartWriter):
+        def write(self, data):
+            nonlocal peak
+            n = super().write(data)
+            peak = max(peak, len(self._buf))
+            return n
+
+    # ~12 MiB of incompressible strings, written as several row groups.
+    table = pa.table({"v": [f"{i:08d}-{(i * 2654435761) % 2**32:010d}" * 8 for i in range(80000)]})
+    with _Tracking(s3, "silver-bucket", "big.parquet", part_bytes=S3_MIN_PART_BYTES) as sink:
+        with pq.ParquetWriter(sink, table.schema, compression="none") as writer:
+            for batch in table.to_batches(max_chunksize=10000):
+                writer.write_batch(batch)
+
+    assert len(sink.parts) >= 2
+    assert peak < S3_MIN_PART_BYTES
+    body = s3.get_object(Bucket="silver-bucket", Key="big.parquet")["Body"].read()
+    assert len(body) == sink.bytes_written
+    assert pq.read_table(io.BytesIO(body)).equals(table)
+    assert _pending_uploads(s3) == []
+
+
+def test_failure_aborts_multipart_upload(s3):
+    with pytest.raises(RuntimeError, match="encode failed"):
+        with S3MultipartWriter(s3, "silver-bucket", "k", part_bytes=S3_MIN_PART_BYTES) as sink:
+            sink.write(b"x" * (S3_MIN_PART_BYTES + 1))
+            assert sink.upload_id is not None
+            raise RuntimeError("encode failed")
+
+    assert _pending_uploads(s3) == []
+    assert "Contents" not in s3.list_objects_v2(Bucket="silver-bucket")
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from lambdas.shared.schemas import (
+    RECORD_SCHEMAS,
+    SCHEMAS,
+    _iso_to_iso_z,
+    _parse_iso_to_iso_z,
+    normalize_record,
+    to_pyarrow_schema,
+)
+
+
+def test_compiled_normalizers_coerce_types_in_one_pass():
+    out = normalize_record(
+        {
+            "record_type": "shipments",
+            "event_time": "2025-01-01T01:00:00+01:00",
+            "shipment_id": 123,
+            "weight_kg": " 12.5 ",
+            "extra": "dropped",
+        }
+    )
+    assert list(out) == SCHEMAS["shipments"]
+    assert out["event_time"] == "2025-01-01T00:00:00Z"
+    assert out["shipment_id"] == "123"
+    assert out["weight_kg"] == 12.5
+    assert out["carrier"] is None
+
+    inv = normalize_record({"record_type": "invoice_lines", "event_time": 1735689600, "quantity": "3", "unit_price": 2, "line_total": ""})
+    assert (inv["event_time"], inv["quantity"], inv["unit_price"], inv["line_total"]) == ("2025-01-01T00:00:00Z", 3, 2.0, None)
+
+    for bad in ({"weight_kg": "heavy"}, {"weight_kg": True}, {"shipment_id": {"nested": 1}}):
+        with pytest.raises(ValueError):
+            normalize_record({"record_type": "shipments", **bad})
+    with pytest.raises(ValueError):
+        normalize_record({"record_type": "invoice_lines", "quantity": 1.5})
+    with pytest.raises(ValueError, match="Unsupported record_type"):
+        normalize_record({"record_type": ["shipments"]})
+
+
+def test_pyarrow_schema_is_derived_from_record_schemas():
+    pytest.importorskip("pyarrow")
+
+    for record_type in RECORD_SCHEMAS:
+        assert to_pyarrow_schema(record_type).names == SCHEMAS[record_type]
+    assert str(to_pyarrow_schema("invoice_lines").field("quantity").type) == "int64"
+
+
+def test_iso_fast_path_matches_full_parse():
+    base = datetime(2024, 2, 20, 23, 59, 58, tzinfo=timezone.utc)
+    samples = ["2025-01-01T00:00:00.000000Z", "2024-02-29T12:00:00Z", "2025-06-30T10:00:00.5Z", "2025-01-01T01:00:00+01:00"]
+    for i in range(0, 20 * 86400, 3607):
+        ts = base + timedelta(seconds=i, microseconds=(i * 7919) % 1000000 if i % 2 else 0)
+        samples.append(ts.isoformat().replace("+00:00", "Z"))
+    for s in samples:
+        assert _iso_to_iso_z(s) == _parse_iso_to_iso_z.__wrapped__(s)
+
+    for bad in ("2025-02-30T00:00:00Z", "2025-13-01T00:00:00Z", "not-a-time"):
+        with pytest.raises(ValueError):
+            _iso_to_iso_z(bad)
+
+
+def test_pyarrow_schemas_are_cached():
+    pytest.importorskip("pyarrow")
+
+    assert to_pyarrow_schema("shipments", timestamp_type="timestamp") is to_pyarrow_schema("shipments", timestamp_type="timestamp")
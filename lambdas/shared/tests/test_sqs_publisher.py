@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from lambdas.shared.sqs_publisher import publish_batches, send_batch_with_retry
+
+
+class _FakeSqs:
+    """Thread-safe `send_message_batch` stand-in with scripted failures."""
+
+    def __init__(self, fail_ids_once=(), sender_fault_ids=()):
+        self.fail_ids_once = set(fail_ids_once)
+        self.sender_fault_ids = set(sender_fault_ids)
+        self.calls = []
+        self.bodies = []
+        self._lock = threading.Lock()
+
+    def send_message_batch(self, QueueUrl, Entries):
+        failed = []
+        with self._lock:
+            self.calls.append([e["Id"] for e in Entries])
+            for e in Entries:
+                if e["Id"] in self.sender_fault_ids:
+                    failed.append({"Id": e["Id"], "SenderFault": True, "Code": "InvalidMessageContents", "Message": "bad"})
+                elif e["Id"] in self.fail_ids_once:
+                    self.fail_ids_once.discard(e["Id"])
+                    failed.append({"Id": e["Id"], "SenderFault": False, "Code": "InternalError", "Message": "retry me"})
+                else:
+                    self.bodies.append(e["MessageBody"])
+        return {"Successful": [], "Failed": failed}
+
+
+def test_retries_only_failed_entries_with_backoff():
+    sqs = _FakeSqs(fail_ids_once={"3", "7"})
+    sleeps = []
+    entries = [{"Id": str(i), "MessageBody": f"m{i}"} for i in range(10)]
+
+    sent = send_batch_with_retry(sqs, "q", entries, sleep=sleeps.append)
+
+    assert sent == 10
+    assert sqs.calls == [[str(i) for i in range(10)], ["3", "7"]]
+    assert sorted(sqs.bodies) == sorted(f"m{i}" for i in range(10))
+    assert len(sleeps) == 1
+
+
+def test_sender_fault_is_not_retried():
+    sqs = _FakeSqs(sender_fault_ids={"0"})
+    with pytest.raises(RuntimeError, match="sender_fault"):
+        send_batch_with_retry(sqs, "q", [{"Id": "0", "MessageBody": "x"}], sleep=lambda s: None)
+    assert len(sqs.calls) == 1
+
+
+def test_publish_keeps_order_within_batches():
+    sqs = _FakeSqs()
+    sent = publish_batches(sqs, "q", (f"m{i}" for i in range(25)), concurrency=1)
+    assert sent == 25
+    assert [len(c) for c in sqs.calls] == [10, 10, 5]
+    assert sqs.bodies == [f"m{i}" for i in range(25)]
+
+
+def test_publish_raises_after_exhausting_attempts():
+    class _AlwaysFail(_FakeSqs):
+        def send_message_batch(self, QueueUrl, Entries):
+            return {"Failed": [{"Id": e["Id"], "SenderFault": False, "Message": "nope"} for e in Entries]}
+
+    with pytest.raises(RuntimeError, match="attempts=3"):
+        publish_batches(_AlwaysFail(), "q", (str(i) for i in range(30)), concurrency=4, max_attempts=3, sleep=lambda s: None)
+
+
+def test_publish_keeps_concurrency_batches_in_flight():
+    class _BarrierSqs(_FakeSqs):
+        """Every call waits until `concurrency` calls are in flight at once (times out otherwise)."""
+
+        def __init__(self, concurrency):
+            super().__init__()
+            self.barrier = threading.Barrier(concurrency, timeout=10)
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+        def send_message_batch(self, QueueUrl, Entries):
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                self.barrier.wait()
+                return super().send_message_batch(QueueUrl, Entries)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+    for concurrency in (2, 4, 8):
+        records = 10 * 3 * concurrency  # a multiple of `concurrency` batches, so no call waits alone
+        sqs = _BarrierSqs(concurrency)
+        sent = publish_batches(sqs, "q", (f"m{i}" for i in range(records)), concurrency=concurrency)
+        assert sent == records
+        assert sorted(sqs.bodies) == sorted(f"m{i}" for i in range(records))
+        assert sqs.max_in_flight == concurrency
+
+
+def test_publish_stops_submitting_batches_after_a_failure():
+    class _FailFirst(_FakeSqs):
+        def send_message_batch(self, QueueUrl, Entries):
+            with self._lock:
+                self.calls.append([e["Id"] for e in Entries])
+                first = len(self.calls) == 1
+            if first:
+                return {"Failed": [{"Id": "0", "SenderFault": True, "Message": "bad"}]}
+            return {"Successful": [], "Failed": []}
+
+    sqs = _FailFirst()
+    with pytest.raises(RuntimeError, match="sender_fault"):
+        publish_batches(sqs, "q", (str(i) for i in range(1000)), concurrency=2, max_in_flight=4)
+    assert len(sqs.calls) <= 5  # the failed batch plus at most the others already submitted
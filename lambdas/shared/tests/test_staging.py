@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from lambdas.shared import staging
+from lambdas.shared.columnar import rows_to_table
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.schemas import SCHEMAS
+
+
+def test_staging_flush_skips_lock_when_nothing_is_due_and_merges_with_bounded_memory(make_bucket, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    fields = list(SCHEMAS["shipments"])
+
+    def _part(ids):
+        rows = []
+        for i in ids:
+            values = dict.fromkeys(fields)
+            values.update(record_type="shipments", shipment_id=f"s{i:03d}", event_time="2025-01-01T00:00:00Z")
+            rows.append(tuple(values[f] for f in fields))
+        buf = io.BytesIO()
+        pq.write_table(rows_to_table("shipments", rows), buf)
+        return buf.getvalue()
+
+    s3 = make_bucket("silver-bucket")
+    for n, ids in enumerate([range(0, 30, 3), range(1, 30, 3), range(2, 30, 3)]):
+        key = staging.staged_part_key("staging", "shipments", Partition("2025-01-01"), 10, now_ms=n)
+        s3.put_object(Bucket="silver-bucket", Key=key, Body=_part(reversed(ids)))
+
+    kwargs = dict(staging_prefix="staging", silver_prefix="silver", record_type="shipments", partition=Partition("2025-01-01"), max_bytes=10**9)
+    real_acquire = staging.acquire_lock
+    monkeypatch.setattr(staging, "acquire_lock", lambda *a, **k: pytest.fail("lock taken with nothing due"))
+    assert staging.flush_partition(s3, "silver-bucket", max_rows=100, max_age_seconds=3600, clock=lambda: 1.0, **kwargs) == []
+
+    monkeypatch.setattr(staging, "acquire_lock", real_acquire)
+    (key,) = staging.flush_partition(s3, "silver-bucket", max_rows=30, max_age_seconds=3600, memory_budget_bytes=0, **kwargs)
+    body = s3.get_object(Bucket="silver-bucket", Key=key)["Body"].read()
+    assert pq.read_table(io.BytesIO(body)).column("shipment_id").to_pylist() == [f"s{i:03d}" for i in range(30)]
+
+
+def test_staging_lock_is_broken_after_ttl(make_bucket):
+    s3 = make_bucket("silver-bucket")
+    stale = staging.acquire_lock(s3, "silver-bucket", "l", owner="a", ttl_seconds=60, now_ms=0)
+    assert stale
+    assert not staging.acquire_lock(s3, "silver-bucket", "l", owner="b", ttl_seconds=60, now_ms=59_000)
+    current = staging.acquire_lock(s3, "silver-bucket", "l", owner="b", ttl_seconds=60, now_ms=61_000)
+    assert current and current != stale
+
+    # The flusher whose lock was broken must not release the one that took over.
+    staging.release_lock(s3, "silver-bucket", "l", stale)
+    assert b'"owner": "b"' in s3.get_object(Bucket="silver-bucket", Key="l")["Body"].read()
+    staging.release_lock(s3, "silver-bucket", "l", current)
+    assert "Contents" not in s3.list_objects_v2(Bucket="silver-bucket")
@@ -0,0 +1,137 @@
+import io
+
+from lambdas.shared.timing import StageTimer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeMetrics:
+    def __init__(self) -> None:
+        self.added = []
+
+    def add_metric(self, name, unit, value) -> None:
+        self.added.append((name, unit, value))
+
+
+class FakeS3:
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+
+    def put_object(self, **kwargs):
+        self.clock.advance(0.5)
+        return {"ETag": "e"}
+
+    def get_object(self, **kwargs):
+        self.clock.advance(0.25)
+        return {"Body": io.BytesIO(b"abcdef")}
+
+    def head_object(self, **kwargs):
+        self.clock.advance(10)
+        return {}
+
+
+def test_nested_spans_report_exclusive_time_and_bytes():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+    assert timer.begin(1.0)
+
+    with timer.span("Normalize"):
+        clock.advance(1)
+        with timer.span("JsonParse", 100) as span:
+            clock.advance(2)
+            span.add_bytes(20)
+        clock.advance(3)
+
+    assert timer.totals() == {"JsonParse": {"ms": 2000.0, "bytes": 120}, "Normalize": {"ms": 4000.0, "bytes": 0}}
+
+
+def test_chained_iterators_and_readers_time_their_own_work():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+    timer.begin(1.0)
+
+    class SlowStream(io.BytesIO):
+        def read(self, *args):
+            clock.advance(0.5)
+            return super().read(*args)
+
+    raw = timer.reader(SlowStream(b"a\nbb\n"), "S3Get")
+
+    def parse():
+        for line in raw.read().splitlines():
+            clock.advance(1)
+            yield line
+
+    def normalize(items):
+        for item in items:
+            clock.advance(2)
+            yield item.upper()
+
+    assert list(timer.iter(normalize(timer.iter(parse(), "JsonParse")), "Normalize")) == [b"A", b"BB"]
+    totals = timer.totals()
+    assert totals["S3Get"] == {"ms": 500.0, "bytes": 5}
+    assert totals["JsonParse"]["ms"] == 2000.0
+    assert totals["Normalize"]["ms"] == 4000.0
+
+
+def test_timed_client_times_mapped_operations_only():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+    timer.begin(1.0)
+    s3 = timer.client(FakeS3(clock), {"put_object": "S3Put", "get_object": "S3Get"})
+
+    s3.put_object(Bucket="b", Key="k", Body=b"12345")
+    assert s3.get_object(Bucket="b", Key="k")["Body"].read() == b"abcdef"
+    s3.head_object(Bucket="b", Key="k")
+
+    assert timer.totals() == {"S3Put": {"ms": 500.0, "bytes": 5}, "S3Get": {"ms": 250.0, "bytes": 6}}
+
+
+def test_emit_adds_time_and_bytes_metrics():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+    timer.begin(1.0)
+    with timer.span("ParquetEncode"):
+        clock.advance(0.0125)
+    with timer.span("S3Put", 2048):
+        clock.advance(0.1)
+
+    metrics = FakeMetrics()
+    assert timer.emit(metrics) == {"ParquetEncode": {"ms": 12.5, "bytes": 0}, "S3Put": {"ms": 100.0, "bytes": 2048}}
+    assert metrics.added == [
+        ("ParquetEncodeTime", "Milliseconds", 12.5),
+        ("S3PutTime", "Milliseconds", 100.0),
+        ("S3PutBytes", "Bytes", 2048),
+    ]
+
+    # The next invocation starts from zero.
+    timer.begin(1.0)
+    assert timer.totals() == {}
+
+
+def test_unsampled_invocations_are_no_ops():
+    rolls = iter([0.5, 0.05])
+    timer = StageTimer(clock=FakeClock(), rng=lambda: next(rolls))
+
+    assert not timer.begin(0.0)
+    assert not timer.begin(0.1)  # roll 0.5
+    stream, items, client = io.BytesIO(b"x"), [1, 2], object()
+    assert timer.reader(stream, "S3Get") is stream
+    assert timer.iter(items, "JsonParse") is items
+    assert timer.client(client, {"put_object": "S3Put"}) is client
+    assert timer.span("Dedup") is timer.span("Normalize")
+    with timer.span("Dedup") as span:
+        span.add_bytes(10)
+    metrics = FakeMetrics()
+    assert timer.emit(metrics) is None and metrics.added == []
+
+    assert timer.begin(0.1)  # roll 0.05
@@ -0,0 +1,14 @@
+from lambdas.shared.ttl_cache import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.set("a")
+    cache.set("b")
+    assert "a" in cache  # refreshes "a", so "b" is least recently used
+    cache.set("c")
+    assert "b" not in cache and "a" in cache and "c" in cache
+    cache.set("d", ttl_seconds=60)  # capped at the cache TTL
+    now[0] = 10.0
+    assert not any(k in cache for k in "acd")
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+from lambdas.shared.utils import (
+    iter_json_records,
+    iter_json_records_stream,
+    iter_jsonl_range_records,
+    plan_byte_ranges,
+    require_client_params,
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1 << 20])
+def test_stream_parser_matches_whole_text_parser(chunk_size):
+    jsonl = '{"a":1,"city":"Zürich"}\n\n  {"a":2}\r\n[1,2]\n{"a":3}'
+    array = ' [ {"a":1,"s":"x,]}"} , 7, {"a":2,"n":[1,{"b":"é"}]},{"a":123456} ]\n'
+
+    for text in (jsonl, array):
+        streamed = list(iter_json_records_stream(io.BytesIO(text.encode("utf-8")), chunk_size))
+        assert streamed == list(iter_json_records(text))
+
+
+def test_stream_parser_rejects_truncated_array():
+    with pytest.raises(ValueError):
+        list(iter_json_records_stream(io.BytesIO(b'[{"a":1},{"a":'), 4))
+
+
+def test_byte_ranges_own_each_line_exactly_once():
+    import random
+
+    rng = random.Random(7)
+    lines = [('{"i":%d,"pad":"%s"}' % (i, "x" * rng.randint(0, 40))).encode() for i in range(500)]
+    data = b"\n".join(lines) + b"\n"
+    data_no_trailing_newline = data[:-1]
+
+    for blob in (data, data_no_trailing_newline):
+        for range_bytes in (1, 2, 17, 64, 1000, len(blob)):
+            seen = []
+            for start, end in plan_byte_ranges(len(blob), range_bytes):
+                stream = io.BytesIO(blob[max(start - 1, 0) :])
+                seen.extend(r["i"] for r in iter_jsonl_range_records(stream, start=start, end=end, chunk_size=13))
+            assert seen == list(range(500)), range_bytes
+
+
+def test_conditional_write_support_is_checked_against_the_client_model():
+    boto3 = pytest.importorskip("boto3")
+    s3 = boto3.client("s3")
+    require_client_params(s3, "PutObject", "IfNoneMatch", "IfMatch")
+    require_client_params(s3, "DeleteObject", "IfMatch")
+    with pytest.raises(RuntimeError, match="PutObject does not accept NotAParam with botocore"):
+        require_client_params(s3, "PutObject", "NotAParam")
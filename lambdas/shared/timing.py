@@ -0,0 +1,187 @@
+"""
+Per-stage timing spans for the Lambda hot paths, emitted as EMF metrics.
+
+Why this exists:
+- Handler metrics are counts, so a slow invocation does not show whether S3, parsing,
+  normalization, Arrow conversion, Parquet encoding or a PUT took the time.
+- `StageTimer` accumulates time and bytes per named stage and emits them as
+  `{Stage}Time` (ms) and `{Stage}Bytes` through the handler's Powertools `Metrics`.
+
+Semantics:
+- Times are exclusive: a span nested in another (per thread) is subtracted from its parent. So
+  lazily chained iterators (`S3Get` reads inside `JsonParse` inside `Normalize`) each report only
+  their own work.
+- Spans from worker threads are summed, so a stage can report more busy time than wall time.
+- Sampling is decided once per invocation in `begin(sample_rate)`. When an invocation is not
+  sampled, `span` returns a shared no-op context, and `iter` / `reader` / `client` return their
+  argument unchanged, so a disabled timer costs about one attribute check per call site.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def add_bytes(self, nbytes: int) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("timer", "stage", "nbytes", "started", "children")
+
+    def __init__(self, timer: "StageTimer", stage: str, nbytes: int) -> None:
+        self.timer = timer
+        self.stage = stage
+        self.nbytes = nbytes
+        self.started = 0.0
+        self.children = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.timer._stack().append(self)
+        self.started = self.timer.clock()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = self.timer.clock() - self.started
+        stack = self.timer._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.timer._add(self.stage, elapsed - self.children, self.nbytes)
+
+    def add_bytes(self, nbytes: int) -> None:
+        self.nbytes += nbytes
+
+
+class _TimedReader:
+    """File-like proxy timing `read` calls (and counting bytes returned) as one stage."""
+
+    def __init__(self, stream: Any, timer: "StageTimer", stage: str) -> None:
+        self._stream = stream
+        self._timer = timer
+        self._stage = stage
+
+    def read(self, *args: Any) -> Any:
+        with self._timer.span(self._stage) as span:
+            data = self._stream.read(*args)
+            span.add_bytes(len(data))
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _TimedClient:
+    """
+    boto3 client proxy timing selected operations.
+
+    Request bytes come from a bytes `Body`; a streaming response `Body` is wrapped so its reads
+    count toward the same stage.
+    """
+
+    def __init__(self, client: Any, timer: "StageTimer", stages: Mapping[str, str]) -> None:
+        self._client = client
+        self._timer = timer
+        self._stages = stages
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        stage = self._stages.get(name)
+        if stage is None:
+            return attr
+
+        def _call(*args: Any, **kwargs: Any) -> Any:
+            body = kwargs.get("Body")
+            with self._timer.span(stage, len(body) if isinstance(body, (bytes, bytearray, memoryview)) else 0):
+                resp = attr(*args, **kwargs)
+            if isinstance(resp, dict) and hasattr(resp.get("Body"), "read"):
+                resp["Body"] = _TimedReader(resp["Body"], self._timer, stage)
+            return resp
+
+        return _call
+
+
+class StageTimer:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter, rng: Callable[[], float] = random.random) -> None:
+        self.clock = clock
+        self.rng = rng
+        self.active = False
+        self._totals: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin(self, sample_rate: float) -> bool:
+        """Start an invocation: drop previous totals and decide whether this one is sampled."""
+        with self._lock:
+            self._totals = {}
+        self.active = sample_rate > 0 and (sample_rate >= 1 or self.rng() < sample_rate)
+        return self.active
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, stage: str, seconds: float, nbytes: int) -> None:
+        with self._lock:
+            total, total_bytes = self._totals.get(stage, (0.0, 0))
+            self._totals[stage] = (total + seconds, total_bytes + nbytes)
+
+    def span(self, stage: str, nbytes: int = 0) -> Any:
+        """Context manager timing one stage occurrence; `.add_bytes(n)` attributes bytes to it."""
+        if not self.active:
+            return _NOOP
+        return _Span(self, stage, nbytes)
+
+    def iter(self, iterable: Iterable[Any], stage: str) -> Iterable[Any]:
+        """Time every `next()` on `iterable` as `stage` (exclusive of spans nested upstream)."""
+        if not self.active:
+            return iterable
+        return self._timed_iter(iter(iterable), stage)
+
+    def _timed_iter(self, it: Iterator[Any], stage: str) -> Iterator[Any]:
+        while True:
+            with self.span(stage):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def reader(self, stream: Any, stage: str) -> Any:
+        return _TimedReader(stream, self, stage) if self.active else stream
+
+    def client(self, client: Any, stages: Mapping[str, str]) -> Any:
+        """Proxy `client` so the named operations (`{"put_object": "S3Put"}`) are timed."""
+        return _TimedClient(client, self, stages) if self.active else client
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {stage: {"ms": round(s * 1000, 3), "bytes": n} for stage, (s, n) in self._totals.items()}
+
+    def emit(self, metrics: Any) -> Optional[Dict[str, Dict[str, float]]]:
+        """Add `{Stage}Time` / `{Stage}Bytes` metrics for a sampled invocation; return the totals."""
+        if not self.active:
+            return None
+        totals = self.totals()
+        for stage, t in totals.items():
+            metrics.add_metric(name=f"{stage}Time", unit="Milliseconds", value=t["ms"])
+            if t["bytes"]:
+                metrics.add_metric(name=f"{stage}Bytes", unit="Bytes", value=t["bytes"])
+        return totals
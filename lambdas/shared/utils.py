@@ -7,13 +7,19 @@ Design goals:
 - Centralize small utilities (env parsing, S3 event parsing, JSONL iteration).
 """
 
+import codecs
+import itertools
 import json
 import logging
 import os
+import random
 import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from urllib.parse import unquote_plus
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from lambdas.shared import codec
 
 
 def _configure_logging() -> None:
@@ -28,7 +34,8 @@ logger = logging.getLogger(__name__)
 
 
 def json_dumps(obj: Any) -> str:
-    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+    # `ensure_ascii=False`, compact separators, `default=str` (see `lambdas.shared.codec`).
+    return codec.dumps(obj)
 
 
 def log(event: str, **fields: Any) -> None:
@@ -41,6 +48,105 @@ def chunked(seq: Sequence[Any], n: int) -> Iterator[List[Any]]:
         yield list(seq[i : i + n])
 
 
+def bounded_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    *,
+    concurrency: int,
+    max_in_flight: int = 0,
+    thread_name_prefix: str = "worker",
+) -> Iterator[Tuple[Any, Optional[BaseException], Any]]:
+    """
+    Apply `fn` to `items` on a thread pool; yield `(item, error, result)` as calls complete.
+
+    `items` is consumed lazily and at most `max_in_flight` calls (default: `concurrency`) are
+    pending at once, which bounds the memory held by submitted work. Exceptions raised by `fn`
+    are yielded, not raised. `concurrency <= 1` runs inline, in order. Closing the iterator early
+    cancels calls that have not started and waits for the running ones.
+    """
+    if concurrency <= 1:
+        for item in items:
+            try:
+                yield item, None, fn(item)
+            except Exception as e:
+                yield item, e, None
+        return
+
+    max_in_flight = max(max_in_flight or concurrency, concurrency)
+    in_flight: Dict[Future, Any] = {}
+
+    def _drain(done: Set[Future]) -> Iterator[Tuple[Any, Optional[BaseException], Any]]:
+        for fut in done:
+            item = in_flight.pop(fut)
+            error = fut.exception()
+            yield item, error, None if error else fut.result()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=thread_name_prefix) as pool:
+        try:
+            for item in items:
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from _drain(done)
+                in_flight[pool.submit(fn, item)] = item
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from _drain(done)
+        except BaseException:
+            # Includes `GeneratorExit` when the caller stops early: calls not yet started are dropped.
+            for fut in in_flight:
+                fut.cancel()
+            raise
+
+
+def jittered_backoff(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """Delay before retry `attempt` (1-based): exponential, capped, with 50-100% jitter."""
+    return min(max_seconds, base_seconds * (2 ** (attempt - 1))) * (0.5 + random.random() / 2)
+
+
+def drain_unprocessed(
+    call: Callable[[Dict[str, Any]], Dict[str, Any]],
+    request: Dict[str, Any],
+    unprocessed_key: str,
+    *,
+    max_attempts: int,
+    backoff_base_seconds: float,
+    backoff_max_seconds: float,
+    sleep: Callable[[float], None] = time.sleep,
+) -> List[Dict[str, Any]]:
+    """
+    Call a DynamoDB batch API until nothing is left unprocessed and return every response.
+
+    Leftovers (throttling) are resubmitted with jittered exponential backoff; `RuntimeError` after
+    `max_attempts` calls.
+    """
+    responses = []
+    max_attempts = max(1, max_attempts)
+    for attempt in range(1, max_attempts + 1):
+        resp = call(request)
+        responses.append(resp)
+        request = resp.get(unprocessed_key) or {}
+        if not request:
+            return responses
+        if attempt == max_attempts:
+            # UnprocessedKeys: `{table: {"Keys": [...]}}`; UnprocessedItems: `{table: [...]}`.
+            left = sum(len(v["Keys"]) if isinstance(v, dict) else len(v) for v in request.values())
+            raise RuntimeError(f"dynamodb_{unprocessed_key}={left} attempts={attempt}")
+        sleep(jittered_backoff(attempt, backoff_base_seconds, backoff_max_seconds))
+    raise AssertionError("unreachable")
+
+
+def require_client_params(client: Any, operation: str, *params: str) -> None:
+    """Raise `RuntimeError` when `client`'s botocore model lacks request `params` for `operation`."""
+    members = client.meta.service_model.operation_model(operation).input_shape.members
+    missing = [p for p in params if p not in members]
+    if missing:
+        import botocore
+
+        raise RuntimeError(
+            f"{operation} does not accept {', '.join(missing)} with botocore {botocore.__version__}; upgrade boto3"
+        )
+
+
 def utc_epoch() -> int:
     return int(time.time())
 
@@ -57,6 +163,23 @@ def env(name: str, default: Optional[str] = None) -> str:
     return v
 
 
+def prewarm_enabled() -> bool:
+    """`INIT_PREWARM`: "auto" (default: only inside Lambda), "true" or "false"."""
+    setting = os.getenv("INIT_PREWARM", "auto").lower()
+    if setting == "auto":
+        return bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+    return setting == "true"
+
+
+def prewarm(*steps: Callable[[], Any]) -> bool:
+    """Run init pre-warming `steps` (module import time) when `prewarm_enabled()`; return whether they ran."""
+    if not prewarm_enabled():
+        return False
+    for step in steps:
+        step()
+    return True
+
+
 def parse_s3_event_records(event: Dict[str, Any]) -> List[Tuple[str, str, str]]:
     records: List[Tuple[str, str, str]] = []
     for r in event.get("Records", []):
@@ -77,7 +200,7 @@ def iter_json_records(text: str) -> Iterable[Dict[str, Any]]:
         return []
 
     if stripped.startswith("["):
-        payload = json.loads(stripped)
+        payload = codec.loads(stripped)
         if not isinstance(payload, list):
             raise ValueError("Expected JSON array for bracketed payload")
         for obj in payload:
@@ -89,6 +212,164 @@ def iter_json_records(text: str) -> Iterable[Dict[str, Any]]:
         line = line.strip()
         if not line:
             continue
-        obj = json.loads(line)
+        obj = codec.loads(line)
+        if isinstance(obj, dict):
+            yield obj
+
+
+DEFAULT_READ_CHUNK_BYTES = 1024 * 1024
+
+
+def iter_byte_chunks(stream: BinaryIO, chunk_size: int = DEFAULT_READ_CHUNK_BYTES) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_json_records_stream(stream: BinaryIO, chunk_size: int = DEFAULT_READ_CHUNK_BYTES) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of `iter_json_records` for file-like byte streams (e.g. an S3 `StreamingBody`).
+
+    Peak memory is bounded by `chunk_size` plus the longest single line/array element, not by object size.
+    JSONL lines are split on raw bytes (a `\\n` byte never occurs inside a multi-byte UTF-8 sequence);
+    bracketed JSON arrays are parsed element by element.
+    """
+    chunks = iter_byte_chunks(stream, chunk_size)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if head.lstrip():
+            break
+    first = head.lstrip()[:1]
+    if not first:
+        return
+    if first == b"[":
+        yield from _iter_json_array_chunks(head, chunks)
+    else:
+        yield from _iter_jsonl_chunks(head, chunks)
+
+
+def _iter_jsonl_chunks(head: bytes, chunks: Iterator[bytes]) -> Iterator[Dict[str, Any]]:
+    pending = b""
+    for chunk in itertools.chain((head,), chunks):
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                obj = codec.loads(line)
+                if isinstance(obj, dict):
+                    yield obj
+    if pending.strip():
+        obj = codec.loads(pending)
+        if isinstance(obj, dict):
+            yield obj
+
+
+def _iter_json_array_chunks(head: bytes, chunks: Iterator[bytes]) -> Iterator[Dict[str, Any]]:
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = utf8.decode(head).lstrip()[1:]  # drop the opening "["
+    pos = 0
+    eof = False
+    expect_value = True
+
+    def _more() -> bool:
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+            eof = True
+        else:
+            buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        return not eof
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            _more()
+            continue
+
+        c = buf[pos]
+        if c == "]":
+            return
+        if c == ",":
+            if expect_value:
+                raise ValueError(f"Unexpected ',' in JSON array at offset {pos}")
+            expect_value = True
+            pos += 1
+            continue
+        if not expect_value:
+            raise ValueError(f"Expected ',' or ']' in JSON array at offset {pos}")
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Element straddles a chunk boundary: pull more data and retry.
+            if eof:
+                raise
+            _more()
+            continue
+        if end >= len(buf) and not eof:
+            # A scalar may have been cut short (e.g. `12` of `123`); only trust it once a delimiter follows.
+            _more()
+            continue
+        pos = end
+        expect_value = False
+        if isinstance(obj, dict):
+            yield obj
+
+
+def plan_byte_ranges(size: int, range_bytes: int) -> List[Tuple[int, int]]:
+    """Split `[0, size)` into consecutive half-open `(start, end)` ranges of at most `range_bytes`."""
+    if range_bytes <= 0:
+        raise ValueError("range_bytes must be positive")
+    return [(start, min(start + range_bytes, size)) for start in range(0, size, range_bytes)]
+
+
+def iter_jsonl_range_records(
+    stream: BinaryIO,
+    *,
+    start: int,
+    end: int,
+    chunk_size: int = DEFAULT_READ_CHUNK_BYTES,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the JSONL records owned by the byte range `[start, end)` of an object.
+
+    `stream` must begin at offset `max(start - 1, 0)` (e.g. a ranged GET of `bytes={start-1}-`).
+    A range owns every line whose first byte lies in `[start, end)`, so a line straddling a boundary
+    is read to completion by the range it starts in and skipped by the next one. Reading stops at
+    the first line starting at or after `end`; callers should close the stream afterwards.
+    """
+    # Offset of `pending[0]` within the object.
+    pos = max(start - 1, 0)
+    # Unless we start at 0, the bytes up to the first newline belong to the previous range
+    # (if byte `start - 1` is itself a newline, that "line" is empty).
+    skip = start > 0
+    pending = b""
+    for chunk in iter_byte_chunks(stream, chunk_size):
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line_start = pos
+            pos += len(line) + 1
+            if skip:
+                skip = False
+                continue
+            if line_start >= end:
+                return
+            if line.strip():
+                obj = codec.loads(line)
+                if isinstance(obj, dict):
+                    yield obj
+    if not skip and pos < end and pending.strip():
+        obj = codec.loads(pending)
         if isinstance(obj, dict):
             yield obj
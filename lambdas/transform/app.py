@@ -5,154 +5,509 @@ Trigger:
 - SQS event source mapping, with partial batch failure reporting enabled.
 
 What it does:
-- Parses each SQS message into a normalized record (shared schema).
-- Groups records by `(record_type, dt)` and writes Parquet objects to Silver S3.
+- Parses each SQS message into normalized records (shared schema). Messages may carry a single
+  record or a multi-record envelope (see `lambdas.shared.envelope`); envelopes are unpacked
+  transparently and fail or succeed as a unit.
+- Groups records by `(record_type, partition)` as value tuples (see `lambdas.shared.columnar`) and writes
+  Parquet objects to Silver S3 via `pa.Table.from_arrays`, without per-record dicts.
 - Returns `batchItemFailures` so poisoned messages can be retried / sent to DLQ.
 
+Buffered mode (`SILVER_BUFFER_MODE=staging`):
+- Parquet parts are written under `SILVER_STAGING_PREFIX` instead of Silver; a message is acked once
+  its rows are staged. Partitions touched by the batch are then merged into one Silver file each
+  once staged rows, bytes or age cross the flush thresholds (see `lambdas.shared.staging`).
+  Flush errors never fail SQS messages: the rows are already durable and the next flush retries.
+- Partitions that stop receiving data are flushed by a scheduled `{"flush_staged": true}` event
+  (add `"force": true` to flush everything regardless of thresholds).
+
+Record-level dedup (`RECORD_DEDUP=on`):
+- Records whose natural key was already written are dropped before writing (see
+  `lambdas.shared.dedup`): in-batch set, per-partition Bloom filter in S3, DynamoDB for filter hits.
+  Keys are recorded only after their rows are written. Dedup errors are logged and never drop rows.
+
+Startup (what runs at init vs. on first use):
+- Imported at init: `boto3`, Powertools and the shared modules every batch needs. Inside Lambda
+  (`AWS_LAMBDA_FUNCTION_NAME` set) init also imports `pyarrow.parquet`, builds the cached Arrow
+  schema of every record type and creates the S3 client, so the first batch does not pay for them.
+- Imported on first use: `lambdas.shared.dedup` (only with `RECORD_DEDUP=on`).
+- `bench/bench_cold_start.py` and the import-time tests keep the init budget in check.
+
 Optional (enterprise-ish):
 - When `QUALITY_EVENTBRIDGE_ENABLED=true`, emits an EventBridge event per partition written
-  to trigger a downstream quality gate (e.g., Step Functions + Glue GE job).
+  to trigger a downstream quality gate (e.g., Step Functions + Glue GE job). The detail carries
+  `dt`, `hour` (null when daily) and `partition` (the hive path, e.g. `dt=2025-01-01/hour=05`).
 
 Environment variables:
 - `SILVER_BUCKET` (required), `SILVER_PREFIX` (default: "silver")
-- `MAX_RECORDS_PER_FILE` (default: 5000)
+- `MAX_RECORDS_PER_FILE` (default: 5000): files are streamed to S3 as multipart uploads, so this can
+  be raised well beyond what fits in memory twice
+- `MAX_BYTES_PER_FILE` (default: 64 MiB of input JSON per partition file; 0 disables): partitions
+  above it are split evenly into enough files to stay under it (see `rows_per_file`)
+- `SILVER_PARTITION_GRANULARITY` (default: "dt"): "dt/hour" adds an `hour=HH` level below `dt=`
+- `SILVER_LATE_DATA_POLICY` (default: "current"): "partition" sends rows without `event_time`, or
+  older than `SILVER_MAX_LATENESS_SECONDS` (default: 0 = no age limit), to `dt={SILVER_LATE_PARTITION}`
+  (default: "late"; `dt=late/hour=__` when hourly) instead of the current partition
+  (see `lambdas.shared.partitioning`)
+- `SILVER_PARQUET_PROFILE` (default: "{}"): JSON overrides applied on top of the per-record-type
+  Parquet profile (`PARQUET_PROFILES` in `lambdas.shared.schemas`), e.g. `{"compression": "snappy"}`
+  or `{"sort_by": []}` to keep arrival order instead of sorting rows by the record type's sort key
+- `S3_PART_BYTES` (default: 8 MiB): multipart part size; smaller files use a single PutObject
+- `WRITE_CONCURRENCY` (default: 4): partition chunks encoded + uploaded in parallel (1 = sequential)
+- `WRITE_MAX_IN_FLIGHT` (default: `WRITE_CONCURRENCY`): cap on pending chunk writes (bounds memory)
+- `SILVER_EVENT_TIME_TYPE` (default: "string"): "timestamp" writes `event_time` as Arrow
+  `timestamp[us, tz=UTC]` instead of an ISO string (choose once per table; Glue/Athena cannot mix both)
+- `SILVER_BUFFER_MODE` (default: "off"): "staging" enables buffered mode
+- `SILVER_STAGING_PREFIX` (default: "staging/silver"): keep it outside the crawled Silver prefix
+- `SILVER_FLUSH_MAX_ROWS` (default: 100000), `SILVER_FLUSH_MAX_BYTES` (default: 64 MiB),
+  `SILVER_FLUSH_MAX_AGE_SECONDS` (default: 300)
+- `SILVER_FLUSH_LOCK_TTL_SECONDS` (default: 1800): must exceed the function timeout
+- `RECORD_DEDUP` (default: "off"): "on" enables record-level dedup; requires `DEDUP_TABLE_NAME`
+- `DEDUP_KEYS` (default: "{}"): JSON `{record_type: [fields]}` overriding `DEFAULT_DEDUP_KEYS`
+- `DEDUP_BLOOM` (default: true), `DEDUP_BLOOM_PREFIX` (default: "_dedup/bloom", in the Silver bucket),
+  `DEDUP_BLOOM_CAPACITY` (default: 200000 keys per partition), `DEDUP_BLOOM_FPP` (default: 0.01)
+- `DEDUP_TTL_SECONDS` (default: 7 days): how long a key is remembered in DynamoDB
+- `INIT_PREWARM` (default: "auto" = only inside Lambda): "true"/"false" forces init pre-warming on/off
+- `STAGE_TIMING_SAMPLE_RATE` (default: 0): fraction of invocations emitting per-stage time/bytes metrics
+  (`JsonParse`, `Normalize`, `Dedup`, `ArrowConvert`, `ParquetEncode`, `S3Put`, `S3Get`, `StagingFlush`;
+  see `lambdas.shared.timing`)
+- `PROFILE_SAMPLE_EVERY` (default: 0 = off), `PROFILE_MODE`, `PROFILE_OUTPUT`: cProfile / tracemalloc
+  1 in N invocations (see `lambdas.shared.profiling`)
 - `QUALITY_EVENTBRIDGE_ENABLED` (default: false)
 - `QUALITY_EVENTBUS_NAME` (default: "default"), `QUALITY_EVENT_SOURCE`, `QUALITY_EVENT_DETAIL_TYPE`
 - Powertools: structured logs + embedded metrics (no extra CloudWatch permissions required)
 """
 
-import io
-import json
+import os
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 import boto3
 
 from aws_lambda_powertools import Logger, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 
-from lambdas.shared.schemas import normalize_record, partition_dt, to_pyarrow_schema
-from lambdas.shared.utils import chunked, env, json_dumps, new_id
+from lambdas.shared import codec
+from lambdas.shared.columnar import ColumnarBatches, PartitionRows, rows_to_table
+from lambdas.shared.compaction import default_memory_budget_bytes
+from lambdas.shared.envelope import unpack_records
+from lambdas.shared.partitioning import DEFAULT_LATE_PARTITION, Partition, Partitioner, rows_per_file
+from lambdas.shared.profiling import profiled
+from lambdas.shared.s3_stream import DEFAULT_PART_BYTES, S3MultipartWriter
+from lambdas.shared.schemas import (
+    RECORD_SCHEMAS,
+    normalize_record_values,
+    parquet_profile,
+    parquet_writer_options,
+    sort_table,
+    to_pyarrow_schema,
+)
+from lambdas.shared.staging import flush_partition, list_staged_partitions, staged_part_key
+from lambdas.shared.timing import StageTimer
+from lambdas.shared.utils import bounded_map, chunked, env, json_dumps, new_id, prewarm, require_client_params
+
+if TYPE_CHECKING:
+    from lambdas.shared.dedup import RecordDeduper
 
 
 logger = Logger(service="serverless-elt.transform")
 metrics = Metrics(namespace="ServerlessELT", service="transform")
+timer = StageTimer()
+
+# S3 calls timed on sampled invocations (staging flushes read parts back with `get_object`).
+_S3_STAGES = {
+    "get_object": "S3Get",
+    "put_object": "S3Put",
+    "create_multipart_upload": "S3Put",
+    "upload_part": "S3Put",
+    "complete_multipart_upload": "S3Put",
+}
+
+
+_S3_CLIENT: Any = None
 
 
 def _clients():
-    return boto3.client("s3")
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        _S3_CLIENT = boto3.client("s3")
+    return _S3_CLIENT
+
+
+@lru_cache(maxsize=None)
+def _profile_overrides(raw: str) -> Dict[str, Any]:
+    # Parsed once per distinct `SILVER_PARQUET_PROFILE` value; callers must not mutate the result.
+    return codec.loads(raw)
+
+
+@lru_cache(maxsize=None)
+def _resolved_profile(record_type: str, raw_overrides: str) -> Dict[str, Any]:
+    return parquet_profile(record_type, _profile_overrides(raw_overrides))
 
 
-def _s3_put_parquet(s3, bucket: str, key: str, records: List[Dict[str, Any]], record_type: str) -> None:
-    import pyarrow as pa  # type: ignore
+def _parquet_profile(record_type: str) -> Dict[str, Any]:
+    return _resolved_profile(record_type, env("SILVER_PARQUET_PROFILE", "{}"))
+
+
+def _s3_put_parquet(
+    s3, bucket: str, key: str, rows: List[Tuple[Any, ...]], record_type: str, timestamp_type: str = "string"
+) -> None:
     import pyarrow.parquet as pq  # type: ignore
 
-    schema = to_pyarrow_schema(record_type)
-    table = pa.Table.from_pylist(records, schema=schema)
-    buf = io.BytesIO()
-    pq.write_table(table, buf, compression="snappy")
-    s3.put_object(Bucket=bucket, Key=key, Body=buf.getvalue())
+    # Row groups are encoded straight into a multipart upload: no whole-file buffer, no `getvalue()` copy.
+    profile = _parquet_profile(record_type)
+    row_group_rows = max(1, int(profile["row_group_size"]))
+    schema = to_pyarrow_schema(record_type, timestamp_type=timestamp_type)
+    with S3MultipartWriter(s3, bucket, key, part_bytes=int(env("S3_PART_BYTES", str(DEFAULT_PART_BYTES)))) as sink:
+        with pq.ParquetWriter(sink, schema, **parquet_writer_options(profile, schema)) as writer:
+            if profile["sort_by"]:
+                # Sorting needs the whole chunk; row groups are still encoded and uploaded one at a time.
+                with timer.span("ArrowConvert"):
+                    table = sort_table(rows_to_table(record_type, rows, timestamp_type=timestamp_type), profile)
+                with timer.span("ParquetEncode"):
+                    writer.write_table(table, row_group_size=row_group_rows)
+            else:
+                for start in range(0, len(rows), row_group_rows):
+                    with timer.span("ArrowConvert"):
+                        table = rows_to_table(record_type, rows[start : start + row_group_rows], timestamp_type=timestamp_type)
+                    with timer.span("ParquetEncode"):
+                        writer.write_table(table)
 
 
 def _log(event: str, **fields: Any) -> None:
     logger.info(event, extra=fields)
 
 
+def _deduper(s3, bucket: str) -> Optional["RecordDeduper"]:
+    if env("RECORD_DEDUP", "off").lower() != "on":
+        return None
+    from lambdas.shared.dedup import RecordDeduper
+
+    bloom = env("DEDUP_BLOOM", "true").lower() == "true"
+    if bloom:
+        # Filter merges are conditional PUTs; without them every `mark_written` would fail (and only count `DedupErrors`).
+        require_client_params(s3, "PutObject", "IfMatch", "IfNoneMatch")
+    return RecordDeduper(
+        boto3.client("dynamodb"),
+        env("DEDUP_TABLE_NAME"),
+        s3=s3 if bloom else None,
+        bucket=bucket,
+        bloom_prefix=env("DEDUP_BLOOM_PREFIX", "_dedup/bloom") if bloom else None,
+        dedup_keys=codec.loads(env("DEDUP_KEYS", "{}")),
+        ttl_seconds=int(env("DEDUP_TTL_SECONDS", str(7 * 24 * 3600))),
+        bloom_capacity=int(env("DEDUP_BLOOM_CAPACITY", "200000")),
+        bloom_fpp=float(env("DEDUP_BLOOM_FPP", "0.01")),
+    )
+
+
+def _drop_duplicates(batches: ColumnarBatches, deduper: "RecordDeduper") -> Dict[Tuple[str, Partition], List[Optional[str]]]:
+    """Drop already-written records in place; return the dedup keys of the kept rows per partition."""
+    keys_by_partition: Dict[Tuple[str, Partition], List[Optional[str]]] = {}
+    for partition, part in list(batches.partitions.items()):
+        try:
+            keep, keys = deduper.filter_rows(part.record_type, part.partition, part.rows)
+        except Exception as e:
+            # Dedup is best-effort: keep every row rather than fail or drop data.
+            _log("transform_dedup_error", record_type=part.record_type, **part.partition.fields(), error=str(e))
+            metrics.add_metric(name="DedupErrors", unit=MetricUnit.Count, value=1)
+            continue
+        part.keep(keep)
+        if part.rows:
+            keys_by_partition[partition] = keys
+        else:
+            del batches.partitions[partition]
+    return keys_by_partition
+
+
+def _flush_staged(
+    s3,
+    bucket: str,
+    partitions: List[Tuple[str, Partition]],
+    *,
+    staging_prefix: str,
+    silver_prefix: str,
+    timestamp_type: str,
+    force: bool = False,
+    concurrency: int = 1,
+) -> Dict[Tuple[str, Partition], int]:
+    """Flush staged partitions that are due; return Silver files written per partition."""
+    thresholds = {
+        "max_rows": int(env("SILVER_FLUSH_MAX_ROWS", "100000")),
+        "max_bytes": int(env("SILVER_FLUSH_MAX_BYTES", str(64 * 1024 * 1024))),
+        "max_age_seconds": int(env("SILVER_FLUSH_MAX_AGE_SECONDS", "300")),
+        "lock_ttl_seconds": int(env("SILVER_FLUSH_LOCK_TTL_SECONDS", "1800")),
+        # Flushes run side by side: each merges within its share of the memory budget.
+        "memory_budget_bytes": default_memory_budget_bytes() // max(1, concurrency),
+        "profile_overrides": _profile_overrides(env("SILVER_PARQUET_PROFILE", "{}")),
+    }
+
+    def _flush(task: Tuple[str, Partition]) -> List[str]:
+        record_type, partition = task
+        return flush_partition(
+            s3,
+            bucket,
+            staging_prefix=staging_prefix,
+            silver_prefix=silver_prefix,
+            record_type=record_type,
+            partition=partition,
+            timestamp_type=timestamp_type,
+            force=force,
+            **thresholds,
+        )
+
+    flushed: Dict[Tuple[str, Partition], int] = {}
+    for (record_type, partition), error, keys in bounded_map(
+        _flush, partitions, concurrency=concurrency, thread_name_prefix="silver-flush"
+    ):
+        if error is not None:
+            # Staged rows are durable; the next flush (or the scheduled one) retries.
+            _log("transform_flush_error", record_type=record_type, **partition.fields(), error=str(error))
+            metrics.add_metric(name="FlushErrors", unit=MetricUnit.Count, value=1)
+        elif keys:
+            flushed[(record_type, partition)] = len(keys)
+            _log("transform_flush_ok", record_type=record_type, **partition.fields(), keys=keys)
+    return flushed
+
+
+def _emit_quality_events(
+    events,
+    partitions_written: Dict[Tuple[str, Partition], int],
+    *,
+    out_bucket: str,
+    base_prefix: str,
+    bus_name: str,
+    source: str,
+    detail_type: str,
+) -> None:
+    try:
+        now = datetime.now(timezone.utc)
+        entries = []
+        for (record_type, partition), files_written in partitions_written.items():
+            detail = {
+                "silver_bucket": out_bucket,
+                "silver_prefix": base_prefix,
+                "record_type": record_type,
+                **partition.fields(),
+                "partition": partition.path,
+                "files_written": files_written,
+            }
+            entries.append(
+                {
+                    "Source": source,
+                    "DetailType": detail_type,
+                    "Detail": json_dumps(detail),
+                    "EventBusName": bus_name,
+                    "Time": now,
+                }
+            )
+
+        failed = 0
+        for chunk in chunked(entries, 10):
+            resp = events.put_events(Entries=chunk)
+            failed += int(resp.get("FailedEntryCount", 0))
+        _log("quality_events_emitted", entries=len(entries), failed=failed)
+    except Exception as e:
+        _log("quality_events_emit_error", error=str(e))
+
+
 @metrics.log_metrics(capture_cold_start_metric=True)
+@profiled("transform")
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     out_bucket = env("SILVER_BUCKET")
     base_prefix = env("SILVER_PREFIX", "silver")
     max_records_per_file = int(env("MAX_RECORDS_PER_FILE", "5000"))
+    max_bytes_per_file = int(env("MAX_BYTES_PER_FILE", str(64 * 1024 * 1024)))
+    granularity = env("SILVER_PARTITION_GRANULARITY", "dt").lower()
+    timestamp_type = env("SILVER_EVENT_TIME_TYPE", "string").lower()
+    write_concurrency = int(env("WRITE_CONCURRENCY", "4"))
+    write_max_in_flight = int(env("WRITE_MAX_IN_FLIGHT", "0"))
     emit_quality_events = env("QUALITY_EVENTBRIDGE_ENABLED", "false").lower() == "true"
     quality_bus_name = env("QUALITY_EVENTBUS_NAME", "default")
     quality_source = env("QUALITY_EVENT_SOURCE", "serverless-elt.transform")
     quality_detail_type = env("QUALITY_EVENT_DETAIL_TYPE", "silver_partition_ready")
 
-    s3 = _clients()
+    staging = env("SILVER_BUFFER_MODE", "off").lower() == "staging"
+    staging_prefix = env("SILVER_STAGING_PREFIX", "staging/silver")
+
+    timer.begin(float(env("STAGE_TIMING_SAMPLE_RATE", "0")))
+    s3 = timer.client(_clients(), _S3_STAGES)
+    if staging:
+        # The flush lock relies on S3 conditional writes; an older bundled SDK would reject every attempt.
+        require_client_params(s3, "PutObject", "IfNoneMatch")
+        require_client_params(s3, "DeleteObject", "IfMatch")
     events = boto3.client("events") if emit_quality_events else None
+    quality_kwargs = {
+        "out_bucket": out_bucket,
+        "base_prefix": base_prefix,
+        "bus_name": quality_bus_name,
+        "source": quality_source,
+        "detail_type": quality_detail_type,
+    }
+
+    if event.get("flush_staged"):
+        # Scheduled flush for partitions that stopped receiving data (age threshold).
+        with timer.span("StagingFlush"):
+            flushed = _flush_staged(
+                s3,
+                out_bucket,
+                list_staged_partitions(s3, out_bucket, staging_prefix, granularity),
+                staging_prefix=staging_prefix,
+                silver_prefix=base_prefix,
+                timestamp_type=timestamp_type,
+                force=bool(event.get("force")),
+                concurrency=write_concurrency,
+            )
+        if events and flushed:
+            _emit_quality_events(events, flushed, **quality_kwargs)
+        metrics.add_metric(name="FilesWritten", unit=MetricUnit.Count, value=sum(flushed.values()))
+        _emit_timings()
+        return {"partitions_flushed": len(flushed), "files_written": sum(flushed.values())}
+
     records = event.get("Records", [])
     failures: List[Dict[str, str]] = []
 
     metrics.add_metric(name="MessagesReceived", unit=MetricUnit.Count, value=len(records))
 
     # Parse + normalize messages. Bad messages become partial failures (retries/DLQ).
-    good: List[Tuple[str, Dict[str, Any], str]] = []
+    # An envelope is all-or-nothing: one bad record fails the whole message.
+    # Records are grouped by (record_type, partition) as they are normalized.
+    batches = ColumnarBatches(
+        partitioner=Partitioner(
+            granularity,
+            late_policy=env("SILVER_LATE_DATA_POLICY", "current").lower(),
+            late_partition=env("SILVER_LATE_PARTITION", DEFAULT_LATE_PARTITION),
+            max_lateness_seconds=int(env("SILVER_MAX_LATENESS_SECONDS", "0")),
+        )
+    )
     for r in records:
         msg_id = r.get("messageId") or r.get("messageID") or ""
         try:
-            body = json.loads(r["body"])
-            normalized = normalize_record(body)
-            record_type = normalized["record_type"]
-            good.append((msg_id, normalized, record_type))
+            with timer.span("JsonParse", len(r["body"])):
+                body = codec.loads(r["body"])
+            with timer.span("Normalize"):
+                normalized_records = [normalize_record_values(rec) for rec in unpack_records(body)]
         except Exception as e:
             _log("transform_bad_message", message_id=msg_id, error=str(e))
             if msg_id:
                 failures.append({"itemIdentifier": msg_id})
+            continue
+        # Envelope bytes are shared evenly by its records.
+        nbytes = len(r["body"]) // max(1, len(normalized_records))
+        for record_type, values in normalized_records:
+            batches.add(msg_id, record_type, values, nbytes)
+
+    records_received = len(batches)
+    deduper = _deduper(s3, out_bucket)
+    with timer.span("Dedup"):
+        dedup_keys = _drop_duplicates(batches, deduper) if deduper else {}
+    written_keys: Dict[Tuple[str, Partition], List[Optional[str]]] = {}
+
+    # Write Parquet objects by partition, chunked by the partition's row / byte counters to keep
+    # files reasonably sized. Chunks are encoded + uploaded concurrently; each worker slices its own
+    # rows, so at most `WRITE_MAX_IN_FLIGHT` chunk copies / Parquet buffers exist at once.
+    def _chunks() -> Iterator[Tuple[Tuple[str, Partition], PartitionRows, int, int, str]]:
+        for (record_type, partition), part in batches.partitions.items():
+            per_file = rows_per_file(len(part), part.nbytes, max_rows=max_records_per_file, max_bytes=max_bytes_per_file)
+            for start in range(0, len(part), per_file):
+                stop = min(start + per_file, len(part))
+                if staging:
+                    key = staged_part_key(staging_prefix, record_type, partition, stop - start)
+                else:
+                    key = f"{base_prefix}/{record_type}/{partition.path}/batch_{getattr(context, 'aws_request_id', 'local')}_{new_id()}.parquet"
+                yield (record_type, partition), part, start, stop, key
+
+    def _write(task: Tuple[Tuple[str, Partition], PartitionRows, int, int, str]) -> int:
+        (record_type, _), part, start, stop, key = task
+        rows_chunk = part.rows[start:stop]
+        _s3_put_parquet(s3, out_bucket, key, rows_chunk, record_type=record_type, timestamp_type=timestamp_type)
+        return len(rows_chunk)
 
-    # Group by (record_type, dt)
-    grouped: Dict[Tuple[str, str], List[Tuple[str, Dict[str, Any]]]] = {}
-    for msg_id, rec, record_type in good:
-        dt = partition_dt([rec])
-        grouped.setdefault((record_type, dt), []).append((msg_id, rec))
-
-    # Write Parquet objects by partition, chunked to keep files reasonably sized.
     written_files = 0
-    partitions_written: Dict[Tuple[str, str], int] = {}
-    for (record_type, dt), items in grouped.items():
-        for items_chunk in chunked(items, max_records_per_file):
-            only_records = [r for _, r in items_chunk]
-            key = f"{base_prefix}/{record_type}/dt={dt}/batch_{getattr(context, 'aws_request_id', 'local')}_{new_id()}.parquet"
+    partitions_written: Dict[Tuple[str, Partition], int] = {}
+    for task, error, count in bounded_map(
+        _write, _chunks(), concurrency=write_concurrency, max_in_flight=write_max_in_flight, thread_name_prefix="silver-write"
+    ):
+        (record_type, partition), part, start, stop, key = task
+        if error is None:
+            written_files += 1
+            partitions_written[(record_type, partition)] = partitions_written.get((record_type, partition), 0) + 1
+            if (record_type, partition) in dedup_keys:
+                written_keys.setdefault((record_type, partition), []).extend(dedup_keys[(record_type, partition)][start:stop])
+            _log("transform_write_ok", record_type=record_type, **partition.fields(), key=key, count=count)
+        else:
+            _log("transform_write_error", record_type=record_type, **partition.fields(), error=str(error))
+            failures.extend({"itemIdentifier": msg_id} for msg_id in part.msg_ids[start:stop] if msg_id)
+
+    if deduper:
+        # Staged rows count as written: they reach Silver exactly once via the flush protocol.
+        for (record_type, partition), keys in written_keys.items():
             try:
-                _s3_put_parquet(s3, out_bucket, key, only_records, record_type=record_type)
-                written_files += 1
-                partitions_written[(record_type, dt)] = partitions_written.get((record_type, dt), 0) + 1
-                _log("transform_write_ok", record_type=record_type, dt=dt, key=key, count=len(only_records))
+                with timer.span("Dedup"):
+                    deduper.mark_written(record_type, partition, keys)
             except Exception as e:
-                _log("transform_write_error", record_type=record_type, dt=dt, error=str(e))
-                failures.extend({"itemIdentifier": msg_id} for msg_id, _ in items_chunk if msg_id)
+                _log("transform_dedup_mark_error", record_type=record_type, **partition.fields(), error=str(e))
+                metrics.add_metric(name="DedupErrors", unit=MetricUnit.Count, value=1)
+        stats = deduper.stats
+        metrics.add_metric(name="DedupDropped", unit=MetricUnit.Count, value=stats["dropped_in_batch"] + stats["dropped_seen"])
+        metrics.add_metric(name="DedupBloomHits", unit=MetricUnit.Count, value=stats["bloom_hits"])
+        metrics.add_metric(name="DedupLookups", unit=MetricUnit.Count, value=stats["ddb_lookups"])
+
+    if staging and partitions_written:
+        metrics.add_metric(name="FilesStaged", unit=MetricUnit.Count, value=written_files)
+        with timer.span("StagingFlush"):
+            partitions_written = _flush_staged(
+                s3,
+                out_bucket,
+                list(partitions_written),
+                staging_prefix=staging_prefix,
+                silver_prefix=base_prefix,
+                timestamp_type=timestamp_type,
+                concurrency=write_concurrency,
+            )
+        written_files = sum(partitions_written.values())
 
     # Optional: notify downstream orchestration that a partition is ready for quality validation.
     if events and partitions_written:
-        try:
-            now = datetime.now(timezone.utc)
-            entries = []
-            for (record_type, dt), files_written in partitions_written.items():
-                detail = {
-                    "silver_bucket": out_bucket,
-                    "silver_prefix": base_prefix,
-                    "record_type": record_type,
-                    "dt": dt,
-                    "files_written": files_written,
-                }
-                entries.append(
-                    {
-                        "Source": quality_source,
-                        "DetailType": quality_detail_type,
-                        "Detail": json.dumps(detail, separators=(",", ":")),
-                        "EventBusName": quality_bus_name,
-                        "Time": now,
-                    }
-                )
-
-            failed = 0
-            for chunk in chunked(entries, 10):
-                resp = events.put_events(Entries=chunk)
-                failed += int(resp.get("FailedEntryCount", 0))
-            _log("quality_events_emitted", entries=len(entries), failed=failed)
-        except Exception as e:
-            _log("quality_events_emit_error", error=str(e))
+        _emit_quality_events(events, partitions_written, **quality_kwargs)
 
+    # A message's records can span several chunks; report each failed message once.
+    failures = [{"itemIdentifier": msg_id} for msg_id in dict.fromkeys(f["itemIdentifier"] for f in failures)]
+
+    metrics.add_metric(name="RecordsReceived", unit=MetricUnit.Count, value=records_received)
     metrics.add_metric(name="FilesWritten", unit=MetricUnit.Count, value=written_files)
     if failures:
         metrics.add_metric(name="MessagesFailed", unit=MetricUnit.Count, value=len(failures))
+    _emit_timings()
 
     return {"batchItemFailures": failures}
 
 
+def _emit_timings() -> None:
+    timings = timer.emit(metrics)
+    if timings:
+        _log("transform_stage_timings", stages=timings)
+
+
+def _prewarm() -> None:
+    """Move first-batch costs into init: pyarrow import, Arrow schemas, writer introspection, S3 client."""
+    try:
+        import pyarrow.parquet  # type: ignore  # noqa: F401
+    except ImportError:
+        return
+    timestamp_type = os.getenv("SILVER_EVENT_TIME_TYPE", "string").lower()
+    for record_type in RECORD_SCHEMAS:
+        to_pyarrow_schema(record_type, timestamp_type=timestamp_type)
+    parquet_writer_options(parquet_profile(next(iter(RECORD_SCHEMAS))))
+    _clients()
+
+
+prewarm(_prewarm)
+
+
 def _main() -> int:
     import sys
 
-    event = json.loads(sys.stdin.read())
+    event = codec.loads(sys.stdin.read())
     print(json_dumps(handler(event, context=None)))
     return 0
 
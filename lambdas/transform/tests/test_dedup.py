@@ -0,0 +1,145 @@
+import pytest
+
+import lambdas.transform.app as transform
+from lambdas.shared import dedup
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.schemas import SCHEMAS
+
+
+CONTEXT = type("C", (), {"aws_request_id": "r1", "function_name": "serverless-elt-transform"})()
+DAY = Partition("2025-01-01")
+
+
+@pytest.fixture
+def aws(make_bucket, make_table, monkeypatch):
+    make_table("dedup")
+    monkeypatch.setattr(dedup, "_BLOOM_CACHE", {})
+    return make_bucket("silver-bucket")
+
+
+def test_bloom_filter_round_trips_without_false_negatives():
+    bloom = dedup.BloomFilter.for_capacity(1000, 0.01)
+    keys = [f"k{i}" for i in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    restored = dedup.BloomFilter.from_bytes(bloom.to_bytes())
+    assert all(k in restored for k in keys) and restored.count == 1000
+    false_positives = sum(f"other{i}" in restored for i in range(10000))
+    assert false_positives < 300
+
+
+def test_redelivered_and_in_batch_duplicates_are_dropped(aws, monkeypatch):
+    monkeypatch.setenv("SILVER_BUCKET", "silver-bucket")
+    monkeypatch.setenv("RECORD_DEDUP", "on")
+    monkeypatch.setenv("DEDUP_TABLE_NAME", "dedup")
+    monkeypatch.setattr(transform, "_clients", lambda: aws)
+
+    written = []
+    fail = {"on": True}
+
+    def _fake_put(s3, bucket, key, rows, record_type, **kwargs):
+        if record_type == "invoice_lines" and fail["on"]:
+            raise RuntimeError("s3 down")
+        written.extend(dict(zip(SCHEMAS[record_type], row)) for row in rows)
+
+    monkeypatch.setattr(transform, "_s3_put_parquet", _fake_put)
+
+    ship = '{"record_type":"shipments","event_time":"2025-01-01T00:00:00Z","shipment_id":"shp_%d"}'
+    inv = '{"record_type":"invoice_lines","event_time":"2025-01-01T00:00:00Z","invoice_id":"inv_1","sku":"A"}'
+    event = {
+        "Records": [
+            {"messageId": "m1", "body": ship % 1},
+            {"messageId": "m2", "body": ship % 1},  # duplicate inside the batch
+            {"messageId": "m3", "body": ship % 2},
+            {"messageId": "m4", "body": inv},
+        ]
+    }
+    assert transform.handler(event, CONTEXT)["batchItemFailures"] == [{"itemIdentifier": "m4"}]
+    assert sorted(r["shipment_id"] for r in written) == ["shp_1", "shp_2"]
+
+    # Full redelivery: shipments are known (Bloom hit confirmed in DynamoDB); the failed invoice is not.
+    fail["on"] = False
+    written.clear()
+    assert transform.handler(event, CONTEXT)["batchItemFailures"] == []
+    assert [r.get("invoice_id") for r in written] == ["inv_1"]
+
+    bloom = aws.get_object(Bucket="silver-bucket", Key="_dedup/bloom/shipments/dt=2025-01-01/bloom.bin")["Body"].read()
+    assert dedup.BloomFilter.from_bytes(bloom).count == 2
+
+
+def test_bloom_miss_skips_dynamodb(aws):
+    import boto3
+
+    ddb = boto3.client("dynamodb")
+    first = dedup.RecordDeduper(ddb, "dedup", s3=aws, bucket="silver-bucket", bloom_prefix="_dedup/bloom", bloom_capacity=1000)
+    rows = [("shipments", f"2025-01-01T00:00:0{i}Z", "shp_1", None, None, None, None) for i in range(3)]
+    keep, keys = first.filter_rows("shipments", DAY, rows)
+    assert keep == [0, 1, 2] and first.stats["ddb_lookups"] == 0  # no filter yet: nothing written before
+    first.mark_written("shipments", DAY, keys)
+
+    second = dedup.RecordDeduper(ddb, "dedup", s3=aws, bucket="silver-bucket", bloom_prefix="_dedup/bloom", bloom_capacity=1000)
+    new_rows = [("shipments", "2025-01-01T00:00:09Z", "shp_9", None, None, None, None)]
+    keep, _ = second.filter_rows("shipments", DAY, rows + new_rows)
+    assert keep == [3]
+    assert second.stats["bloom_hits"] == 3 and second.stats["ddb_lookups"] == 3
+
+
+def test_bloom_dedup_fails_loudly_without_conditional_put_support(aws, monkeypatch):
+    monkeypatch.setenv("SILVER_BUCKET", "silver-bucket")
+    monkeypatch.setenv("RECORD_DEDUP", "on")
+    monkeypatch.setenv("DEDUP_TABLE_NAME", "dedup")
+    monkeypatch.setattr(transform, "_clients", lambda: aws)
+    # An SDK predating PutObject `IfMatch`.
+    monkeypatch.delitem(aws.meta.service_model.operation_model("PutObject").input_shape.members, "IfMatch")
+
+    event = {"Records": [{"messageId": "m1", "body": '{"record_type":"shipments","event_time":"2025-01-01T00:00:00Z","shipment_id":"s"}'}]}
+    with pytest.raises(RuntimeError, match="PutObject does not accept IfMatch"):
+        transform.handler(event, CONTEXT)
+
+    monkeypatch.setenv("DEDUP_BLOOM", "false")
+    assert transform.handler(event, CONTEXT)["batchItemFailures"] == []
+
+
+class _ThrottledDynamoDB:
+    """Leaves all but the first key/item unprocessed on every call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        (table, request), = RequestItems.items()
+        first, rest = request["Keys"][:1], request["Keys"][1:]
+        return {"Responses": {table: first}, "UnprocessedKeys": {table: {**request, "Keys": rest}} if rest else {}}
+
+    def batch_write_item(self, RequestItems):
+        self.calls += 1
+        (table, requests), = RequestItems.items()
+        return {"UnprocessedItems": {table: requests[1:]} if requests[1:] else {}}
+
+
+def test_unprocessed_keys_and_items_back_off_and_give_up():
+    ddb, sleeps = _ThrottledDynamoDB(), []
+    deduper = dedup.RecordDeduper(ddb, "dedup", max_attempts=4, backoff_base_seconds=0.1, sleep=sleeps.append)
+    rows = [("shipments", "2025-01-01T00:00:00Z", f"shp_{i}", None, None, None, None) for i in range(3)]
+
+    keep, _ = deduper.filter_rows("shipments", DAY, rows)
+    assert keep == [] and ddb.calls == 3  # every key came back on one of the retries
+    deduper.mark_written("shipments", DAY, ["a", "b", "c"])
+    assert ddb.calls == 6
+    assert len(sleeps) == 4 and 0.05 <= sleeps[0] <= 0.1 and 0.1 <= sleeps[1] <= 0.2
+
+    sleeps.clear()
+    rows = [("shipments", "2025-01-01T00:00:00Z", f"shp_{i}", None, None, None, None) for i in range(10)]
+    with pytest.raises(RuntimeError, match="UnprocessedKeys=6 attempts=4"):
+        dedup.RecordDeduper(ddb, "dedup", max_attempts=4, backoff_base_seconds=0.1, sleep=sleeps.append).filter_rows("shipments", DAY, rows)
+    assert len(sleeps) == 3 and 0.2 <= sleeps[-1] <= 0.4
+
+
+def test_batched_bloom_lookups_match_single_key_lookups():
+    bloom = dedup.BloomFilter.for_capacity(500, 0.01)
+    bloom.add_many([f"k{i}" for i in range(0, 500, 2)])
+    bloom.add("k1")
+    probe = [f"k{i}" for i in range(500)] + ["\x1fé"]
+    assert bloom.contains_many(probe) == [k in bloom for k in probe]
+    assert bloom.count == 251 and bloom.contains_many([]) == []
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from lambdas.shared.columnar import ColumnarBatches
+from lambdas.shared.partitioning import LATE_HOUR, Partition, Partitioner, rows_per_file
+from lambdas.shared.schemas import normalize_record_values
+from lambdas.shared.staging import list_staged_partitions
+
+
+NOW = datetime(2025, 3, 10, 14, 30, tzinfo=timezone.utc)
+
+
+def test_daily_and_hourly_partition_values():
+    daily = Partitioner(now=NOW).partition("2025-03-09T23:59:59Z")
+    assert daily == Partition("2025-03-09") and daily.path == "dt=2025-03-09"
+    hourly = Partitioner("dt/hour", now=NOW)
+    assert hourly.partition("2025-03-09T05:00:00.123Z") == Partition("2025-03-09", "05")
+    assert hourly.partition("2025-03-09T05:00:00Z").path == "dt=2025-03-09/hour=05"
+    assert hourly.partition("2025-03-09T05:00:00Z").fields() == {"dt": "2025-03-09", "hour": "05"}
+    # Legacy policy: no event_time means the current partition, fixed for the whole batch.
+    assert hourly.partition(None) == Partition("2025-03-10", "14")
+
+    with pytest.raises(ValueError):
+        Partitioner("month")
+
+
+def test_late_policy_routes_missing_and_stale_rows_to_late_partition():
+    p = Partitioner("dt/hour", late_policy="partition", max_lateness_seconds=24 * 3600, now=NOW)
+    # Hourly late data keeps the hour level, so every partition has the same keys.
+    assert p.partition(None) == Partition("late", LATE_HOUR) and p.partition(None).path == "dt=late/hour=__"
+    assert p.partition("2025-03-09T14:29:59Z") == Partition("late", LATE_HOUR)
+    assert p.partition("2025-03-09T14:30:00Z") == Partition("2025-03-09", "14")
+    daily = Partitioner(late_policy="partition", now=NOW)
+    assert daily.partition(None).path == "dt=late"
+    assert daily.partition("2001-01-01T00:00:00Z") == Partition("2001-01-01")
+
+
+def test_columnar_batches_count_rows_and_bytes_per_partition():
+    batches = ColumnarBatches(partitioner=Partitioner(late_policy="partition", now=NOW))
+    for i, event_time in enumerate(["2025-03-10T01:00:00Z", "2025-03-10T02:00:00Z", None]):
+        batches.add(f"m{i}", *normalize_record_values({"record_type": "shipments", "shipment_id": f"s{i}", "event_time": event_time}), 100)
+
+    day = batches.partitions[("shipments", Partition("2025-03-10"))]
+    assert (len(day), day.nbytes) == (2, 200)
+    assert batches.partitions[("shipments", Partition("late"))].msg_ids == ["m2"]
+
+    day.keep([1])
+    assert (day.msg_ids, day.nbytes) == (["m1"], 100)
+
+
+def test_rows_per_file_balances_files_under_byte_cap():
+    assert rows_per_file(12000, 10, max_rows=5000) == 5000
+    # 250 bytes over a 100-byte cap: three files of 4 rows instead of 5 + 5 + 0.
+    assert rows_per_file(10, 250, max_rows=5000, max_bytes=100) == 4
+    assert rows_per_file(10, 250, max_rows=3, max_bytes=100) == 3
+    assert rows_per_file(0, 0, max_rows=0) == 1
+
+
+def test_staged_partitions_include_hour_level(make_bucket):
+    s3 = make_bucket("silver-bucket")
+    for key in ["shipments/dt=2025-03-10/hour=01/p.parquet", "shipments/dt=2025-03-10/hour=02/p.parquet", "shipments/dt=late/hour=__/p.parquet"]:
+        s3.put_object(Bucket="silver-bucket", Key=f"staging/{key}", Body=b"x")
+
+    assert sorted(list_staged_partitions(s3, "silver-bucket", "staging", "dt/hour")) == [
+        ("shipments", Partition("2025-03-10", "01")),
+        ("shipments", Partition("2025-03-10", "02")),
+        ("shipments", Partition("late", LATE_HOUR)),
+    ]
+    assert sorted(list_staged_partitions(s3, "silver-bucket", "staging")) == [
+        ("shipments", Partition("2025-03-10")),
+        ("shipments", Partition("late")),
+    ]
+
+
+def test_hourly_paths_and_quality_events_carry_structured_partitions(monkeypatch):
+    import json
+
+    import lambdas.transform.app as transform
+
+    monkeypatch.setenv("SILVER_BUCKET", "silver-bucket")
+    monkeypatch.setenv("SILVER_PARTITION_GRANULARITY", "dt/hour")
+    monkeypatch.setenv("SILVER_LATE_DATA_POLICY", "partition")
+    monkeypatch.setenv("QUALITY_EVENTBRIDGE_ENABLED", "true")
+    keys, entries = [], []
+
+    class _Events:
+        def put_events(self, Entries):
+            entries.extend(Entries)
+            return {"FailedEntryCount": 0}
+
+    monkeypatch.setattr(transform, "_clients", lambda: None)
+    monkeypatch.setattr(transform.boto3, "client", lambda name: _Events())
+    monkeypatch.setattr(transform, "_s3_put_parquet", lambda s3, bucket, key, rows, **kwargs: keys.append(key))
+
+    body = '{"record_type":"shipments","shipment_id":"s%d"%s}'
+    event = {
+        "Records": [
+            {"messageId": "m1", "body": body % (1, ',"event_time":"2025-03-10T05:00:00Z"')},
+            {"messageId": "m2", "body": body % (2, "")},  # no event_time: late partition
+        ]
+    }
+    ctx = type("C", (), {"aws_request_id": "r1", "function_name": "serverless-elt-transform"})()
+    assert transform.handler(event, ctx)["batchItemFailures"] == []
+
+    assert sorted(k.rsplit("/", 1)[0] for k in keys) == ["silver/shipments/dt=2025-03-10/hour=05", "silver/shipments/dt=late/hour=__"]
+    details = sorted((json.loads(e["Detail"]) for e in entries), key=lambda d: d["dt"])
+    assert [(d["dt"], d["hour"], d["partition"]) for d in details] == [
+        ("2025-03-10", "05", "dt=2025-03-10/hour=05"),
+        ("late", "__", "dt=late/hour=__"),
+    ]
@@ -1,6 +1,8 @@
 import pytest
 
 import lambdas.transform.app as transform
+from lambdas.shared.partitioning import Partition
+from lambdas.shared.schemas import SCHEMAS
 
 
 def test_transform_returns_partial_failures_when_bad_json(monkeypatch):
@@ -19,3 +21,254 @@ def test_transform_returns_partial_failures_when_bad_json(monkeypatch):
     }
     resp = transform.handler(event, context=type("C", (), {"aws_request_id": "r1", "function_name": "serverless-elt-transform"})())
     assert {"itemIdentifier": "m2"} in resp["batchItemFailures"]
+
+
+def test_transform_unpacks_envelopes_and_fails_them_as_a_unit(monkeypatch):
+    monkeypatch.setenv("SILVER_BUCKET", "out-bucket")
+    monkeypatch.setenv("SILVER_PREFIX", "silver")
+    monkeypatch.setattr(transform, "_clients", lambda: None)
+
+    written = []
+
+    def _fake_put(s3, bucket, key, rows, record_type, **kwargs):
+        if record_type == "invoice_lines":
+            raise RuntimeError("s3 down")
+        written.extend(dict(zip(SCHEMAS[record_type], row)) for row in rows)
+
+    monkeypatch.setattr(transform, "_s3_put_parquet", _fake_put)
+
+    ship = '{"record_type":"shipments","event_time":"2025-01-01T00:00:00Z","shipment_id":"shp_%d"}'
+    inv = '{"record_type":"invoice_lines","event_time":"2025-01-01T00:00:00Z","invoice_id":"inv_1"}'
+    event = {
+        "Records": [
+            {"messageId": "env-ok", "body": '{"_envelope":1,"records":[%s,%s]}' % (ship % 1, ship % 2)},
+            # Spans two partitions, one of which fails to write -> whole envelope is retried.
+            {"messageId": "env-mixed", "body": '{"_envelope":1,"records":[%s,%s,%s]}' % (ship % 3, inv, inv)},
+            # One bad record poisons the envelope before anything is written.
+            {"messageId": "env-bad", "body": '{"_envelope":1,"records":[%s,{"record_type":"nope"}]}' % (ship % 4)},
+            {"messageId": "single", "body": ship % 5},
+        ]
+    }
+    resp = transform.handler(event, context=type("C", (), {"aws_request_id": "r1", "function_name": "serverless-elt-transform"})())
+
+    assert resp["batchItemFailures"] == [{"itemIdentifier": "env-bad"}, {"itemIdentifier": "env-mixed"}]
+    assert sorted(r["shipment_id"] for r in written) == ["shp_1", "shp_2", "shp_3", "shp_5"]
+
+
+def test_parquet_event_time_can_be_written_as_utc_timestamp(monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    import io
+
+    import pyarrow.parquet as pq
+
+    from lambdas.shared.schemas import normalize_record_values
+
+    puts = {}
+
+    class _S3:
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            puts[Key] = Body
+
+    rows = [
+        normalize_record_values({"record_type": "shipments", "event_time": "2025-01-01T00:00:00Z", "shipment_id": "a"})[1],
+        normalize_record_values({"record_type": "shipments", "event_time": None, "shipment_id": "b"})[1],
+    ]
+    transform._s3_put_parquet(_S3(), "b", "k", rows, record_type="shipments", timestamp_type="timestamp")
+    table = pq.read_table(io.BytesIO(puts["k"]))
+
+    assert table.schema.field("event_time").type == pa.timestamp("us", tz="UTC")
+    assert table.column("event_time").to_pylist()[1] is None
+    assert table.column("event_time")[0].value == 1735689600 * 1_000_000
+
+
+def test_staging_mode_buffers_then_flushes_exactly_once(make_bucket, monkeypatch):
+    import io
+    import json
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    from lambdas.shared import staging
+
+    monkeypatch.setenv("SILVER_BUCKET", "silver-bucket")
+    monkeypatch.setenv("SILVER_PREFIX", "silver")
+    monkeypatch.setenv("SILVER_BUFFER_MODE", "staging")
+    monkeypatch.setenv("SILVER_FLUSH_MAX_ROWS", "5")
+    ctx = type("C", (), {"aws_request_id": "r1", "function_name": "serverless-elt-transform"})()
+
+    def _event(ids):
+        body = '{"record_type":"shipments","event_time":"2025-01-01T00:00:00Z","shipment_id":"shp_%d"}'
+        return {"Records": [{"messageId": f"m{i}", "body": body % i} for i in ids]}
+
+    def _keys(s3, prefix):
+        return sorted(o["Key"] for o in s3.list_objects_v2(Bucket="silver-bucket", Prefix=prefix).get("Contents", []))
+
+    def _silver_ids(s3):
+        ids = []
+        for key in _keys(s3, "silver/"):
+            body = s3.get_object(Bucket="silver-bucket", Key=key)["Body"].read()
+            ids.extend(pq.read_table(io.BytesIO(body)).column("shipment_id").to_pylist())
+        return sorted(ids)
+
+    s3 = make_bucket("silver-bucket")
+    monkeypatch.setattr(transform, "_clients", lambda: s3)
+
+    assert transform.handler(_event(range(3)), ctx) == {"batchItemFailures": []}
+    assert _keys(s3, "silver/") == []
+    assert len(_keys(s3, "staging/silver/shipments/dt=2025-01-01/part_")) == 1
+
+    # Crossing the row threshold merges both staged parts into one Silver file.
+    assert transform.handler(_event(range(3, 6)), ctx) == {"batchItemFailures": []}
+    assert len(_keys(s3, "silver/")) == 1
+    assert _silver_ids(s3) == sorted(f"shp_{i}" for i in range(6))
+    assert _keys(s3, "staging/") == []
+
+    # Crash after the Silver write but before inputs were deleted: recovery drops the inputs only.
+    transform.handler(_event(range(6, 8)), ctx)
+    transform.handler(_event(range(8, 10)), ctx)
+    prefix = staging.partition_prefix("staging/silver", "shipments", Partition("2025-01-01"))
+    parts, _ = staging.list_partition(s3, "silver-bucket", prefix)
+
+    def _manifest(name, output_key, inputs):
+        body = json.dumps({"output_key": output_key, "inputs": inputs})
+        s3.put_object(Bucket="silver-bucket", Key=f"{prefix}_flush_{name}.json", Body=body)
+
+    crashed_key = "silver/shipments/dt=2025-01-01/batch_crashed.parquet"
+    staged = s3.get_object(Bucket="silver-bucket", Key=parts[0].key)["Body"].read()
+    s3.put_object(Bucket="silver-bucket", Key=crashed_key, Body=staged)
+    _manifest("crashed", crashed_key, [parts[0].key])
+    # Crash before the Silver write: the manifest is dropped and its inputs are flushed again.
+    _manifest("lost", "silver/shipments/dt=2025-01-01/batch_lost.parquet", [parts[1].key])
+
+    # A live lock held by another flusher blocks the scheduled flush.
+    s3.put_object(Bucket="silver-bucket", Key=prefix + staging.LOCK_NAME, Body=json.dumps({"acquired_at_ms": 2**62}))
+    assert transform.handler({"flush_staged": True, "force": True}, ctx)["files_written"] == 0
+    s3.delete_object(Bucket="silver-bucket", Key=prefix + staging.LOCK_NAME)
+
+    assert transform.handler({"flush_staged": True, "force": True}, ctx) == {"partitions_flushed": 1, "files_written": 1}
+    assert _silver_ids(s3) == sorted(f"shp_{i}" for i in range(10))
+    assert _keys(s3, "staging/") == []
+
+
+def test_partition_writes_run_concurrently_with_capped_in_flight(monkeypatch):
+    import threading
+
+    monkeypatch.setenv("SILVER_BUCKET", "out-bucket")
+    monkeypatch.setenv("MAX_RECORDS_PER_FILE", "2")
+    monkeypatch.setattr(transform, "_clients", lambda: None)
+    ctx = type("C", (), {"aws_request_id": "r1", "function_name": "serverless-elt-transform"})()
+
+    # Backfill-shaped batch: 12 days x 3 records -> 24 chunks across 12 partitions.
+    body = '{"record_type":"shipments","event_time":"2025-01-%02dT00:00:00Z","shipment_id":"shp_%d"}'
+    event = {"Records": [{"messageId": f"m{d}_{i}", "body": body % (d, i)} for d in range(1, 13) for i in range(3)]}
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "barrier": None}
+
+    def _put(s3, bucket, key, rows, record_type, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        try:
+            # Each write waits until `WRITE_CONCURRENCY` writes are in flight (24 is a multiple of 6),
+            # so overlap is proven without timing; a pool that never fills them times out.
+            if state["barrier"] is not None:
+                state["barrier"].wait()
+            if "dt=2025-01-05" in key and len(rows) == 1:
+                raise RuntimeError("s3 down")
+        finally:
+            with lock:
+                state["active"] -= 1
+
+    monkeypatch.setattr(transform, "_s3_put_parquet", _put)
+
+    for concurrency in (1, 6):
+        monkeypatch.setenv("WRITE_CONCURRENCY", str(concurrency))
+        state.update(peak=0, barrier=threading.Barrier(concurrency, timeout=10) if concurrency > 1 else None)
+        resp = transform.handler(event, ctx)
+        # Only the messages in the failed chunk (the partition's second chunk) are retried.
+        assert resp == {"batchItemFailures": [{"itemIdentifier": "m5_2"}]}
+        assert state["peak"] == concurrency
+
+
+def test_parquet_profile_json_is_parsed_once_per_setting(monkeypatch):
+    from lambdas.shared import codec
+
+    calls = []
+    loads = codec.loads
+    monkeypatch.setattr(codec, "loads", lambda raw: calls.append(raw) or loads(raw))
+    monkeypatch.setenv("SILVER_PARQUET_PROFILE", '{"row_group_size": 777}')
+
+    first = transform._parquet_profile("shipments")
+    assert transform._parquet_profile("shipments") is first and first["row_group_size"] == 777
+    assert transform._parquet_profile("invoice_lines")["row_group_size"] == 777
+    assert calls == ['{"row_group_size": 777}']
+
+    monkeypatch.setenv("SILVER_PARQUET_PROFILE", '{"row_group_size": 778}')
+    assert transform._parquet_profile("shipments")["row_group_size"] == 778
+
+
+def test_silver_files_use_record_type_parquet_profile(monkeypatch):
+    pytest.importorskip("pyarrow")
+    import io
+
+    import pyarrow.parquet as pq
+
+    from lambdas.shared.schemas import normalize_record_values, parquet_profile
+
+    puts = {}
+
+    class _S3:
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            puts[Key] = Body
+
+    rows = [
+        normalize_record_values({"record_type": "shipments", "event_time": "2025-01-01T00:00:00Z", "shipment_id": f"s{i}", "carrier": "UPS"})[1]
+        for i in range(25)
+    ]
+    monkeypatch.setenv("SILVER_PARQUET_PROFILE", '{"row_group_size": 10}')
+    transform._s3_put_parquet(_S3(), "b", "k", rows, record_type="shipments")
+    meta = pq.ParquetFile(io.BytesIO(puts["k"])).metadata
+
+    assert [meta.row_group(i).num_rows for i in range(meta.num_row_groups)] == [10, 10, 5]
+    columns = {meta.row_group(0).column(i).path_in_schema: meta.row_group(0).column(i) for i in range(meta.num_columns)}
+    assert columns["carrier"].compression == "ZSTD"
+    assert "RLE_DICTIONARY" in columns["carrier"].encodings
+    assert "RLE_DICTIONARY" not in columns["shipment_id"].encodings
+
+    with pytest.raises(ValueError, match="Unsupported parquet profile keys"):
+        parquet_profile("shipments", {"compresion": "zstd"})
+
+
+def test_silver_rows_are_clustered_by_sort_key(monkeypatch):
+    pytest.importorskip("pyarrow")
+    import io
+
+    import pyarrow.parquet as pq
+
+    from lambdas.shared.schemas import normalize_record_values
+
+    puts = {}
+
+    class _S3:
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            puts[Key] = Body
+
+    ids = [f"shp_{(i * 7) % 30:02d}" for i in range(30)]
+    rows = [
+        normalize_record_values({"record_type": "tracking_events", "event_time": f"2025-01-01T00:00:{59 - i:02d}Z", "shipment_id": s})[1]
+        for i, s in enumerate(ids)
+    ] + [normalize_record_values({"record_type": "tracking_events", "event_time": None, "shipment_id": None})[1]]
+    monkeypatch.setenv("SILVER_PARQUET_PROFILE", '{"row_group_size": 10}')
+    transform._s3_put_parquet(_S3(), "b", "k", rows, record_type="tracking_events")
+    pf = pq.ParquetFile(io.BytesIO(puts["k"]))
+
+    got = pf.read().column("shipment_id").to_pylist()
+    assert got == sorted(ids) + [None]
+    stats = [pf.metadata.row_group(i).column(2).statistics for i in range(pf.metadata.num_row_groups)]
+    # Disjoint, increasing min/max ranges: a point lookup touches a single row group.
+    assert all(a.max < b.min for a, b in zip(stats, stats[1:-1]))
+    if hasattr(pf.metadata.row_group(0), "sorting_columns"):
+        assert [c.column_index for c in pf.metadata.row_group(0).sorting_columns] == [2, 1]
+
+    monkeypatch.setenv("SILVER_PARQUET_PROFILE", '{"sort_by": []}')
+    transform._s3_put_parquet(_S3(), "b", "k2", rows, record_type="tracking_events")
+    assert pq.read_table(io.BytesIO(puts["k2"])).column("shipment_id").to_pylist() == ids + [None]
@@ -0,0 +1,12 @@
+import pytest
+
+
+MODULE = "lambdas.transform.app"
+
+
+def test_transform_prewarm_moves_pyarrow_into_init(imported_modules):
+    pytest.importorskip("pyarrow")
+    assert "pyarrow.parquet" in imported_modules(MODULE, INIT_PREWARM="true")
+
+    imported = imported_modules(MODULE, INIT_PREWARM="false")
+    assert "pyarrow" not in imported and "lambdas.shared.dedup" not in imported
@@ -1,4 +1,3 @@
-import json
 import os
 from datetime import datetime
 from typing import Any, Dict, List
@@ -6,6 +5,9 @@ from typing import Any, Dict, List
 import boto3
 import yaml
 
+from lambdas.shared.compression import detect_compression, open_decompressed
+from lambdas.shared.utils import iter_json_records_stream
+
 s3 = boto3.client("s3")
 
 DATASET = "ups_shipping"
@@ -73,14 +75,14 @@ def lambda_handler(event, context):
             continue
 
         obj = s3.get_object(Bucket=bucket, Key=key)
-        body = obj["Body"].read().decode("utf-8")
-
-        # Supports JSONL
-        for line in body.splitlines():
-            if not line.strip():
-                continue
-            raw = json.loads(line)
-            out_rows.append(transform_record(raw, cfg))
+        # Supports JSONL (optionally .gz/.zst/.bz2), streamed instead of read whole.
+        body = open_decompressed(obj["Body"], detect_compression(key, obj.get("ContentEncoding")))
+        try:
+            for raw in iter_json_records_stream(body):
+                out_rows.append(transform_record(raw, cfg))
+        finally:
+            body.close()
+            obj["Body"].close()
 
     return {
         "dataset": cfg["dataset"],
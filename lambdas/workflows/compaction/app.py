@@ -0,0 +1,174 @@
+"""
+Silver compaction runner with a size-based router (Lambda for small partitions, Glue for large ones).
+
+Why this exists:
+- A Glue job run pays its startup time (and DPU billing minimum) even when a partition only holds a
+  few MB of small files. Those partitions are compacted right here with pyarrow, using the same
+  manifest engine as the Glue job (`lambdas.shared.compaction`), so either path can pick up where
+  the other stopped.
+- The engine sorts with bounded memory (external merge sort spilling to local disk), so the route
+  is about runtime and scratch space, not RAM. Partitions whose backlog (new input bytes) exceeds
+  `COMPACTION_LAMBDA_MAX_BYTES` go to the Glue Python shell job, sized by backlog: 0.0625 DPU (1 GB)
+  up to `COMPACTION_GLUE_SMALL_MAX_BYTES`, else 1 DPU (16 GB). Each route's memory budget is a
+  quarter of its memory (Lambda: `memory_size`).
+
+Inputs (event, or Step Functions `input`):
+- `record_type` (required), `dt` (required, YYYY-MM-DD), `hour` (optional, HH: one hour of an
+  hourly `dt=.../hour=...` layout; the transform quality event's `hour`)
+- `route` (optional): "lambda" or "glue" to bypass the size check
+
+Environment variables:
+- `SILVER_BUCKET` (required), `SILVER_PREFIX` (default: "silver")
+- `SILVER_ROOT` (default: `s3://$SILVER_BUCKET`): a local directory works too (local runs, tests)
+- `COMPACTED_PREFIX` (default: "silver_compacted"), `COMPACTION_MANIFEST_PREFIX`
+  (default: `$COMPACTED_PREFIX/_compaction`)
+- `COMPACTION_LAMBDA_MAX_BYTES` (default: 256 MiB): larger backlogs go to Glue. Keep it below the
+  function's /tmp size: spilled sort runs take about the compressed input size.
+- `COMPACTION_GLUE_SMALL_MAX_BYTES` (default: 2 GiB): larger backlogs get the 1 DPU Glue capacity
+- `COMPACTION_TARGET_FILE_MB` (default: 128)
+- `COMPACTION_MEMORY_BUDGET_MB` (default: a quarter of the function memory): decoded bytes an output
+  file may hold in memory; larger ones are sorted externally
+- `SILVER_EVENT_TIME_TYPE` (default: "string")
+- `GLUE_JOB_NAME` (optional): without it every partition is compacted here
+
+Run at most one compaction per partition at a time (the Glue job allows a single concurrent run).
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+
+from lambdas.shared.compaction import backlog_bytes, compact_partition, default_memory_budget_bytes
+from lambdas.shared.utils import env, log
+
+
+# Glue Python shell capacities: (MaxCapacity DPUs, memory MB).
+GLUE_SMALL_CAPACITY = (0.0625, 1024)
+GLUE_LARGE_CAPACITY = (1.0, 16 * 1024)
+
+
+def _settings() -> Dict[str, Any]:
+    bucket = env("SILVER_BUCKET")
+    compacted_prefix = env("COMPACTED_PREFIX", "silver_compacted").strip("/")
+    return {
+        "bucket": bucket,
+        "silver_prefix": env("SILVER_PREFIX", "silver").strip("/"),
+        "root": env("SILVER_ROOT", f"s3://{bucket}").rstrip("/"),
+        "compacted_prefix": compacted_prefix,
+        "manifest_prefix": env("COMPACTION_MANIFEST_PREFIX", f"{compacted_prefix}/_compaction").strip("/"),
+        "lambda_max_bytes": int(env("COMPACTION_LAMBDA_MAX_BYTES", str(256 * 1024 * 1024))),
+        "target_file_bytes": int(env("COMPACTION_TARGET_FILE_MB", "128")) * 1024 * 1024,
+        "glue_small_max_bytes": int(env("COMPACTION_GLUE_SMALL_MAX_BYTES", str(2 * 1024 * 1024 * 1024))),
+        "memory_budget_bytes": (
+            int(os.environ["COMPACTION_MEMORY_BUDGET_MB"]) * 1024 * 1024
+            if os.getenv("COMPACTION_MEMORY_BUDGET_MB")
+            else default_memory_budget_bytes()
+        ),
+        "timestamp_type": env("SILVER_EVENT_TIME_TYPE", "string"),
+        "glue_job_name": os.getenv("GLUE_JOB_NAME", ""),
+    }
+
+
+def glue_capacity(backlog: int, small_max_bytes: int) -> Tuple[float, int]:
+    """`(MaxCapacity, memory budget MB)` of a Glue run over `backlog` input bytes."""
+    dpu, memory_mb = GLUE_SMALL_CAPACITY if backlog <= small_max_bytes else GLUE_LARGE_CAPACITY
+    return dpu, memory_mb // 4
+
+
+def route_partition(
+    cfg: Dict[str, Any],
+    record_type: str,
+    dt: str,
+    *,
+    hour: Optional[str] = None,
+    route: Optional[str] = None,
+    glue: Any = None,
+) -> Dict[str, Any]:
+    roots = {
+        "source_root": f"{cfg['root']}/{cfg['silver_prefix']}",
+        "output_root": f"{cfg['root']}/{cfg['compacted_prefix']}",
+    }
+    manifest_root = f"{cfg['root']}/{cfg['manifest_prefix']}"
+    backlog = backlog_bytes(roots["source_root"], roots["output_root"], record_type, dt, hour=hour, manifest_root=manifest_root)
+    if route is None:
+        route = "glue" if cfg["glue_job_name"] and backlog > cfg["lambda_max_bytes"] else "lambda"
+    if route not in ("lambda", "glue"):
+        raise ValueError(f"Unsupported route: {route}")
+
+    if route == "glue":
+        if not cfg["glue_job_name"]:
+            raise ValueError("route=glue requires GLUE_JOB_NAME")
+        glue = glue or boto3.client("glue")
+        max_capacity, memory_budget_mb = glue_capacity(backlog, cfg["glue_small_max_bytes"])
+        try:
+            run = glue.start_job_run(
+                JobName=cfg["glue_job_name"],
+                MaxCapacity=max_capacity,
+                Arguments={
+                    "--SILVER_BUCKET": cfg["bucket"],
+                    "--SILVER_PREFIX": cfg["silver_prefix"],
+                    "--RECORD_TYPE": record_type,
+                    "--DT": dt,
+                    "--OUTPUT_PREFIX": cfg["compacted_prefix"],
+                    "--MANIFEST_PREFIX": cfg["manifest_prefix"],
+                    "--TARGET_FILE_MB": str(cfg["target_file_bytes"] // (1024 * 1024)),
+                    "--MEMORY_BUDGET_MB": str(memory_budget_mb),
+                    **({"--HOUR": hour} if hour is not None else {}),
+                },
+            )
+            job_run_id = run["JobRunId"]
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") != "ConcurrentRunsExceededException":
+                raise
+            # A run is already in progress; new files are picked up by the next one.
+            job_run_id = None
+        log(
+            "compaction_routed",
+            route="glue",
+            record_type=record_type,
+            dt=dt,
+            hour=hour,
+            backlog_bytes=backlog,
+            max_capacity=max_capacity,
+            job_run_id=job_run_id,
+        )
+        return {
+            "route": "glue",
+            "record_type": record_type,
+            "dt": dt,
+            "hour": hour,
+            "backlog_bytes": backlog,
+            "max_capacity": max_capacity,
+            "job_run_id": job_run_id,
+        }
+
+    summary = compact_partition(
+        roots["source_root"],
+        roots["output_root"],
+        record_type,
+        dt,
+        hour=hour,
+        manifest_root=manifest_root,
+        target_file_bytes=cfg["target_file_bytes"],
+        timestamp_type=cfg["timestamp_type"],
+        memory_budget_bytes=cfg["memory_budget_bytes"],
+    )
+    log(
+        "compaction_routed",
+        route="lambda",
+        record_type=record_type,
+        dt=dt,
+        hour=hour,
+        backlog_bytes=backlog,
+        inputs=summary["inputs"],
+        outputs=len(summary["outputs"]),
+        rows=summary["rows"],
+        recovered=summary["recovered"],
+    )
+    return {"route": "lambda", "backlog_bytes": backlog, **summary}
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    payload = event.get("input") if isinstance(event.get("input"), dict) else event
+    return route_partition(_settings(), payload["record_type"], payload["dt"], hour=payload.get("hour"), route=payload.get("route"))
@@ -0,0 +1,89 @@
+import pytest
+
+from lambdas.workflows.compaction import app
+
+
+pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+class _FakeGlue:
+    def __init__(self):
+        self.runs = []
+
+    def start_job_run(self, **kwargs):
+        self.runs.append(kwargs)
+        return {"JobRunId": f"jr_{len(self.runs)}"}
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch):
+    """A local directory standing in for the Silver bucket."""
+    from lambdas.shared.columnar import rows_to_table
+    from lambdas.shared.schemas import RECORD_SCHEMAS
+
+    fields = [f for f, _ in RECORD_SCHEMAS["shipments"]]
+    part = tmp_path / "silver" / "shipments" / "dt=2025-12-31"
+    part.mkdir(parents=True)
+    for n in range(3):
+        row = dict.fromkeys(fields)
+        row.update(record_type="shipments", shipment_id=f"s{n}", event_time="2025-12-31T00:00:00Z")
+        pq.write_table(rows_to_table("shipments", [tuple(row[f] for f in fields)]), str(part / f"{n}.parquet"))
+
+    monkeypatch.setenv("SILVER_BUCKET", "silver-bucket")
+    monkeypatch.setenv("SILVER_ROOT", str(tmp_path))
+    monkeypatch.setenv("GLUE_JOB_NAME", "silver-compact")
+    return tmp_path
+
+
+def test_small_partition_is_compacted_in_lambda(bucket):
+    out = app.handler({"input": {"record_type": "shipments", "dt": "2025-12-31"}}, None)
+    assert out["route"] == "lambda" and out["inputs"] == 3 and out["rows"] == 3
+    assert len(list((bucket / "silver_compacted" / "shipments" / "dt=2025-12-31").glob("*.parquet"))) == 1
+    assert (bucket / "silver_compacted" / "_compaction" / "shipments" / "dt=2025-12-31" / "manifest.json").exists()
+
+    assert app.handler({"record_type": "shipments", "dt": "2025-12-31"}, None)["inputs"] == 0
+
+
+def test_large_partition_is_routed_to_glue(bucket, monkeypatch):
+    monkeypatch.setenv("COMPACTION_LAMBDA_MAX_BYTES", "1")
+    glue = _FakeGlue()
+    out = app.route_partition(app._settings(), "shipments", "2025-12-31", glue=glue)
+
+    assert out["route"] == "glue" and out["job_run_id"] == "jr_1" and out["backlog_bytes"] > 1
+    args = glue.runs[0]["Arguments"]
+    assert glue.runs[0]["JobName"] == "silver-compact"
+    assert args["--RECORD_TYPE"] == "shipments" and args["--OUTPUT_PREFIX"] == "silver_compacted"
+    assert out["hour"] is None and "--HOUR" not in args
+    assert not (bucket / "silver_compacted").exists()
+    # Glue capacity and memory budget follow the backlog.
+    assert glue.runs[0]["MaxCapacity"] == 0.0625 and args["--MEMORY_BUDGET_MB"] == "256"
+
+    monkeypatch.setenv("COMPACTION_GLUE_SMALL_MAX_BYTES", "1")
+    app.route_partition(app._settings(), "shipments", "2025-12-31", glue=glue)
+    assert glue.runs[1]["MaxCapacity"] == 1.0 and glue.runs[1]["Arguments"]["--MEMORY_BUDGET_MB"] == "4096"
+
+
+def test_lambda_memory_budget_follows_function_memory(bucket, monkeypatch):
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "2048")
+    assert app._settings()["memory_budget_bytes"] == 512 * 1024 * 1024
+    monkeypatch.setenv("COMPACTION_MEMORY_BUDGET_MB", "64")
+    assert app._settings()["memory_budget_bytes"] == 64 * 1024 * 1024
+
+
+def test_hourly_partitions_are_compacted_and_routed_by_hour(bucket, monkeypatch):
+    daily = bucket / "silver" / "shipments" / "dt=2025-12-31"
+    hourly = daily / "hour=05"
+    hourly.mkdir()
+    for f in daily.glob("*.parquet"):
+        f.rename(hourly / f.name)
+
+    out = app.handler({"record_type": "shipments", "dt": "2025-12-31", "hour": "05"}, None)
+    assert (out["dt"], out["hour"], out["inputs"]) == ("2025-12-31", "05", 3)
+    assert len(list((bucket / "silver_compacted" / "shipments" / "dt=2025-12-31" / "hour=05").glob("*.parquet"))) == 1
+
+    monkeypatch.setenv("COMPACTION_LAMBDA_MAX_BYTES", "1")
+    (hourly / "extra.parquet").write_bytes((hourly / "0.parquet").read_bytes())
+    glue = _FakeGlue()
+    out = app.route_partition(app._settings(), "shipments", "2025-12-31", hour="05", glue=glue)
+    assert out["route"] == "glue" and out["hour"] == "05" and glue.runs[0]["Arguments"]["--HOUR"] == "05"
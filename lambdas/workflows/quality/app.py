@@ -11,6 +11,8 @@ Inputs (from Step Functions execution input):
 - `record_type` (optional, default "shipments")
 - `since` (required) OR `execution_start_time` (set by the workflow)
 - `min_parquet_objects` (optional, default 1)
+
+Profiling: set `PROFILE_SAMPLE_EVERY` / `PROFILE_MODE` / `PROFILE_OUTPUT` (see `lambdas.shared.profiling`).
 """
 
 from datetime import datetime, timezone
@@ -18,6 +20,7 @@ from typing import Any, Dict
 
 import boto3
 
+from lambdas.shared.profiling import profiled
 from lambdas.shared.utils import log
 
 
@@ -30,6 +33,7 @@ def _parse_dt(s: str) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
+@profiled("quality")
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     s3 = boto3.client("s3")
 
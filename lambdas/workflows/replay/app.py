@@ -10,6 +10,8 @@ Inputs (from Step Functions execution input):
 - `src_prefix` (required): source prefix to scan (e.g., "bronze/shipments/")
 - `dest_prefix_base` (optional): must start with "bronze/" to trigger ingest
 - `window_hours` (optional) OR explicit `start` / `end` (ISO-8601)
+
+Profiling: set `PROFILE_SAMPLE_EVERY` / `PROFILE_MODE` / `PROFILE_OUTPUT` (see `lambdas.shared.profiling`).
 """
 
 from datetime import datetime, timedelta, timezone
@@ -17,6 +19,7 @@ from typing import Any, Dict
 
 import boto3
 
+from lambdas.shared.profiling import profiled
 from lambdas.shared.utils import log
 
 
@@ -33,6 +36,7 @@ def _iso_z(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+@profiled("replay")
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     s3 = boto3.client("s3")
 
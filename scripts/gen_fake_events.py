@@ -2,23 +2,63 @@
 """
 Generate fake events for the Bronze layer.
 
+Engines:
+- `python` (default): one dict per record via `GENERATORS`, every id unique.
+- `numpy`: columns are drawn in bulk with NumPy and formatted straight into JSONL text, for
+  millions of rows. It is reproducible with `--seed` plus `--now` and has realism controls: id cardinality, Zipf
+  skew, duplicate rate, late (out-of-order) event times, and malformed lines. It can write sharded,
+  compressed output.
+
+numpy engine controls:
+- `--now TS`: end of the `event_time` window (ISO 8601, default: the current time). Timestamps are
+  anchored to it, so a rerun with the same `--seed` and `--now` writes the same bytes.
+- `--cardinality N`: distinct `shipment_id` / `invoice_id` values shared by all shards (default:
+  every row gets its own id, as in the python engine).
+- `--zipf A`: skew of id and category popularity (rank k drawn with weight 1/k^A; 0 = uniform).
+- `--dup-rate R`: fraction of rows that exactly repeat an earlier row of the same shard, like a
+  redelivered event (same natural key and `event_time`).
+- `--late-rate R` / `--late-max-hours H`: fraction of rows whose `event_time` lags 1h..H behind
+  their neighbours; other rows are in time order.
+- `--malformed-rate R`: fraction of bad lines. `--malformed-kind record` writes valid JSON with an
+  unknown `record_type` (ingest drops the line); `json` writes truncated JSON (ingest fails the object).
+- `--shards N` / `--compression gzip|bz2|zstd`: with N > 1, `--out x.jsonl` becomes
+  `x-00000-of-0000N.jsonl[.gz]`. zstd needs the optional `zstandard` package.
+
 Examples:
 - JSONL for S3 bronze:
   `python scripts/gen_fake_events.py --type shipments --count 100 --format jsonl --out /tmp/shipments.jsonl`
 - Pretty JSON array:
   `python scripts/gen_fake_events.py --type shipments --count 100 --format json --out /tmp/shipments.json`
+- 10M skewed rows with 2% duplicates in 8 gzip shards:
+  `python scripts/gen_fake_events.py --engine numpy --type shipments --count 10000000 --cardinality 1000000 \
+  --zipf 1.1 --dup-rate 0.02 --late-rate 0.01 --shards 8 --compression gzip --seed 7 --now 2025-01-08T00:00:00Z \
+  --out /tmp/shipments.jsonl`
 """
 
 import argparse
+import bz2
+import gzip
 import json
 import random
 import sys
-import uuid
 from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+
+ORIGINS = ["SZX", "HKG", "LAX", "ORD"]
+DESTINATIONS = ["SEA", "JFK", "SFO", "DFW"]
+CARRIERS = ["UPS", "DHL", "FEDEX"]
+STATUSES = ["CREATED", "IN_TRANSIT", "OUT_FOR_DELIVERY", "DELIVERED"]
+CITIES = ["Shenzhen", "Hong Kong", "Los Angeles", "Chicago", "Seattle"]
+SKUS = ["SKU-001", "SKU-002", "SKU-003"]
+
+
+# End of the python engine's `event_time` window; None means the current time (`--now` pins it).
+_NOW: Optional[datetime] = None
 
 
 def _dt_utc(days_back: int = 7) -> datetime:
-    now = datetime.now(timezone.utc)
+    now = _NOW or datetime.now(timezone.utc)
     return now - timedelta(seconds=random.randint(0, days_back * 24 * 3600))
 
 
@@ -27,10 +67,10 @@ def gen_shipments() -> dict:
     return {
         "record_type": "shipments",
         "event_time": created_at,
-        "shipment_id": f"shp_{uuid.uuid4().hex[:12]}",
-        "origin": random.choice(["SZX", "HKG", "LAX", "ORD"]),
-        "destination": random.choice(["SEA", "JFK", "SFO", "DFW"]),
-        "carrier": random.choice(["UPS", "DHL", "FEDEX"]),
+        "shipment_id": f"shp_{random.getrandbits(48):012x}",
+        "origin": random.choice(ORIGINS),
+        "destination": random.choice(DESTINATIONS),
+        "carrier": random.choice(CARRIERS),
         "weight_kg": round(random.random() * 30, 2),
     }
 
@@ -40,9 +80,9 @@ def gen_tracking_events() -> dict:
     return {
         "record_type": "tracking_events",
         "event_time": event_time,
-        "shipment_id": f"shp_{uuid.uuid4().hex[:12]}",
-        "status": random.choice(["CREATED", "IN_TRANSIT", "OUT_FOR_DELIVERY", "DELIVERED"]),
-        "city": random.choice(["Shenzhen", "Hong Kong", "Los Angeles", "Chicago", "Seattle"]),
+        "shipment_id": f"shp_{random.getrandbits(48):012x}",
+        "status": random.choice(STATUSES),
+        "city": random.choice(CITIES),
     }
 
 
@@ -53,8 +93,8 @@ def gen_invoice_lines() -> dict:
     return {
         "record_type": "invoice_lines",
         "event_time": event_time,
-        "invoice_id": f"inv_{uuid.uuid4().hex[:10]}",
-        "sku": random.choice(["SKU-001", "SKU-002", "SKU-003"]),
+        "invoice_id": f"inv_{random.getrandbits(40):010x}",
+        "sku": random.choice(SKUS),
         "quantity": qty,
         "unit_price": unit_price,
         "line_total": round(qty * unit_price, 2),
@@ -68,14 +108,207 @@ GENERATORS = {
 }
 
 
+# numpy engine: one `%`-template per record type, filled column-wise (no per-row dicts or json.dumps).
+_TEMPLATES = {
+    "shipments": '{"record_type":"shipments","event_time":"%sZ","shipment_id":"shp_%012x","origin":"%s",'
+    '"destination":"%s","carrier":"%s","weight_kg":%.2f}\n',
+    "tracking_events": '{"record_type":"tracking_events","event_time":"%sZ","shipment_id":"shp_%012x",'
+    '"status":"%s","city":"%s"}\n',
+    "invoice_lines": '{"record_type":"invoice_lines","event_time":"%sZ","invoice_id":"inv_%010x","sku":"%s",'
+    '"quantity":%d,"unit_price":%.2f,"line_total":%.2f}\n',
+}
+
+
+# Odd multiplier: `rank * _ID_MIX mod 2^bits` is a bijection, so distinct ranks map to distinct,
+# random-looking ids.
+_ID_MIX = 0x9E3779B97F4A7C15
+_ID_BITS = {"shipments": 48, "tracking_events": 48, "invoice_lines": 40}
+
+
+def _zipf_sampler(np: Any, rng: Any, n_values: int, a: float):
+    """Draw ranks in `[0, n_values)` with P(k) proportional to 1/(k+1)^a (a=0: uniform)."""
+    if a <= 0:
+        return lambda size: rng.integers(0, n_values, size)
+    cdf = np.cumsum(1.0 / np.arange(1, n_values + 1, dtype=np.float64) ** a)
+    cdf /= cdf[-1]
+    return lambda size: np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), n_values - 1)
+
+
+def _columns(np: Any, rng: Any, record_type: str, n: int, ids: Any, categories: Any) -> List[Any]:
+    if record_type == "shipments":
+        return [ids, categories(ORIGINS, n), categories(DESTINATIONS, n), categories(CARRIERS, n), np.round(rng.random(n) * 30, 2)]
+    if record_type == "tracking_events":
+        return [ids, categories(STATUSES, n), categories(CITIES, n)]
+    qty = rng.integers(1, 7, n)
+    unit_price = np.round(rng.random(n) * 50 + 3, 2)
+    return [ids, categories(SKUS, n), qty, unit_price, np.round(qty * unit_price, 2)]
+
+
+def generate_jsonl_chunks(
+    record_type: str,
+    count: int,
+    *,
+    seed: Optional[int] = None,
+    cardinality: Optional[int] = None,
+    zipf: float = 0.0,
+    dup_rate: float = 0.0,
+    late_rate: float = 0.0,
+    late_max_hours: float = 48.0,
+    malformed_rate: float = 0.0,
+    malformed_kind: str = "record",
+    days_back: int = 7,
+    now: Optional[datetime] = None,
+    chunk_rows: int = 100000,
+    row_offset: int = 0,
+) -> Iterator[str]:
+    """Yield JSONL text in chunks of up to `chunk_rows` lines (numpy engine; see the module docstring)."""
+    import numpy as np  # type: ignore
+
+    if record_type not in _TEMPLATES:
+        raise ValueError(f"Unsupported record_type: {record_type}")
+    if malformed_kind not in ("record", "json"):
+        raise ValueError(f"Unsupported malformed kind: {malformed_kind}")
+    rng = np.random.default_rng(seed)
+    ranks_for = _zipf_sampler(np, rng, cardinality, zipf) if cardinality else None
+    id_mask = (1 << _ID_BITS[record_type]) - 1
+    samplers: Dict[int, Any] = {}
+
+    def categories(values: List[str], n: int) -> List[str]:
+        sample = samplers.setdefault(len(values), _zipf_sampler(np, rng, len(values), zipf))
+        return np.asarray(values)[sample(n)]
+
+    end = np.datetime64((now or datetime.now(timezone.utc)).replace(tzinfo=None), "s")
+    window = days_back * 24 * 3600
+    template = _TEMPLATES[record_type]
+
+    for offset in range(0, count, chunk_rows):
+        n = min(chunk_rows, count - offset)
+        # In-order timestamps across the whole run (+ up to a minute of jitter), then late rows.
+        seconds = (np.arange(offset, offset + n) * (window / max(1, count)) + rng.random(n) * 60).astype(np.int64)
+        late = rng.random(n) < late_rate
+        seconds[late] -= (3600 + rng.random(int(late.sum())) * max(0.0, late_max_hours - 1) * 3600).astype(np.int64)
+        event_time = end - window + seconds.astype("timedelta64[s]")
+        ranks = ranks_for(n) if ranks_for else np.arange(row_offset + offset, row_offset + offset + n)
+        ids = ((ranks.astype(np.uint64) + np.uint64(1)) * np.uint64(_ID_MIX)) & np.uint64(id_mask)
+        columns = [np.datetime_as_string(event_time, unit="s")] + _columns(np, rng, record_type, n, ids, categories)
+
+        # Duplicates copy an earlier original (non-duplicate) row of this chunk.
+        dup = rng.random(n) < dup_rate
+        dup_rows = np.flatnonzero(dup)
+        if dup_rows.size:
+            originals = np.flatnonzero(~dup)
+            before = np.searchsorted(originals, dup_rows)
+            dup_rows, before = dup_rows[before > 0], before[before > 0]
+            sources = originals[(rng.random(dup_rows.size) * before).astype(np.int64)]
+            for col in columns:
+                col[dup_rows] = col[sources]
+
+        lines = [template % row for row in zip(*(col.tolist() for col in columns))]
+        for i in np.flatnonzero(rng.random(n) < malformed_rate).tolist():
+            if malformed_kind == "json":
+                lines[i] = lines[i][: len(lines[i]) // 2] + "\n"
+            else:
+                lines[i] = lines[i].replace(f'"record_type":"{record_type}"', '"record_type":"malformed"', 1)
+        yield "".join(lines)
+
+
+_COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "bz2": ".bz2", "zstd": ".zst"}
+
+
+def _open_text_output(path: str, compression: str):
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if compression == "bz2":
+        return bz2.open(path, "wt", encoding="utf-8")
+    if compression == "zstd":
+        import io
+
+        try:
+            import zstandard  # type: ignore
+        except ImportError as e:
+            raise RuntimeError("zstd output requires the 'zstandard' package") from e
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, "wb")), encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def shard_paths(out: str, shards: int, compression: str = "none") -> List[str]:
+    suffix = _COMPRESSION_SUFFIXES[compression]
+    if shards <= 1:
+        return [out + suffix]
+    stem, dot, ext = out.rpartition(".") if "." in out.rsplit("/", 1)[-1] else (out, "", "")
+    return [f"{stem}-{i:05d}-of-{shards:05d}{dot}{ext}{suffix}" for i in range(shards)]
+
+
+def write_sharded_jsonl(record_type: str, count: int, out: str, *, shards: int = 1, compression: str = "none", **options: Any) -> List[str]:
+    """Write `count` rows split evenly over `shards` files; returns the paths (numpy engine)."""
+    paths = shard_paths(out, shards, compression)
+    seed = options.pop("seed", None)
+    per_shard = -(-count // len(paths))
+    for i, path in enumerate(paths):
+        rows = max(0, min(per_shard, count - i * per_shard))
+        # Per-shard seeds keep shards independent yet reproducible. Each shard spans the whole time
+        # window, like parallel producers.
+        shard_seed = None if seed is None else seed * 1000003 + i
+        with _open_text_output(path, compression) as f:
+            for chunk in generate_jsonl_chunks(record_type, rows, seed=shard_seed, row_offset=i * per_shard, **options):
+                f.write(chunk)
+    return paths
+
+
+def _utc_timestamp(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Generate fake JSONL events for Bronze.")
     parser.add_argument("--type", choices=sorted(GENERATORS.keys()), required=True)
     parser.add_argument("--count", type=int, default=100)
     parser.add_argument("--format", choices=["jsonl", "json"], default="jsonl", help="Output format.")
     parser.add_argument("--out", default="-", help="Output path (default: stdout). Use '-' for stdout.")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python")
+    parser.add_argument("--seed", type=int, help="Random seed (reproducible output with --now)")
+    parser.add_argument("--now", type=_utc_timestamp, help="End of the event_time window, ISO 8601 (default: current time)")
+    numpy_args = parser.add_argument_group("numpy engine")
+    numpy_args.add_argument("--cardinality", type=int, help="Distinct entity ids (default: --count)")
+    numpy_args.add_argument("--zipf", type=float, default=0.0, help="Popularity skew exponent (0 = uniform)")
+    numpy_args.add_argument("--dup-rate", type=float, default=0.0)
+    numpy_args.add_argument("--late-rate", type=float, default=0.0)
+    numpy_args.add_argument("--late-max-hours", type=float, default=48.0)
+    numpy_args.add_argument("--malformed-rate", type=float, default=0.0)
+    numpy_args.add_argument("--malformed-kind", choices=["record", "json"], default="record")
+    numpy_args.add_argument("--shards", type=int, default=1)
+    numpy_args.add_argument("--compression", choices=sorted(_COMPRESSION_SUFFIXES), default="none")
     args = parser.parse_args()
 
+    if args.engine == "numpy":
+        if args.format != "jsonl":
+            parser.error("--engine numpy writes JSONL only")
+        options = {
+            "seed": args.seed,
+            "cardinality": args.cardinality,
+            "zipf": args.zipf,
+            "dup_rate": args.dup_rate,
+            "late_rate": args.late_rate,
+            "late_max_hours": args.late_max_hours,
+            "malformed_rate": args.malformed_rate,
+            "malformed_kind": args.malformed_kind,
+            "now": args.now,
+        }
+        if args.out == "-":
+            if args.shards > 1 or args.compression != "none":
+                parser.error("--shards/--compression need --out")
+            for chunk in generate_jsonl_chunks(args.type, args.count, **options):
+                sys.stdout.write(chunk)
+            return 0
+        for path in write_sharded_jsonl(args.type, args.count, args.out, shards=args.shards, compression=args.compression, **options):
+            print(path, file=sys.stderr)
+        return 0
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    global _NOW
+    _NOW = args.now
     gen = GENERATORS[args.type]
     out_f = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
     try:
@@ -7,14 +7,28 @@ It requires your IAM principal to have `sqs:SendMessage` on the destination queu
 
 Example:
 `python scripts/replay_from_s3.py --bucket <bronze_bucket> --prefix bronze/shipments/ --queue-url <queue_url> --start 2026-01-01T00:00:00Z --end 2026-01-02T00:00:00Z`
+
+Compressed objects (`.gz`, `.zst`, `.bz2`, or a matching `Content-Encoding`) are decompressed as a
+stream; `.zst` needs `pip install zstandard`. Lines are parsed and re-serialized with
+`lambdas.shared.codec` (orjson when installed, `JSON_CODEC` selects the backend), like ingest.
 """
 
 import argparse
-import json
+import bz2
+import gzip
+import sys
 from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
 
 import boto3
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lambdas.shared import codec  # noqa: E402
+
 
 def _parse_dt(s: str) -> datetime:
     # ISO-8601, e.g. 2025-01-01T00:00:00Z
@@ -26,6 +40,42 @@ def _parse_dt(s: str) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
+def _detect_compression(key: str, content_encoding: Optional[str]) -> Optional[str]:
+    lowered = key.lower()
+    for suffix, compression in ((".gz", "gzip"), (".gzip", "gzip"), (".zst", "zstd"), (".zstd", "zstd"), (".bz2", "bzip2")):
+        if lowered.endswith(suffix):
+            return compression
+    encoding = (content_encoding or "").split(",")[-1].strip().lower()
+    return {"gzip": "gzip", "x-gzip": "gzip", "zstd": "zstd", "bzip2": "bzip2", "x-bzip2": "bzip2"}.get(encoding)
+
+
+def _open_body(body: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=body, mode="rb")  # type: ignore[return-value]
+    if compression == "bzip2":
+        return bz2.BZ2File(body, mode="rb")  # type: ignore[return-value]
+    if compression == "zstd":
+        import zstandard  # type: ignore
+
+        return zstandard.ZstdDecompressor().stream_reader(body, read_across_frames=True)
+    return body
+
+
+def _iter_lines(stream: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Replay S3 JSON/JSONL objects into SQS.")
     parser.add_argument("--bucket", required=True)
@@ -48,12 +98,12 @@ def main() -> int:
             if not (start <= last_modified <= end):
                 continue
 
-            body = s3.get_object(Bucket=args.bucket, Key=obj["Key"])["Body"].read().decode("utf-8")
-            lines = [ln for ln in body.splitlines() if ln.strip()]
+            resp = s3.get_object(Bucket=args.bucket, Key=obj["Key"])
+            body = _open_body(resp["Body"], _detect_compression(obj["Key"], resp.get("ContentEncoding")))
             entries = []
-            for i, line in enumerate(lines):
-                payload = json.loads(line)
-                entries.append({"Id": str(i), "MessageBody": json.dumps(payload)})
+            for i, line in enumerate(_iter_lines(body)):
+                payload = codec.loads(line)
+                entries.append({"Id": str(i), "MessageBody": codec.dumps(payload)})
                 if len(entries) == 10:
                     sqs.send_message_batch(QueueUrl=args.queue_url, Entries=entries)
                     total += len(entries)
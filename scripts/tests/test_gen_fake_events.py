@@ -0,0 +1,65 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from lambdas.shared.schemas import normalize_record
+from scripts import gen_fake_events as gen
+
+
+np = pytest.importorskip("numpy")
+NOW = datetime(2025, 1, 8, tzinfo=timezone.utc)
+
+
+def _lines(**kwargs):
+    return "".join(gen.generate_jsonl_chunks("shipments", 5000, seed=7, now=NOW, chunk_rows=2000, **kwargs)).splitlines()
+
+
+def test_numpy_engine_is_reproducible_and_parses():
+    lines = _lines()
+    assert lines == _lines()
+    records = [normalize_record(json.loads(line)) for line in lines]
+    assert len({r["shipment_id"] for r in records}) == 5000
+    assert all("2025-01-01T00:00:00Z" <= r["event_time"] <= "2025-01-08T00:01:00Z" for r in records)
+
+
+def test_numpy_engine_skew_duplicates_late_and_malformed_rows():
+    lines = _lines(cardinality=100, zipf=1.2, dup_rate=0.1, late_rate=0.05, malformed_rate=0.01)
+    rows = [json.loads(line) for line in lines]
+    ids = [r["shipment_id"] for r in rows]
+    assert len(set(ids)) <= 100
+    # Zipf: the most popular id is far above the uniform share (5000 / 100).
+    assert max(ids.count(i) for i in set(ids)) > 300
+
+    assert 350 < len(lines) - len(set(lines)) < 650
+    malformed = [r for r in rows if r["record_type"] == "malformed"]
+    assert 20 < len(malformed) < 90
+    with pytest.raises(ValueError):
+        normalize_record(malformed[0])
+
+    times = [r["event_time"] for r in rows]
+    out_of_order = sum(1 for a, b in zip(times, times[1:]) if b < a and a[:13] != b[:13])
+    assert out_of_order > 100
+
+
+def test_sharded_compressed_output(tmp_path):
+    paths = gen.write_sharded_jsonl("invoice_lines", 1001, str(tmp_path / "inv.jsonl"), shards=3, compression="gzip", seed=1, now=NOW)
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [f"inv-{i:05d}-of-00003.jsonl.gz" for i in range(3)]
+    ids = [json.loads(line)["invoice_id"] for p in paths for line in gzip.open(p, "rt")]
+    assert len(ids) == len(set(ids)) == 1001
+
+
+def test_cli_output_is_reproducible_with_seed_and_now(tmp_path):
+    import subprocess
+    import sys
+
+    script = gen.__file__
+    outputs = []
+    for i in range(2):
+        out = tmp_path / f"run{i}.jsonl"
+        args = ["--type", "shipments", "--count", "50", "--seed", "7", "--now", "2025-01-08T02:00:00+02:00", "--out", str(out)]
+        subprocess.run([sys.executable, script, "--engine", "numpy", *args], check=True, capture_output=True)
+        outputs.append(out.read_text())
+    assert outputs[0] == outputs[1]
+    assert max(json.loads(line)["event_time"] for line in outputs[0].splitlines()) <= "2025-01-08T00:01:00Z"